@@ -0,0 +1,422 @@
+import asyncio
+import json
+import logging
+import logging.handlers
+import os
+import random
+import threading
+import time
+import urllib.request
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from safety_decision_engine import Severity
+from metrics import MetricsRegistry
+
+MAX_DESCRIPTIONS = 10  # Per coalesced alert; the count keeps going
+
+
+@dataclass
+class Alert:
+    """One notification - possibly a burst of incidents of the same camera and severity merged together"""
+    camera_id: str
+    severity: Severity
+    timestamp: float  # time.time() when the first incident started
+    last_timestamp: float = 0.0
+    count: int = 1
+    descriptions: list = field(default_factory=list)
+
+    @classmethod
+    def from_incident(cls, incident) -> 'Alert':
+        """From a SafetyIncident or its to_dict() (what decisions list under 'violations')"""
+        if isinstance(incident, dict):
+            record = incident
+            started = (datetime.fromisoformat(record['timestamp']).timestamp() if record.get('timestamp')
+                       else time.time())
+        else:
+            record = incident.to_dict()
+            started = incident.timestamp
+        return cls(record['camera_id'], Severity[record['severity'].upper()], started, started, 1,
+                   [record['description']])
+
+    def merge(self, other: 'Alert'):
+        self.count += other.count
+        self.last_timestamp = max(self.last_timestamp, other.last_timestamp)
+        self.descriptions.extend(other.descriptions[:MAX_DESCRIPTIONS - len(self.descriptions)])
+
+    @property
+    def text(self) -> str:
+        more = f" (+{self.count - len(self.descriptions)} more)" if self.count > len(self.descriptions) else ""
+        return (f"⚠️ {self.count} {self.severity.name.lower()} safety violation(s) on {self.camera_id}: "
+                f"{', '.join(self.descriptions)}{more}")
+
+    def to_dict(self) -> dict:
+        return {
+            'text': self.text,  # Slack/Teams incoming webhooks show this field
+            'camera_id': self.camera_id,
+            'severity': self.severity.name.lower(),
+            'count': self.count,
+            'first_seen': datetime.fromtimestamp(self.timestamp).isoformat(),
+            'last_seen': datetime.fromtimestamp(self.last_timestamp).isoformat(),
+            'descriptions': self.descriptions,
+        }
+
+
+class WebhookSink:
+    """POSTs every alert as JSON; HTTP errors and timeouts raise, so the dispatcher retries"""
+
+    def __init__(self, url, timeout=5.0):
+        self.name = 'webhook'
+        self.url = url
+        self.timeout = timeout
+
+    async def send(self, alert: Alert):
+        await asyncio.to_thread(self._post, json.dumps(alert.to_dict()).encode())
+
+    def _post(self, body):
+        request = urllib.request.Request(self.url, data=body, method='POST',
+                                         headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+class FileSink:
+    """Drops every alert as its own JSON file, for a folder watcher or file share to pick up"""
+
+    def __init__(self, directory='alerts'):
+        self.name = 'file'
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    async def send(self, alert: Alert):
+        await asyncio.to_thread(self._write, alert)
+
+    def _write(self, alert):
+        started = datetime.fromtimestamp(alert.timestamp)
+        filename = f"{started:%Y%m%d_%H%M%S_%f}_{alert.camera_id}_{alert.severity.name.lower()}.json"
+        path = os.path.join(self.directory, filename.replace('/', '-'))  # Zone engines are named 'cam0/zone'
+        with open(path + '.tmp', 'w') as f:
+            json.dump(alert.to_dict(), f, indent=2)
+        os.replace(path + '.tmp', path)  # Watchers never see a half-written file
+
+
+class SyslogSink:
+    """Sends alerts to a syslog daemon over UDP (HIGH -> error, MEDIUM -> warning, LOW -> info)"""
+
+    LEVELS = {Severity.LOW: logging.INFO, Severity.MEDIUM: logging.WARNING, Severity.HIGH: logging.ERROR}
+
+    def __init__(self, address=('localhost', 514)):
+        self.name = 'syslog'
+        self.handler = logging.handlers.SysLogHandler(address=address)
+
+    async def send(self, alert: Alert):
+        record = logging.LogRecord('safety_monitor', self.LEVELS[alert.severity], __file__, 0, alert.text, None, None)
+        await asyncio.to_thread(self.handler.emit, record)
+
+
+class SheddingQueue:
+    """
+    Bounded queue of one sink's undelivered alerts. When full, the oldest
+    alert of the lowest severity is shed to make room - unless the new one
+    is less severe than everything queued, then the new one is. The most
+    severe (then oldest) alert is delivered first.
+
+    Like asyncio.Queue, alerts count as unfinished from put() until the
+    worker calls task_done() - after the send or its final failure - so
+    join() also waits for the alert being sent or retried.
+    Only used from the dispatcher's event loop.
+    """
+
+    def __init__(self, maxsize=100):
+        self.maxsize = maxsize
+        self._alerts = deque()
+        self._ready = asyncio.Event()
+        self._unfinished = 0
+        self._finished = asyncio.Event()
+        self._finished.set()
+
+    def __len__(self):
+        return len(self._alerts)
+
+    def put(self, alert: Alert):
+        """Returns: the shed alert, or None"""
+        shed = None
+        if len(self._alerts) >= self.maxsize:
+            lowest = min(self._alerts, key=lambda queued: queued.severity)
+            if lowest.severity > alert.severity:
+                return alert
+            self._alerts.remove(lowest)
+            shed = lowest
+        else:
+            self._unfinished += 1
+            self._finished.clear()
+
+        self._alerts.append(alert)
+        self._ready.set()
+        return shed
+
+    @property
+    def unfinished(self) -> int:
+        return self._unfinished
+
+    def task_done(self):
+        self._unfinished -= 1
+        if self._unfinished == 0:
+            self._finished.set()
+
+    async def join(self):
+        await self._finished.wait()
+
+    async def get(self) -> Alert:
+        while not self._alerts:
+            self._ready.clear()
+            await self._ready.wait()
+        alert = max(self._alerts, key=lambda queued: queued.severity)
+        self._alerts.remove(alert)
+        return alert
+
+
+class AlertDispatcher:
+    """
+    Delivers safety alerts to pluggable sinks from its own asyncio loop
+    (in a background thread), so notifications never stall the frame loop.
+
+    submit() only hands the incident to the loop (call_soon_threadsafe).
+    Incidents of the same camera and severity arriving within
+    coalesce_seconds become one alert with a count. Each sink has its own
+    worker and SheddingQueue, so a slow or failing sink only delays itself;
+    failed sends are retried with exponential backoff and jitter, and
+    while a sink is behind, low-severity alerts are shed first.
+
+    A sink is any object with a `name` and an `async send(alert)` that
+    raises on failure - see WebhookSink, FileSink and SyslogSink.
+    """
+
+    def __init__(self, sinks, coalesce_seconds=2.0, max_pending=100, max_retries=4, backoff_seconds=0.5,
+                 max_backoff_seconds=10.0, send_timeout=10.0, metrics=None):
+        self.sinks = list(sinks)
+        self.coalesce_seconds = coalesce_seconds
+        self.max_pending = max_pending
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.send_timeout = send_timeout
+
+        self.loop = None
+        self._thread = threading.Thread(target=self._run, name='alert-dispatcher', daemon=True)
+        self._started = threading.Event()
+        self._stopping = None
+        self._drain_seconds = 5.0
+        self._groups = {}  # (camera_id, severity) -> (Alert, release timer)
+        self._queues = {}
+
+        metrics = metrics or MetricsRegistry()
+        self._submitted = metrics.counter('alerts_submitted_total', "Incidents handed to the alert dispatcher")
+        self._coalesced = metrics.counter('alerts_coalesced_total', "Incidents merged into an earlier alert")
+        self._outcomes = {(sink.name, outcome): metrics.counter('alert_deliveries_total', "Alerts per sink and outcome",
+                                                                 sink=sink.name, outcome=outcome)
+                          for sink in self.sinks for outcome in ('sent', 'retried', 'failed', 'shed')}
+        for sink in self.sinks:
+            metrics.gauge('alert_queue_depth', "Alerts waiting for a sink", sink=sink.name,
+                          function=lambda name=sink.name: len(self._queues.get(name, ())))
+
+    def start(self):
+        self._thread.start()
+        self._started.wait()
+        return self
+
+    def stop(self, drain_seconds=5.0):
+        """Release coalesced alerts, give the sinks up to drain_seconds to deliver them, then stop"""
+        if self.loop is None:
+            return
+        self._drain_seconds = drain_seconds
+        self.loop.call_soon_threadsafe(self._stopping.set)
+        self._thread.join(timeout=drain_seconds + 1)
+
+    def submit(self, incident) -> bool:
+        """Queue an incident (SafetyIncident or dict) without blocking - Returns: False once stopped"""
+        try:
+            self.loop.call_soon_threadsafe(self._accept, Alert.from_incident(incident))
+        except (AttributeError, RuntimeError):  # Not started, or the loop is already closed
+            return False
+        self._submitted.inc()
+        return True
+
+    def stats(self, outcome) -> int:
+        return sum(counter.get() for (_, name), counter in self._outcomes.items() if name == outcome)
+
+    def _run(self):
+        self.loop = asyncio.new_event_loop()
+        try:
+            self.loop.run_until_complete(self._main())
+        finally:
+            self.loop.close()
+
+    async def _main(self):
+        self._stopping = asyncio.Event()
+        self._queues = {sink.name: SheddingQueue(self.max_pending) for sink in self.sinks}
+        workers = [asyncio.create_task(self._deliver(sink, self._queues[sink.name])) for sink in self.sinks]
+        self._started.set()
+
+        await self._stopping.wait()
+
+        for key in list(self._groups):
+            self._groups[key][1].cancel()
+            self._release(key)
+
+        try:  # Queued alerts and the ones being sent or waiting for a retry
+            await asyncio.wait_for(asyncio.gather(*(queue.join() for queue in self._queues.values())),
+                                   self._drain_seconds)
+        except asyncio.TimeoutError:
+            pending = sum(queue.unfinished for queue in self._queues.values())
+            print(f"⚠️ Alert dispatcher stopped with {pending} alert(s) undelivered")
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    def _accept(self, alert: Alert):
+        key = (alert.camera_id, alert.severity)
+        if key in self._groups:
+            self._groups[key][0].merge(alert)
+            self._coalesced.inc()
+            return
+        self._groups[key] = (alert, self.loop.call_later(self.coalesce_seconds, self._release, key))
+
+    def _release(self, key):
+        alert, _ = self._groups.pop(key)
+        for name, queue in self._queues.items():
+            shed = queue.put(alert)
+            if shed is not None:
+                self._outcomes[(name, 'shed')].inc()
+
+    async def _deliver(self, sink, queue: SheddingQueue):
+        while True:
+            alert = await queue.get()
+            try:
+                await self._send(sink, alert)
+            finally:
+                queue.task_done()
+
+    async def _send(self, sink, alert: Alert):
+        for attempt in range(self.max_retries + 1):
+            try:
+                await asyncio.wait_for(sink.send(alert), self.send_timeout)
+                self._outcomes[(sink.name, 'sent')].inc()
+                break
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if attempt == self.max_retries:
+                    self._outcomes[(sink.name, 'failed')].inc()
+                    print(f"⚠️ Alert to {sink.name} failed after {attempt + 1} attempts: {e}")
+                    break
+                self._outcomes[(sink.name, 'retried')].inc()
+                delay = min(self.max_backoff_seconds, self.backoff_seconds * 2 ** attempt)
+                await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+
+
+# Test the dispatcher
+if __name__ == "__main__":
+    import tempfile
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    print("Testing Alert Dispatcher...\n")
+
+    class StandInWebhook(BaseHTTPRequestHandler):
+        """Local stand-in for a notification service: fails the first requests, can be slow"""
+        fail_first = 0
+        delay = 0.0
+        received = []
+        request_times = []
+
+        @classmethod
+        def reset(cls, fail_first=0, delay=0.0):
+            cls.fail_first, cls.delay, cls.received, cls.request_times = fail_first, delay, [], []
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            StandInWebhook.request_times.append(time.monotonic())
+            time.sleep(StandInWebhook.delay)
+            status = 503 if len(StandInWebhook.request_times) <= StandInWebhook.fail_first else 200
+            if status == 200:
+                StandInWebhook.received.append(body)
+            self.send_response(status)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInWebhook)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_address[1]}/alerts'
+
+    def incident(camera_id, severity, worker, timestamp=None):
+        return {'camera_id': camera_id, 'severity': severity, 'description': f"Worker #{worker} without helmet",
+                'timestamp': datetime.fromtimestamp(timestamp or time.time()).isoformat()}
+
+    # 1. Coalescing: a burst becomes one alert per camera and severity, stamped with the first incident's time
+    StandInWebhook.reset()
+    started = time.time() - 60
+    with tempfile.TemporaryDirectory() as directory:
+        dispatcher = AlertDispatcher([WebhookSink(url), FileSink(directory)], coalesce_seconds=0.3).start()
+
+        start = time.perf_counter()
+        for worker in range(40):
+            dispatcher.submit(incident('cam0', 'medium', worker, started + worker))
+        for worker in range(5):
+            dispatcher.submit(incident('cam1', 'high', worker, started))
+        enqueue_us = (time.perf_counter() - start) * 1e6 / 45
+        dispatcher.stop()
+
+        counts = {alert['camera_id']: alert['count'] for alert in StandInWebhook.received}
+        assert counts == {'cam0': 40, 'cam1': 5}, counts
+        assert len(os.listdir(directory)) == 2
+        cam0 = next(alert for alert in StandInWebhook.received if alert['camera_id'] == 'cam0')
+        assert cam0['first_seen'] == datetime.fromtimestamp(started).isoformat(), cam0['first_seen']
+        assert cam0['last_seen'] == datetime.fromtimestamp(started + 39).isoformat(), cam0['last_seen']
+    print(f"  ✓ Coalescing: 45 incidents -> {len(StandInWebhook.received)} webhook alerts + 2 files "
+          f"({enqueue_us:.0f} µs per submit() on the frame loop)")
+    print(f"    {cam0['text'][:90]}...")
+
+    # 2. Retry with exponential backoff: two 503s, then delivered once
+    StandInWebhook.reset(fail_first=2)
+    dispatcher = AlertDispatcher([WebhookSink(url)], coalesce_seconds=0, backoff_seconds=0.1).start()
+    dispatcher.submit(incident('cam0', 'high', 1))
+    dispatcher.stop()
+
+    gaps = [b - a for a, b in zip(StandInWebhook.request_times, StandInWebhook.request_times[1:])]
+    assert len(StandInWebhook.received) == 1 and dispatcher.stats('retried') == 2, dispatcher.stats('retried')
+    assert 0.05 <= gaps[0] < 0.2 and 0.1 <= gaps[1] < 0.35, gaps  # 0.1 s, then 0.2 s, each x 0.5-1.0 jitter
+    print(f"  ✓ Retry: 2 failures, delivered on attempt 3 after {gaps[0] * 1000:.0f} + {gaps[1] * 1000:.0f} ms")
+
+    # 3. Backpressure: a slow webhook falls behind - low-severity alerts are shed, high ones all arrive
+    StandInWebhook.reset(delay=0.05)
+    dispatcher = AlertDispatcher([WebhookSink(url)], coalesce_seconds=0, max_pending=5).start()
+    for camera in range(30):
+        dispatcher.submit(incident(f'cam{camera}', 'low', 0))
+        if camera % 10 == 0:
+            dispatcher.submit(incident(f'cam{camera}', 'high', 0))
+        time.sleep(0.002)
+    dispatcher.stop()
+
+    delivered = [alert['severity'] for alert in StandInWebhook.received]
+    assert delivered.count('high') == 3, delivered
+    assert dispatcher.stats('shed') > 0 and dispatcher.stats('shed') + len(delivered) == 33, dispatcher.stats('shed')
+    print(f"  ✓ Backpressure: 33 alerts into a queue of 5 -> {dispatcher.stats('shed')} low shed, "
+          f"{delivered.count('high')}/3 high delivered")
+
+    # 4. Drain on stop: an alert still coalescing, whose first send fails, is retried and delivered by stop()
+    StandInWebhook.reset(fail_first=1)
+    dispatcher = AlertDispatcher([WebhookSink(url)], coalesce_seconds=30).start()
+    dispatcher.submit(incident('cam0', 'high', 7))
+    start = time.perf_counter()
+    dispatcher.stop(drain_seconds=5)
+
+    assert len(StandInWebhook.received) == 1 and dispatcher.stats('sent') == 1, StandInWebhook.received
+    assert not dispatcher.submit(incident('cam0', 'high', 8))
+    print(f"  ✓ Drain: stop() waited {(time.perf_counter() - start) * 1000:.0f} ms for the retry, "
+          f"alert delivered; submit() after stop returns False")
+
+    server.shutdown()
+    print("\n✅ All dispatcher checks passed")
@@ -0,0 +1,222 @@
+import argparse
+import json
+import math
+import os
+import time
+from multiprocessing import Pool
+
+import cv2
+import numpy as np
+from safety_decision_engine import SafetyDecisionEngine, DetectionBatch
+from incident_sink import IncidentSink
+from incident_stats import summarize_totals
+from inference_backend import load_model, backend_path, BACKEND_FILES
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp'}
+VIDEO_EXTENSIONS = {'.mp4', '.avi', '.mov', '.mkv', '.m4v'}
+
+# Set in every worker process by _init_worker
+_model = None
+
+
+def find_jobs(inputs, chunks=1, min_chunk=1):
+    """
+    One job per video file (its frames share worker tracks), while every
+    folder of images is split into up to `chunks` jobs of at least
+    min_chunk images, so a single folder still keeps every worker busy
+    Returns: list of (kind, path, image names or None, number of the first frame)
+    """
+
+    jobs = []
+    for path in inputs:
+        if os.path.isdir(path):
+            names = sorted(os.listdir(path))
+            images = [name for name in names if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS]
+            if images:
+                size = max(min_chunk, math.ceil(len(images) / chunks))
+                jobs += [('images', path, images[first:first + size], first + 1)
+                         for first in range(0, len(images), size)]
+            jobs += [('video', os.path.join(path, name), None, 1) for name in names
+                     if os.path.splitext(name)[1].lower() in VIDEO_EXTENSIONS]
+        elif os.path.splitext(path)[1].lower() in VIDEO_EXTENSIONS:
+            jobs.append(('video', path, None, 1))
+        else:
+            print(f"⚠️ Skipping {path} (not a video or image folder)")
+    return jobs
+
+
+def read_frames(kind, path, stride=1, names=None, first_frame=1):
+    """Decode one frame at a time so long videos never sit in memory"""
+    if kind == 'images':
+        for frame_num, name in enumerate(names, start=first_frame):
+            frame = cv2.imread(os.path.join(path, name))
+            if frame is not None:
+                yield frame_num, frame
+        return
+
+    video = cv2.VideoCapture(path)
+    frame_num = 0
+    while True:
+        success = video.grab()
+        if not success:
+            break
+        frame_num += 1
+        if frame_num % stride:
+            continue  # Skipped frames are never decoded, only grabbed
+        success, frame = video.retrieve()
+        if success:
+            yield frame_num, frame
+    video.release()
+
+
+def _init_worker(model_path, backend, threads):
+    """Load the model once per worker process"""
+    global _model
+
+    import torch
+
+    torch.set_num_threads(threads)  # Stop workers from fighting over the same cores
+    _model = load_model(backend, model_path)
+
+
+def report_name(path) -> str:
+    """Parent folder and name, so images/test and labels/test don't share a report"""
+    parent, name = os.path.split(os.path.normpath(os.path.abspath(path)))
+    return f'{os.path.basename(parent)}_{name}' if os.path.basename(parent) else name
+
+
+def audit_file(job, job_number, batch_size, stride, incident_dir):
+    """
+    Run one video / chunk of an image folder through the model, streaming
+    its incidents to a JSONL file of its own under incident_dir (so a long
+    video's incidents never have to fit in memory)
+    Returns: its partial report
+    """
+    kind, path, names, first_frame = job
+
+    prefix = f'{report_name(path)}-{job_number:04d}'
+    sink = IncidentSink(incident_dir, prefix=prefix)
+
+    # Frames of a video follow the same workers; loose images don't
+    engine = SafetyDecisionEngine(camera_id=report_name(path), track_workers=(kind == 'video'), sink=sink)
+    start = time.perf_counter()
+    frames = 0
+
+    def run(batch):
+        results = _model([frame for _, frame in batch], verbose=False)
+        for (frame_num, _), result in zip(batch, results):
+            engine.analyze_batch(DetectionBatch.from_result(result), frame_num)
+
+    batch = []
+    for frame_num, frame in read_frames(kind, path, stride, names, first_frame):
+        batch.append((frame_num, frame))
+        frames += 1
+        if len(batch) == batch_size:
+            run(batch)
+            batch = []
+    if batch:
+        run(batch)
+
+    engine.close_open_incidents()
+    sink.close()
+    seconds = time.perf_counter() - start
+
+    return {
+        'source': path,
+        'frames_analyzed': frames,
+        'seconds': seconds,
+        'totals': engine.statistics.session,
+        'incident_logs': sorted(os.path.join(incident_dir, name) for name in os.listdir(incident_dir)
+                                if name.startswith(f'{prefix}-')),
+    }
+
+
+def merge_reports(parts):
+    """One report per source from its chunks (seconds are summed worker time, so fps is per worker)"""
+    frames = sum(part['frames_analyzed'] for part in parts)
+    seconds = sum(part['seconds'] for part in parts)
+    return {
+        'source': parts[0]['source'],
+        'chunks': len(parts),
+        'frames_analyzed': frames,
+        'seconds': round(seconds, 2),
+        'fps': round(frames / seconds, 2) if seconds else 0.0,
+        'statistics': summarize_totals(np.sum([part['totals'] for part in parts], axis=0)),
+        'incident_logs': [log for part in parts for log in part['incident_logs']],  # JSON lines, see read_incidents()
+    }
+
+
+def save_report(report, output_dir, used_names) -> str:
+    """Write a source's report under a name no other source of this run has taken"""
+    name = base = report_name(report['source'])
+    suffix = 2
+    while name in used_names:
+        name, suffix = f'{base}_{suffix}', suffix + 1
+    used_names.add(name)
+
+    report_path = os.path.join(output_dir, f'{name}.json')
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    return report_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Audit recorded footage for helmet violations")
+    parser.add_argument('inputs', nargs='+', help="Video files and/or folders of images or videos")
+    parser.add_argument('--model', default='runs/detect/train6/weights/best.pt')
+    parser.add_argument('--backend', default='pytorch', choices=list(BACKEND_FILES))
+    parser.add_argument('--output', default='audit_reports', help="Folder for the per-file reports")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Worker processes")
+    parser.add_argument('--batch-size', type=int, default=8, help="Frames per model call")
+    parser.add_argument('--stride', type=int, default=1, help="Analyze every Nth video frame")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("🎞️ OFFLINE SAFETY AUDIT")
+    print("=" * 60)
+
+    if not os.path.exists(backend_path(args.backend, args.model)):
+        print(f"❌ Model not found at {backend_path(args.backend, args.model)}")
+        return
+
+    jobs = find_jobs(args.inputs, chunks=args.workers, min_chunk=args.batch_size)
+    if not jobs:
+        print("❌ Nothing to audit!")
+        return
+
+    os.makedirs(args.output, exist_ok=True)
+    workers = max(1, min(args.workers, len(jobs)))
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    sources = list(dict.fromkeys(path for _, path, _, _ in jobs))
+
+    print(f"📂 {len(sources)} source(s) in {len(jobs)} job(s), "
+          f"{workers} worker process(es) x {threads} thread(s)\n")
+
+    start = time.perf_counter()
+    total_frames = 0
+    used_names = set()
+
+    with Pool(workers, initializer=_init_worker, initargs=(args.model, args.backend, threads)) as pool:
+        incident_dir = os.path.join(args.output, 'incidents')
+        pending = [(job[1], pool.apply_async(audit_file, (job, number, args.batch_size, args.stride, incident_dir)))
+                   for number, job in enumerate(jobs)]
+        for source in sources:
+            report = merge_reports([result.get() for path, result in pending if path == source])
+            save_report(report, args.output, used_names)
+            total_frames += report['frames_analyzed']
+            stats = report['statistics']
+            print(f"✅ {report['source']}: {report['frames_analyzed']} frames at {report['fps']:.1f} FPS "
+                  f"per worker, {stats['total_incidents']} incident(s)")
+
+    seconds = time.perf_counter() - start
+    cores = workers * threads
+
+    print("\n" + "=" * 60)
+    print(f"📊 {total_frames} frames in {seconds:.1f} s: {total_frames / seconds:.1f} FPS total, "
+          f"{total_frames / seconds / cores:.2f} FPS per core")
+    print(f"📄 Reports saved in {args.output}/, incidents in {args.output}/incidents/")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+import time
+import numpy as np
+from helmet_association import associate_helmets
+
+print("=" * 60)
+print("⏱️ HELMET ASSOCIATION MICRO-BENCHMARK")
+print("=" * 60)
+
+
+def make_crowd(people, rng, helmet_share=0.8):
+    """Random crowd where most people wear a helmet on their head"""
+    person_boxes = np.column_stack([
+        rng.uniform(0, 1920, people),
+        rng.uniform(100, 1080, people),
+        rng.uniform(30, 80, people),
+        rng.uniform(80, 200, people),
+    ]).astype(np.float32)
+
+    wearing = person_boxes[rng.random(people) < helmet_share]
+    helmet_boxes = np.column_stack([
+        wearing[:, 0],
+        wearing[:, 1] - wearing[:, 3] * 0.4,  # On top of the head
+        wearing[:, 2] * 0.6,
+        wearing[:, 3] * 0.15,
+    ]).astype(np.float32)
+
+    return person_boxes, helmet_boxes
+
+
+rng = np.random.default_rng(0)
+repeats = 200
+
+print(f"\n{'people':>8} {'helmets':>8} {'ms/frame':>10} {'unprotected':>12}")
+for people in [5, 20, 50, 100, 200, 400]:
+    person_boxes, helmet_boxes = make_crowd(people, rng)
+    associate_helmets(person_boxes, helmet_boxes)  # Warm-up
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        result = associate_helmets(person_boxes, helmet_boxes)
+    elapsed_ms = (time.perf_counter() - start) / repeats * 1000
+
+    print(f"{people:>8} {len(helmet_boxes):>8} {elapsed_ms:>10.3f} {len(result.unprotected):>12}")
+
+print("\n✅ Benchmark complete!")
+print("=" * 60)
@@ -0,0 +1,69 @@
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from datetime import datetime
+from safety_decision_engine import SafetyIncident, IncidentType, Severity
+
+print("=" * 60)
+print("🧮 INCIDENT MEMORY BENCHMARK")
+print("=" * 60)
+
+INCIDENTS = 100_000
+
+
+@dataclass
+class LegacyIncident:
+    """The original SafetyIncident: ISO strings, free text, string codes"""
+    timestamp: str
+    incident_type: str
+    severity: str
+    description: str
+    frame_number: int
+    camera_id: str = 'cam0'
+    bboxes: list = field(default_factory=list)
+
+
+def make_legacy(i):
+    return LegacyIncident(
+        timestamp=datetime.now().isoformat(),
+        incident_type='no_helmet',
+        severity='medium',
+        description=f"{i % 3 + 1} person/people without helmet",
+        frame_number=i,
+        bboxes=[(100.0 + i % 50, 200.0, 50.0, 120.0)]
+    )
+
+
+def make_compact(i):
+    return SafetyIncident(
+        timestamp=time.time(),
+        incident_type=IncidentType.NO_HELMET,
+        severity=Severity.MEDIUM,
+        frame_number=i,
+        unprotected_count=i % 3 + 1,
+        bboxes=[(100.0 + i % 50, 200.0, 50.0, 120.0)]
+    )
+
+
+def bytes_per_incident(factory):
+    """Heap held per record when INCIDENTS of them are kept in a list"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+
+    records = [factory(i) for i in range(INCIDENTS)]
+
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return used / INCIDENTS
+
+
+legacy = bytes_per_incident(make_legacy)
+compact = bytes_per_incident(make_compact)
+
+print(f"\n📦 {INCIDENTS:,} incidents")
+print(f"  Before (dataclass + strings): {legacy:7.0f} bytes/incident")
+print(f"  After  (slots + enum codes):  {compact:7.0f} bytes/incident")
+print(f"  Saving: {(1 - compact / legacy) * 100:.0f}%")
+
+print("\n✅ Benchmark complete!")
+print("=" * 60)
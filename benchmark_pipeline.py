@@ -0,0 +1,193 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import time
+from datetime import datetime
+
+import cv2
+import numpy as np
+from dataset_config import split_images
+from inference_backend import DEFAULT_WEIGHTS, BACKEND_FILES, load_model
+from safety_decision_engine import SafetyDecisionEngine, DetectionBatch
+
+try:
+    import resource  # Not available on Windows
+except ImportError:
+    resource = None
+
+STAGES = ['decode', 'preprocess', 'inference', 'postprocess', 'box_extraction',
+          'decision', 'plot', 'overlay', 'total']
+
+
+def make_synthetic_video(path, frame_size=(1280, 720), fps=30, frames_per_image=15):
+    """Stitch the test images into a video so decoding is measured too"""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, frame_size)
+    frames = 0
+    for image_path in split_images('test'):
+        frame = cv2.resize(cv2.imread(image_path), frame_size)
+        for _ in range(frames_per_image):
+            writer.write(frame)
+            frames += 1
+    writer.release()
+    return frames
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if platform.system() == 'Darwin' else peak / 1024  # bytes on macOS, KB on Linux
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def percentiles(samples):
+    samples = np.asarray(samples)
+    return {
+        'p50_ms': float(np.percentile(samples, 50)),
+        'p95_ms': float(np.percentile(samples, 95)),
+        'p99_ms': float(np.percentile(samples, 99)),
+        'mean_ms': float(samples.mean()),
+    }
+
+
+def run_benchmark(model, video_path, imgsz, warmup=5):
+    """Time every stage of the monitor's per-frame work on the synthetic video"""
+    engine = SafetyDecisionEngine()
+    timings = {stage: [] for stage in STAGES}
+    video = cv2.VideoCapture(video_path)
+    frame_num = 0
+
+    while True:
+        start = time.perf_counter()
+        success, frame = video.read()
+        decoded = time.perf_counter()
+        if not success:
+            break
+        frame_num += 1
+
+        results = model(frame, imgsz=imgsz, verbose=False)
+        inferred = time.perf_counter()
+
+        batch = DetectionBatch.from_result(results[0])
+        extracted = time.perf_counter()
+
+        decision = engine.analyze_batch(batch, frame_num)
+        decided = time.perf_counter()
+
+        annotated = results[0].plot()
+        plotted = time.perf_counter()
+
+        # Same four text lines the monitor draws
+        cv2.putText(annotated, engine.get_alert_message(decision), (10, 30),
+                    cv2.FONT_HERSHEY_SIMPLEX, 1, engine.get_alert_color(decision), 2)
+        cv2.putText(annotated, f"Helmets: {decision['protected']}/{decision['people']} worn", (10, 70),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
+        cv2.putText(annotated, "Violations Detected: 0", (10, 110),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 2)
+        cv2.putText(annotated, "Press V to see violations | Q=Quit", (10, annotated.shape[0] - 20),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (200, 200, 200), 1)
+        done = time.perf_counter()
+
+        if frame_num <= warmup:
+            continue
+
+        # ultralytics reports its own split of the model() call
+        speed = results[0].speed
+        timings['decode'].append((decoded - start) * 1000)
+        timings['preprocess'].append(speed['preprocess'])
+        timings['inference'].append(speed['inference'])
+        timings['postprocess'].append(speed['postprocess'])
+        timings['box_extraction'].append((extracted - inferred) * 1000)
+        timings['decision'].append((decided - extracted) * 1000)
+        timings['plot'].append((plotted - decided) * 1000)
+        timings['overlay'].append((done - plotted) * 1000)
+        timings['total'].append((done - start) * 1000)
+
+    video.release()
+    return timings
+
+
+def compare(old_path, new_path):
+    """Print p50 changes between two saved benchmark results"""
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+
+    print(f"\n{'stage':<16} {'old p50':>9} {'new p50':>9} {'change':>8}")
+    for stage in STAGES:
+        before, after = old['stages'][stage]['p50_ms'], new['stages'][stage]['p50_ms']
+        change = (after - before) / before * 100 if before else 0.0
+        print(f"{stage:<16} {before:>9.2f} {after:>9.2f} {change:>+7.0f}%")
+    print(f"{'fps':<16} {old['fps']:>9.1f} {new['fps']:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Camera-free performance benchmark of the monitoring pipeline")
+    parser.add_argument('--weights', default=DEFAULT_WEIGHTS)
+    parser.add_argument('--backend', default='pytorch', choices=list(BACKEND_FILES))
+    parser.add_argument('--imgsz', type=int, default=416)
+    parser.add_argument('--output', default='benchmarks', help="Folder for results and the synthetic video")
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help="Compare two result files")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    print("=" * 60)
+    print("⏱️ SAFETY PIPELINE BENCHMARK")
+    print("=" * 60)
+
+    os.makedirs(args.output, exist_ok=True)
+    video_path = os.path.join(args.output, 'synthetic_test.mp4')
+    if not os.path.exists(video_path):
+        frames = make_synthetic_video(video_path)
+        print(f"🎞️ Built synthetic video: {frames} frames from images/test")
+
+    print(f"📥 Loading model ({args.backend})...")
+    model = load_model(args.backend, args.weights)
+
+    print("🏃 Running...")
+    timings = run_benchmark(model, video_path, args.imgsz)
+
+    total_seconds = sum(timings['total']) / 1000
+    result = {
+        'timestamp': datetime.now().isoformat(),
+        'commit': git_commit(),
+        'backend': args.backend,
+        'imgsz': args.imgsz,
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'frames': len(timings['total']),
+        'fps': len(timings['total']) / total_seconds if total_seconds else 0.0,
+        'peak_rss_mb': peak_rss_mb(),
+        'stages': {stage: percentiles(samples) for stage, samples in timings.items()},
+    }
+
+    print(f"\n{'stage':<16} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for stage, stats in result['stages'].items():
+        print(f"{stage:<16} {stats['p50_ms']:>8.2f} {stats['p95_ms']:>8.2f} {stats['p99_ms']:>8.2f}")
+    print(f"\n🚀 {result['fps']:.1f} FPS end-to-end over {result['frames']} frames")
+    if result['peak_rss_mb'] is not None:
+        print(f"🧠 Peak RSS: {result['peak_rss_mb']:.0f} MB")
+
+    result_path = os.path.join(args.output, f"{datetime.now():%Y%m%d_%H%M%S}_{result['commit'] or 'nogit'}_{args.backend}.json")
+    with open(result_path, 'w') as f:
+        json.dump(result, f, indent=2)
+    print(f"📄 Saved results to {result_path}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+import argparse
+import json
+import os
+import time
+from datetime import datetime
+
+import cv2
+import numpy as np
+from dataset_config import split_images, label_path
+from helmet_association import xywh_to_xyxy
+from inference_backend import DEFAULT_WEIGHTS, BACKEND_FILES, load_model
+from safety_decision_engine import DetectionBatch
+from tiled_inference import TiledDetector
+
+
+def read_label_boxes(path, width, height) -> np.ndarray:
+    """
+    Ground-truth boxes of a YOLO label file in pixels (x1, y1, x2, y2)
+    (handles both 'cls cx cy w h' lines and polygon lines)
+    """
+    boxes = []
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                values = [float(value) for value in line.split()[1:]]
+                if len(values) == 4:
+                    boxes.append(xywh_to_xyxy(np.array(values))[0])
+                elif len(values) >= 6:
+                    points = np.array(values).reshape(-1, 2)
+                    boxes.append(np.concatenate([points.min(axis=0), points.max(axis=0)]))
+    boxes = np.array(boxes, dtype=np.float32).reshape(-1, 4)
+    return boxes * [width, height, width, height]
+
+
+def make_mosaics(canvas_size=(3840, 2160), grid=3):
+    """
+    High-resolution frames where helmets are far away: grid x grid test
+    images upscaled into one 4K canvas, each one a 1/grid-size view
+    Yields: (frame, ground-truth xyxy boxes)
+    """
+    width, height = canvas_size
+    cell_width, cell_height = width // grid, height // grid
+    paths = split_images('test')
+
+    for start in range(0, len(paths) - grid * grid + 1, grid * grid):
+        canvas = np.zeros((height, width, 3), dtype=np.uint8)
+        truth = []
+        for cell, path in enumerate(paths[start:start + grid * grid]):
+            x, y = (cell % grid) * cell_width, (cell // grid) * cell_height
+            canvas[y:y + cell_height, x:x + cell_width] = cv2.resize(cv2.imread(path), (cell_width, cell_height))
+            truth.append(read_label_boxes(label_path(path), cell_width, cell_height) + [x, y, x, y])
+        yield canvas, np.concatenate(truth)
+
+
+def recall(truth_xyxy, batch: DetectionBatch, iou_threshold=0.5):
+    """Found / total ground-truth boxes (class-agnostic - the model has one class)"""
+    if len(truth_xyxy) == 0:
+        return 0, 0
+    if len(batch) == 0:
+        return 0, len(truth_xyxy)
+
+    predicted = xywh_to_xyxy(batch.boxes)
+    top_left = np.maximum(truth_xyxy[:, None, :2], predicted[None, :, :2])
+    bottom_right = np.minimum(truth_xyxy[:, None, 2:], predicted[None, :, 2:])
+    intersection = np.prod(np.clip(bottom_right - top_left, 0, None), axis=2)
+    truth_areas = np.prod(truth_xyxy[:, 2:] - truth_xyxy[:, :2], axis=1)
+    predicted_areas = np.prod(predicted[:, 2:] - predicted[:, :2], axis=1)
+    iou = intersection / (truth_areas[:, None] + predicted_areas[None, :] - intersection + 1e-9)
+    return int(np.count_nonzero(iou.max(axis=1) >= iou_threshold)), len(truth_xyxy)
+
+
+def run(name, detect, mosaics):
+    found = total = 0
+    latencies = []
+    for frame, truth in mosaics:
+        start = time.perf_counter()
+        batch = detect(frame)
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits, count = recall(truth, batch)
+        found += hits
+        total += count
+
+    return {
+        'mode': name,
+        'recall': found / total if total else 0.0,
+        'boxes': total,
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p95_ms': float(np.percentile(latencies, 95)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall and latency of tiled vs. single-pass inference on 4K mosaics")
+    parser.add_argument('--weights', default=DEFAULT_WEIGHTS)
+    parser.add_argument('--backend', default='pytorch', choices=list(BACKEND_FILES))
+    parser.add_argument('--imgsz', type=int, default=416)
+    parser.add_argument('--grid', type=int, default=3, help="Test images per mosaic side")
+    parser.add_argument('--max-tiles', type=int, nargs='+', default=[4, 8, 12])
+    parser.add_argument('--output', default='benchmarks')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("🧩 TILED INFERENCE BENCHMARK")
+    print("=" * 60)
+
+    model = load_model(args.backend, args.weights)
+    mosaics = list(make_mosaics(grid=args.grid))
+    print(f"🖼️ {len(mosaics)} 4K mosaics of {args.grid}x{args.grid} test images")
+
+    model(mosaics[0][0], imgsz=args.imgsz, verbose=False)  # Warm-up
+    rows = [run('single pass', lambda frame: DetectionBatch.from_result(model(frame, imgsz=args.imgsz, verbose=False)[0]),
+                mosaics)]
+
+    for max_tiles in args.max_tiles:
+        tiler = TiledDetector(model, args.imgsz, max_tiles=max_tiles)
+        grid = len(tiler.plan(mosaics[0][0].shape))
+        rows.append(run(f'tiled ({grid} tiles + full)', lambda frame: tiler.detect([frame])[0], mosaics))
+
+    baseline = rows[0]
+    print(f"\n{'mode':<24} {'recall':>7} {'p50 ms':>8} {'p95 ms':>8} {'cost':>6}")
+    for row in rows:
+        print(f"{row['mode']:<24} {row['recall']:>7.3f} {row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} "
+              f"{row['p50_ms'] / baseline['p50_ms']:>5.1f}x")
+
+    os.makedirs(args.output, exist_ok=True)
+    result_path = os.path.join(args.output, f"{datetime.now():%Y%m%d_%H%M%S}_tiling_{args.backend}.json")
+    with open(result_path, 'w') as f:
+        json.dump(rows, f, indent=2)
+    print(f"\n📄 Saved results to {result_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,365 @@
+import json
+import math
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+
+import cv2
+import numpy as np
+
+
+class FrameRing:
+    """
+    The last `capacity` frames of one camera in one preallocated block of
+    shared memory, so another process can read them without copies
+    through a pipe. Layout: write head, per-slot sequence numbers and
+    timestamps, then the (capacity, height, width, 3) frames.
+
+    A slot's sequence number is set to -1 while it is being overwritten,
+    and read() checks it before and after copying, so a reader never
+    returns a frame that changed under it.
+    """
+
+    def __init__(self, capacity, height, width, name=None):
+        self.capacity = capacity
+        self.height = height
+        self.width = width
+        self.owner = name is None
+
+        frame_bytes = capacity * height * width * 3
+        if self.owner:
+            self.shm = SharedMemory(create=True, size=8 + capacity * 16 + frame_bytes)
+        else:
+            self.shm = SharedMemory(name=name)
+            resource_tracker.unregister(self.shm._name, 'shared_memory')  # The creator unlinks it, not us
+        self.name = self.shm.name
+
+        buffer = self.shm.buf
+        self.head = np.ndarray((1,), np.int64, buffer, 0)  # Sequence number of the next frame
+        self.sequences = np.ndarray((capacity,), np.int64, buffer, 8)
+        self.timestamps = np.ndarray((capacity,), np.float64, buffer, 8 + capacity * 8)
+        self.frames = np.ndarray((capacity, height, width, 3), np.uint8, buffer, 8 + capacity * 16)
+        if self.owner:
+            self.head[0] = 0
+            self.sequences[:] = -1
+
+    @property
+    def nbytes(self) -> int:
+        return self.shm.size
+
+    def push(self, frame, timestamp):
+        """Copy (or resize) a frame into the next slot - no allocation"""
+        sequence = int(self.head[0])
+        slot = sequence % self.capacity
+
+        self.sequences[slot] = -1
+        if frame.shape[:2] == (self.height, self.width):
+            np.copyto(self.frames[slot], frame)
+        else:
+            cv2.resize(frame, (self.width, self.height), dst=self.frames[slot], interpolation=cv2.INTER_AREA)
+        self.timestamps[slot] = timestamp
+        self.sequences[slot] = sequence
+        self.head[0] = sequence + 1
+
+    def read(self, sequence):
+        """Returns: (copy of the frame, timestamp), or None if it was overwritten already"""
+        slot = sequence % self.capacity
+        if self.sequences[slot] != sequence:
+            return None
+        frame, timestamp = self.frames[slot].copy(), float(self.timestamps[slot])
+        if self.sequences[slot] != sequence:
+            return None
+        return frame, timestamp
+
+    def first_after(self, timestamp) -> int:
+        """Sequence number of the oldest frame still held that was taken at or after timestamp"""
+        head = int(self.head[0])
+        for sequence in range(max(0, head - self.capacity), head):
+            slot = sequence % self.capacity
+            if self.sequences[slot] == sequence and self.timestamps[slot] >= timestamp:
+                return sequence
+        return head
+
+    def close(self):
+        del self.head, self.sequences, self.timestamps, self.frames  # Views must go before the block can
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class ClipRecorder:
+    """
+    Pre-roll evidence clips of violations.
+
+    push() keeps the last pre + post + slack seconds of every camera at
+    `fps` in a FrameRing (memory is allocated once, on a camera's first
+    frame: frames are scaled to at most max_width, and memory_bytes tells
+    the total). request_clip() is what SafetyDecisionEngine calls for a new
+    incident: it only queues a command and returns the path the clip will
+    have, which goes into the incident record. A separate encoder process
+    (run_encoder) reads the frames straight from shared memory, writes the
+    clip from pre_seconds before the incident to post_seconds after it,
+    plus a thumbnail of the moment it was raised with the unprotected
+    workers boxed - the capture and detection threads never wait for it.
+
+    It runs as `python -c` rather than multiprocessing, whose spawn mode
+    would re-run the monitor script in the child.
+    """
+
+    def __init__(self, output_dir='clips', pre_seconds=5.0, post_seconds=5.0, fps=10, max_width=640,
+                 slack_seconds=3.0):
+        self.output_dir = os.path.abspath(output_dir)
+        self.pre_seconds = pre_seconds
+        self.post_seconds = post_seconds
+        self.fps = fps
+        self.max_width = max_width
+        self.capacity = math.ceil((pre_seconds + post_seconds + slack_seconds) * fps)
+
+        self.rings = {}
+        self.clips_requested = 0
+        self.clips_saved = 0
+        self.completed = []  # Encoder reports: {'clip', 'thumbnail', 'frames', 'skipped'}
+
+        self._source_shapes = {}
+        self._next_push = {}
+        self._commands = queue.Queue()
+        self._process = None
+        self._threads = []
+
+        os.makedirs(self.output_dir, exist_ok=True)
+
+    @property
+    def memory_bytes(self) -> int:
+        return sum(ring.nbytes for ring in self.rings.values())
+
+    def start(self):
+        here = os.path.dirname(os.path.abspath(__file__))
+        self._process = subprocess.Popen([sys.executable, '-c', 'from clip_recorder import run_encoder; run_encoder()'],
+                                         cwd=here, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+        for target, name in ((self._feed_encoder, 'clip-commands'), (self._collect_results, 'clip-results')):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self, timeout=None):
+        """Finish the clips still recording with the frames there are, then free the shared memory"""
+        if self._process is None:
+            return
+        self._commands.put(None)
+        try:
+            self._process.wait(timeout=timeout or self.post_seconds + 10)
+        except subprocess.TimeoutExpired:
+            self._process.kill()
+        for thread in self._threads:
+            thread.join(timeout=1)
+        for ring in self.rings.values():
+            ring.close()
+        self.rings = {}
+        self._process = None
+
+    def push(self, camera_id, frame):
+        """Offer a captured frame (called from the capture thread); kept only every 1/fps seconds"""
+        now = time.time()
+        due = self._next_push.get(camera_id, 0.0)
+        if now < due:
+            return
+        interval = 1 / self.fps
+        self._next_push[camera_id] = due + interval if now - due < interval else now + interval  # Keep the pace
+
+        ring = self.rings.get(camera_id)
+        if ring is None:
+            height, width = frame.shape[:2]
+            scale = min(1.0, self.max_width / width)
+            ring = FrameRing(self.capacity, int(height * scale) // 2 * 2, int(width * scale) // 2 * 2)
+            self._source_shapes[camera_id] = (height, width)
+            self.rings[camera_id] = ring
+            self._commands.put({'ring': camera_id, 'name': ring.name, 'capacity': ring.capacity,
+                                'height': ring.height, 'width': ring.width, 'fps': self.fps})
+        ring.push(frame, now)
+
+    def request_clip(self, incident) -> str:
+        """
+        Queue the clip of a SafetyIncident without blocking
+        Returns: path the clip will be written to ('' when the camera has no frames yet)
+        """
+
+        camera_id = incident.camera_id.split('/')[0]  # Zone engines are named 'cam0/zone'
+        ring = self.rings.get(camera_id)
+        if ring is None or self._process is None:
+            return ''
+
+        height, width = self._source_shapes[camera_id]
+        scale_x, scale_y = ring.width / width, ring.height / height
+        bboxes = incident.bboxes
+        boxes = [[(x - w / 2) * scale_x, (y - h / 2) * scale_y, (x + w / 2) * scale_x, (y + h / 2) * scale_y]
+                 for x, y, w, h in (bboxes[i:i + 4] for i in range(0, len(bboxes), 4))]
+
+        started = datetime.fromtimestamp(incident.timestamp)
+        name = f"{started:%Y%m%d_%H%M%S}_{incident.camera_id.replace('/', '-')}_{incident.frame_number}"
+        path = os.path.join(self.output_dir, f'{name}.mp4')
+
+        self._commands.put({'clip': path, 'camera': camera_id, 'trigger': incident.timestamp, 'boxes': boxes,
+                            'start': incident.timestamp - self.pre_seconds,
+                            'end': incident.timestamp + self.post_seconds})
+        self.clips_requested += 1
+        return path
+
+    def _feed_encoder(self):
+        while True:
+            command = self._commands.get()
+            try:
+                if command is None:
+                    self._process.stdin.close()
+                    return
+                self._process.stdin.write(json.dumps(command) + '\n')
+                self._process.stdin.flush()
+            except (BrokenPipeError, ValueError):
+                return
+
+    def _collect_results(self):
+        for line in self._process.stdout:
+            try:
+                report = json.loads(line)
+            except ValueError:
+                report = None
+            if not isinstance(report, dict) or 'clip' not in report:  # Something else the encoder printed
+                print(f"🎬 Encoder: {line.rstrip()}")
+                continue
+            self.completed.append(report)
+            self.clips_saved += 1
+            print(f"🎬 Violation clip: {report['clip']} ({report['frames']} frames)")
+
+
+class _ClipJob:
+    """One clip being written by the encoder process, frame by frame as they reach the ring"""
+
+    def __init__(self, ring: FrameRing, command, fps):
+        self.ring = ring
+        self.command = command
+        self.path = command['clip']
+        self.partial_path = self.path[:-len('.mp4')] + '.part.mp4'
+        self.next_sequence = ring.first_after(command['start'])
+        self.writer = cv2.VideoWriter(self.partial_path, cv2.VideoWriter_fourcc(*'mp4v'), fps,
+                                      (ring.width, ring.height))
+        self.thumbnail = None
+        self.frames = 0
+        self.skipped = 0  # Overwritten before the encoder got to them
+
+    def advance(self) -> bool:
+        """Write the frames that arrived since the last call - Returns: True once past the end"""
+        while self.next_sequence < int(self.ring.head[0]):
+            item = self.ring.read(self.next_sequence)
+            self.next_sequence += 1
+            if item is None:
+                self.skipped += 1
+                continue
+
+            frame, timestamp = item
+            if timestamp > self.command['end']:
+                return True
+            self.writer.write(frame)
+            self.frames += 1
+            if self.thumbnail is None and timestamp >= self.command['trigger']:
+                self.thumbnail = frame
+        return time.time() > self.command['end'] + 2.0  # Camera stopped delivering
+
+    def finish(self) -> dict:
+        self.writer.release()
+        os.replace(self.partial_path, self.path)
+
+        thumbnail_path = self.path[:-len('.mp4')] + '.jpg'
+        if self.thumbnail is not None:
+            for x1, y1, x2, y2 in self.command['boxes']:
+                cv2.rectangle(self.thumbnail, (int(x1), int(y1)), (int(x2), int(y2)), (0, 0, 255), 2)
+            cv2.imwrite(thumbnail_path, self.thumbnail)
+        return {'clip': self.path, 'thumbnail': thumbnail_path if self.thumbnail is not None else None,
+                'frames': self.frames, 'skipped': self.skipped}
+
+
+def run_encoder():
+    """
+    Encoder process: JSON commands on stdin (ring announcements and clip
+    requests), one JSON report per finished clip on stdout
+    """
+
+    commands = queue.Queue()
+
+    def read_commands():
+        for line in sys.stdin:
+            commands.put(json.loads(line))
+        commands.put(None)
+
+    threading.Thread(target=read_commands, daemon=True).start()
+
+    rings, frame_rates, jobs = {}, {}, []
+    running = True
+    while running or jobs:
+        try:
+            command = commands.get(timeout=0.05) if running else None
+        except queue.Empty:
+            command = False
+
+        if command is None:
+            running = False
+        elif command and 'ring' in command:
+            rings[command['ring']] = FrameRing(command['capacity'], command['height'], command['width'],
+                                               name=command['name'])
+            frame_rates[command['ring']] = command['fps']
+        elif command:
+            jobs.append(_ClipJob(rings[command['camera']], command, frame_rates[command['camera']]))
+
+        for job in list(jobs):
+            if job.advance() or not running:
+                print(json.dumps(job.finish()), flush=True)
+                jobs.remove(job)
+
+    for ring in rings.values():
+        ring.close()
+
+
+# Test the recorder
+if __name__ == "__main__":
+    import tempfile
+    from safety_decision_engine import SafetyIncident, IncidentType, Severity
+
+    print("Testing Clip Recorder...\n")
+
+    with tempfile.TemporaryDirectory() as directory:
+        recorder = ClipRecorder(directory, pre_seconds=1.0, post_seconds=1.0, fps=20).start()
+
+        frame = np.zeros((720, 1280, 3), dtype=np.uint8)
+        push_ms, request_ms, path = [], 0.0, None
+        for i in range(80):  # 3.2 s of a 25 FPS camera
+            frame[:] = 0
+            cv2.circle(frame, (100 + i * 14, 360), 40, (0, 200, 255), -1)
+
+            start = time.perf_counter()
+            recorder.push('cam0', frame)
+            push_ms.append((time.perf_counter() - start) * 1000)
+
+            if i == 40:
+                incident = SafetyIncident(time.time(), IncidentType.NO_HELMET, Severity.MEDIUM, i, 'cam0',
+                                          bboxes=[(100 + i * 14, 360, 90, 90)])
+                start = time.perf_counter()
+                path = recorder.request_clip(incident)
+                request_ms = (time.perf_counter() - start) * 1000
+            time.sleep(0.04)
+
+        print(f"  Ring memory: {recorder.memory_bytes / 1e6:.1f} MB for {recorder.capacity} frames (fixed)")
+        print(f"  push(): first {push_ms[0]:.2f} ms (allocates the ring), then max {max(push_ms[1:]):.2f} ms; "
+              f"request_clip(): {request_ms:.2f} ms")
+
+        recorder.stop()
+        clip = cv2.VideoCapture(path)
+        frames = int(clip.get(cv2.CAP_PROP_FRAME_COUNT))
+        clip.release()
+        print(f"  Clip: {os.path.basename(path)} with {frames} frames "
+              f"(~{recorder.pre_seconds + recorder.post_seconds:.0f} s at {recorder.fps} FPS)")
+        print(f"  Thumbnail written: {os.path.exists(recorder.completed[0]['thumbnail'])}")
@@ -0,0 +1,253 @@
+import argparse
+import json
+import os
+from functools import partial
+
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+from ultralytics import YOLO
+from ultralytics.nn.modules import Bottleneck, Conv, Detect
+from dataset_config import local_data_yaml
+from inference_backend import DEFAULT_WEIGHTS
+from sweep_models import measure_latency
+from train_helmet_model import CachedDetectionTrainer
+
+PROJECT = 'runs/compress'
+
+
+def distillation_loss(student_feats, teacher_feats, reg_max=16, temperature=2.0):
+    """
+    Logit distillation for YOLOv8 heads of the same strides: class scores
+    are matched with soft-target BCE and every box side's distance
+    distribution (reg_max bins) with KL divergence. Each anchor is weighted
+    by the teacher's confidence, so the many empty background cells don't
+    drown out the few that see a helmet.
+    """
+
+    batch_size, outputs = student_feats[0].shape[:2]
+    student = torch.cat([feat.reshape(batch_size, outputs, -1) for feat in student_feats], 2)
+    teacher = torch.cat([feat.reshape(batch_size, outputs, -1) for feat in teacher_feats], 2)
+    student_box, student_cls = student.split((reg_max * 4, outputs - reg_max * 4), 1)
+    teacher_box, teacher_cls = teacher.split((reg_max * 4, outputs - reg_max * 4), 1)
+
+    weight = teacher_cls.sigmoid().amax(1)  # (batch, anchors)
+    cls = F.binary_cross_entropy_with_logits(student_cls / temperature, (teacher_cls / temperature).sigmoid(),
+                                             reduction='none').mean(1)
+
+    student_dist = (student_box.reshape(batch_size, 4, reg_max, -1) / temperature).log_softmax(2)
+    teacher_dist = (teacher_box.reshape(batch_size, 4, reg_max, -1) / temperature).log_softmax(2)
+    box = (teacher_dist.exp() * (teacher_dist - student_dist)).sum(2).mean(1)
+
+    return ((cls + box) * weight).sum() / weight.sum().clamp(min=1.0) * temperature ** 2
+
+
+class DistillationLoss:
+    """The student's own detection loss plus distillation_loss against a frozen teacher"""
+
+    def __init__(self, student, teacher, weight=1.0, temperature=2.0):
+        self.detection_loss = student.init_criterion()
+        self.teacher = teacher
+        self.weight = weight
+        self.temperature = temperature
+        self.reg_max = student.model[-1].reg_max
+
+    def __call__(self, preds, batch):
+        loss, loss_items = self.detection_loss(preds, batch)
+        feats = preds[1] if isinstance(preds, tuple) else preds
+        with torch.no_grad():
+            teacher_feats = self.teacher(batch['img'])[1]  # Eval mode returns (decoded boxes, raw head outputs)
+
+        distill = distillation_loss(feats, teacher_feats, self.reg_max, self.temperature)
+        return loss.sum() + self.weight * distill * batch['img'].shape[0], loss_items
+
+
+class DistillationTrainer(CachedDetectionTrainer):
+    """
+    CachedDetectionTrainer that trains the student against a teacher checkpoint.
+
+    The loss is attached once the EMA copy exists (on_pretrain_routine_end),
+    so the teacher never ends up inside a saved checkpoint - best.pt stays
+    a plain ultralytics DetectionModel. keep_model=True trains the given
+    model as it is (a pruned one) instead of rebuilding it from its yaml.
+    """
+
+    def __init__(self, *args, teacher=DEFAULT_WEIGHTS, distill_weight=1.0, temperature=2.0, keep_model=False,
+                 **kwargs):
+        super().__init__(*args, **kwargs)
+        self.teacher_weights = teacher
+        self.distill_weight = distill_weight
+        self.temperature = temperature
+        self.keep_model = keep_model
+        self.add_callback('on_pretrain_routine_end', self.attach_teacher)
+
+    def get_model(self, cfg=None, weights=None, verbose=True):
+        if self.keep_model and isinstance(weights, nn.Module):
+            return weights
+        return super().get_model(cfg, weights, verbose)
+
+    def attach_teacher(self, trainer):
+        teacher = YOLO(self.teacher_weights).model.float().fuse(verbose=False).eval().to(self.device)
+        teacher.requires_grad_(False)
+        self.model.criterion = DistillationLoss(self.model, teacher, self.distill_weight, self.temperature)
+
+
+def _prunable(first, second) -> bool:
+    """Conv+BN followed by a plain (ungrouped) convolution"""
+    if not isinstance(first, Conv) or not hasattr(first, 'bn'):
+        return False
+    following = second.conv if isinstance(second, Conv) else second
+    return isinstance(following, nn.Conv2d) and first.conv.groups == 1 and following.groups == 1
+
+
+def prune_pair(first, second, keep):
+    """Keep only the `keep` output channels of Conv `first` and the matching input channels of `second`"""
+    keep = torch.as_tensor(keep, dtype=torch.long)
+
+    conv, bn = first.conv, first.bn
+    conv.weight = nn.Parameter(conv.weight.data[keep].clone())
+    if conv.bias is not None:
+        conv.bias = nn.Parameter(conv.bias.data[keep].clone())
+    conv.out_channels = len(keep)
+
+    bn.weight = nn.Parameter(bn.weight.data[keep].clone())
+    bn.bias = nn.Parameter(bn.bias.data[keep].clone())
+    bn.running_mean = bn.running_mean[keep].clone()
+    bn.running_var = bn.running_var[keep].clone()
+    bn.num_features = len(keep)
+
+    following = second.conv if isinstance(second, Conv) else second
+    following.weight = nn.Parameter(following.weight.data[:, keep].clone())
+    following.in_channels = len(keep)
+
+
+def prune_channels(model, ratio=0.3, multiple=8) -> int:
+    """
+    Structured channel pruning of the hidden channels that only connect
+    two convolutions - inside every Bottleneck and between the layers of
+    each Detect branch - so no concat/split/residual shape has to change
+    and the model stays made of stock ultralytics modules. The channels
+    with the smallest BatchNorm scale go first (network slimming); kept
+    counts are rounded to a multiple of 8 for SIMD-friendly CPU kernels.
+    Returns: number of channels removed
+    """
+
+    pairs = []
+    for module in model.modules():
+        if isinstance(module, Bottleneck):
+            pairs.append((module.cv1, module.cv2))
+        elif isinstance(module, Detect):
+            for branch in list(module.cv2) + list(module.cv3):
+                pairs += [(branch[0], branch[1]), (branch[1], branch[2])]
+
+    removed = 0
+    for first, second in pairs:
+        if not _prunable(first, second):
+            continue
+        channels = first.conv.out_channels
+        kept = min(channels, max(multiple, round(channels * (1 - ratio) / multiple) * multiple))
+        keep = first.bn.weight.detach().abs().argsort(descending=True)[:kept].sort().values
+        prune_pair(first, second, keep)
+        removed += channels - kept
+    return removed
+
+
+def save_pruned(weights, output_path, ratio) -> str:
+    """Prune a trained checkpoint and save it like ultralytics does (model in float16, no optimizer)"""
+    checkpoint = torch.load(weights, map_location='cpu', weights_only=False)
+    model = (checkpoint.get('ema') or checkpoint['model']).float()
+
+    before = sum(parameter.numel() for parameter in model.parameters())
+    removed = prune_channels(model, ratio)
+    after = sum(parameter.numel() for parameter in model.parameters())
+    print(f"✂️ Pruned {removed} channels: {before / 1e6:.2f}M -> {after / 1e6:.2f}M parameters")
+
+    checkpoint.update({'model': model.half(), 'ema': None, 'optimizer': None, 'epoch': -1})
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    torch.save(checkpoint, output_path)
+    return output_path
+
+
+def compare_models(models, data_yaml, imgsz, latency_frames=50):
+    """mAP on the test split, parameters, size and CPU latency of every (label, weights)"""
+    rows = []
+    for label, weights in models:
+        model = YOLO(weights)
+        metrics = model.val(data=data_yaml, split='test', imgsz=imgsz, batch=1, device='cpu',
+                            plots=False, verbose=False)
+        rows.append({
+            'model': label,
+            'weights': weights,
+            'imgsz': imgsz,
+            'conf': 0.25,
+            'params_m': sum(parameter.numel() for parameter in model.model.parameters()) / 1e6,
+            'model_mb': os.path.getsize(weights) / 1e6,
+            'map50': float(metrics.box.map50),
+            'map50_95': float(metrics.box.map),
+        })
+
+    measure_latency(rows, torch.get_num_threads(), latency_frames)
+
+    teacher = rows[0]
+    print("\n" + "=" * 72)
+    print(f"{'model':<18} {'params':>8} {'MB':>6} {'mAP50':>7} {'mAP50-95':>9} {'ms/frame':>9} {'speed-up':>9}")
+    print("=" * 72)
+    for row in rows:
+        row['speedup'] = teacher['ms_per_frame'] / row['ms_per_frame']
+        print(f"{row['model']:<18} {row['params_m']:>7.2f}M {row['model_mb']:>6.1f} {row['map50']:>7.3f} "
+              f"{row['map50_95']:>9.3f} {row['ms_per_frame']:>9.1f} {row['speedup']:>8.1f}x")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Distill (and optionally prune) the helmet model into a smaller "
+                                                 "CPU-friendly one")
+    parser.add_argument('--teacher', default=DEFAULT_WEIGHTS)
+    parser.add_argument('--student', default='yolov8n.pt', help="Student architecture/weights to start from")
+    parser.add_argument('--epochs', type=int, default=50)
+    parser.add_argument('--imgsz', type=int, default=416)
+    parser.add_argument('--batch', type=int, default=8)
+    parser.add_argument('--distill-weight', type=float, default=1.0)
+    parser.add_argument('--temperature', type=float, default=2.0)
+    parser.add_argument('--prune', type=float, default=0.0, help="Share of hidden channels to remove (0 = no pruning)")
+    parser.add_argument('--finetune-epochs', type=int, default=20)
+    parser.add_argument('--name', default='helmet_n')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("🗜️ HELMET MODEL COMPRESSION")
+    print("=" * 60)
+
+    if not os.path.exists(args.teacher):
+        print(f"❌ Teacher not found at {args.teacher} - run: python train_helmet_model.py")
+        return
+
+    data_yaml = local_data_yaml()
+    common = dict(data=data_yaml, imgsz=args.imgsz, batch=args.batch, device='cpu', project=PROJECT,
+                  exist_ok=True, verbose=True)
+    trainer = partial(DistillationTrainer, teacher=args.teacher, distill_weight=args.distill_weight,
+                      temperature=args.temperature)
+
+    print(f"\n🎓 Distilling {args.teacher} -> {args.student} ({args.epochs} epochs)")
+    YOLO(args.student).train(epochs=args.epochs, name=f'{args.name}_distill', trainer=trainer, **common)
+    student = os.path.join(PROJECT, f'{args.name}_distill', 'weights', 'best.pt')
+    models = [('teacher', args.teacher), ('distilled', student)]
+
+    if args.prune > 0:
+        pruned = save_pruned(student, os.path.join(PROJECT, f'{args.name}_pruned.pt'), args.prune)
+        print(f"\n🔧 Fine-tuning the pruned model ({args.finetune_epochs} epochs, still distilling)")
+        YOLO(pruned).train(epochs=args.finetune_epochs, name=f'{args.name}_pruned', lr0=0.002, warmup_epochs=0,
+                           trainer=partial(trainer, keep_model=True), **common)
+        models.append(('pruned + finetuned', os.path.join(PROJECT, f'{args.name}_pruned', 'weights', 'best.pt')))
+
+    rows = compare_models(models, data_yaml, args.imgsz)
+
+    report_path = os.path.join(PROJECT, f'{args.name}_report.json')
+    with open(report_path, 'w') as f:
+        json.dump({'args': vars(args), 'models': rows}, f, indent=2)
+    print(f"\n📄 Saved report to {report_path}")
+    print(f"🎯 Drop-in weights: {models[-1][1]} (set model_path in monitor_safety.py or pass --weights)")
+
+
+if __name__ == "__main__":
+    main()
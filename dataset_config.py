@@ -0,0 +1,47 @@
+import os
+import yaml
+
+DATASET_DIR = 'datasets/helmet-detection'
+
+
+def local_data_yaml(dataset_dir=DATASET_DIR, output_path=None) -> str:
+    """
+    Write a copy of data.yaml whose paths point at this machine's dataset
+    folder (the checked-in one has absolute paths from another computer)
+    Returns: path of the written yaml
+    """
+
+    dataset_dir = os.path.abspath(dataset_dir)
+    with open(os.path.join(dataset_dir, 'data.yaml')) as f:
+        data = yaml.safe_load(f)
+
+    data['path'] = dataset_dir
+    data['train'] = os.path.join(dataset_dir, 'images/train')
+
+    if os.path.exists(os.path.join(dataset_dir, 'images/valid')):
+        data['val'] = os.path.join(dataset_dir, 'images/valid')
+    else:
+        data['val'] = os.path.join(dataset_dir, 'images/val')
+
+    if os.path.exists(os.path.join(dataset_dir, 'images/test')):
+        data['test'] = os.path.join(dataset_dir, 'images/test')
+
+    output_path = output_path or os.path.join(dataset_dir, 'data_local.yaml')
+    with open(output_path, 'w') as f:
+        yaml.dump(data, f)
+
+    return output_path
+
+
+def split_images(split, dataset_dir=DATASET_DIR) -> list:
+    """Sorted image paths of one split ('train', 'valid' or 'test')"""
+    folder = os.path.join(dataset_dir, 'images', split)
+    return [os.path.join(folder, name) for name in sorted(os.listdir(folder))
+            if name.lower().endswith(('.jpg', '.jpeg', '.png'))]
+
+
+def label_path(image_path) -> str:
+    """YOLO label file of an image (images/<split>/x.jpg -> labels/<split>/x.txt)"""
+    folder, filename = os.path.split(image_path)
+    split_dir, split = os.path.split(folder)
+    return os.path.join(os.path.dirname(split_dir), 'labels', split, os.path.splitext(filename)[0] + '.txt')
@@ -0,0 +1,157 @@
+import argparse
+import json
+import os
+import time
+
+import cv2
+import numpy as np
+from dataset_config import local_data_yaml, split_images
+from inference_backend import DEFAULT_WEIGHTS, BACKEND_FILES, backend_path, load_model, to_input_tensor
+
+
+def export_onnx(weights, imgsz):
+    """best.pt -> best.onnx (dynamic batch so the monitor can batch cameras)"""
+    from ultralytics import YOLO
+
+    print("📦 Exporting to ONNX...")
+    return YOLO(weights).export(format='onnx', imgsz=imgsz, dynamic=True, simplify=True)
+
+
+def export_openvino(weights, imgsz, int8=False):
+    """
+    best.pt -> OpenVINO IR (INT8 calibrated on the validation split by NNCF),
+    with dynamic batch and input size like the ONNX export, so the monitor
+    can batch cameras and switch resolution at runtime
+    """
+    from ultralytics import YOLO
+
+    print(f"📦 Exporting to OpenVINO{' INT8' if int8 else ''}...")
+    return YOLO(weights).export(format='openvino', imgsz=imgsz, int8=int8, dynamic=True,
+                                data=local_data_yaml() if int8 else None)
+
+
+def quantize_onnx(onnx_path, output_path, imgsz, calibration_images=100):
+    """
+    Post-training static INT8 quantization with ONNX Runtime,
+    calibrated on images from datasets/helmet-detection/images/valid
+    """
+    from onnxruntime import InferenceSession
+    from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+
+    input_name = InferenceSession(onnx_path, providers=['CPUExecutionProvider']).get_inputs()[0].name
+    images = split_images('valid')[:calibration_images]
+
+    class ValidImages(CalibrationDataReader):
+        def __init__(self):
+            self.paths = iter(images)
+
+        def get_next(self):
+            path = next(self.paths, None)
+            if path is None:
+                return None
+            return {input_name: to_input_tensor([cv2.imread(path)], imgsz)}
+
+    print(f"🧮 Quantizing to INT8 with {len(images)} calibration images...")
+    quantize_static(onnx_path, output_path, ValidImages(),
+                    quant_format=QuantFormat.QDQ,
+                    activation_type=QuantType.QUInt8,
+                    weight_type=QuantType.QInt8,
+                    per_channel=True)
+    return output_path
+
+
+def compare_backends(weights, imgsz, backends, tolerance):
+    """mAP50 on the test split and per-frame latency for every exported backend"""
+    data_yaml = local_data_yaml()
+    test_images = [cv2.imread(path) for path in split_images('test')]
+    rows = []
+
+    for backend in backends:
+        if not os.path.exists(backend_path(backend, weights)):
+            print(f"⏭️ {backend}: not exported, skipping")
+            continue
+
+        model = load_model(backend, weights)
+        metrics = model.val(data=data_yaml, split='test', imgsz=imgsz, batch=1,
+                            device='cpu', plots=False, verbose=False)
+
+        for image in test_images[:3]:
+            model(image, imgsz=imgsz, verbose=False)  # Warm-up
+
+        latencies = []
+        for image in test_images:
+            start = time.perf_counter()
+            model(image, imgsz=imgsz, verbose=False)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        rows.append({
+            'backend': backend,
+            'map50': float(metrics.box.map50),
+            'map50_95': float(metrics.box.map),
+            'ms_per_frame': float(np.median(latencies)),
+        })
+
+    if not rows:
+        return rows
+
+    baseline = next((row for row in rows if row['backend'] == 'pytorch'), rows[0])
+
+    print("\n" + "=" * 60)
+    print(f"{'backend':<15} {'mAP50':>7} {'mAP50-95':>9} {'ms/frame':>9} {'speed-up':>9}")
+    print("=" * 60)
+    for row in rows:
+        row['speedup'] = baseline['ms_per_frame'] / row['ms_per_frame']
+        row['within_tolerance'] = baseline['map50'] - row['map50'] <= tolerance
+        flag = "" if row['within_tolerance'] else "  ⚠️ mAP50 drop too large"
+        print(f"{row['backend']:<15} {row['map50']:>7.3f} {row['map50_95']:>9.3f} "
+              f"{row['ms_per_frame']:>9.1f} {row['speedup']:>8.1f}x{flag}")
+
+    report_path = os.path.join(os.path.dirname(weights), 'backend_comparison.json')
+    with open(report_path, 'w') as f:
+        json.dump(rows, f, indent=2)
+    print(f"\n📄 Saved comparison to {report_path}")
+
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the helmet model for faster CPU inference")
+    parser.add_argument('--weights', default=DEFAULT_WEIGHTS)
+    parser.add_argument('--imgsz', type=int, default=416, help="Same size the model was trained at")
+    parser.add_argument('--backend', choices=list(BACKEND_FILES), action='append',
+                        help="Backend(s) to export (default: onnx and onnx-int8)")
+    parser.add_argument('--compare', action='store_true', help="Compare accuracy/latency on the test split")
+    parser.add_argument('--tolerance', type=float, default=0.02, help="Allowed mAP50 drop vs. PyTorch")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("📦 EXPORTING HELMET MODEL")
+    print("=" * 60)
+
+    if not os.path.exists(args.weights):
+        print(f"❌ Model not found at {args.weights}")
+        return
+
+    backends = args.backend or ['onnx', 'onnx-int8']
+
+    for backend in backends:
+        if backend == 'pytorch':
+            continue
+        if backend == 'onnx':
+            export_onnx(args.weights, args.imgsz)
+        elif backend == 'onnx-int8':
+            onnx_path = backend_path('onnx', args.weights)
+            if not os.path.exists(onnx_path):
+                export_onnx(args.weights, args.imgsz)
+            quantize_onnx(onnx_path, backend_path('onnx-int8', args.weights), args.imgsz)
+        else:
+            export_openvino(args.weights, args.imgsz, int8=backend.endswith('int8'))
+        print(f"✅ {backend}: {backend_path(backend, args.weights)}")
+
+    if args.compare:
+        compare_backends(args.weights, args.imgsz, ['pytorch'] + [b for b in backends if b != 'pytorch'],
+                         args.tolerance)
+
+
+if __name__ == "__main__":
+    main()
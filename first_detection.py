@@ -1,5 +1,7 @@
 import cv2
+import time
 from ultralytics import YOLO
+from frame_scheduler import AdaptiveScheduler
 
 print("🤖 Loading YOLOv8 model...")
 model = YOLO('yolov8s.pt')  # Load the small model
@@ -16,6 +18,9 @@ print("Watch for colored boxes around objects!")
 
 frame_count = 0
 
+# Picks the detection interval from measured inference time
+scheduler = AdaptiveScheduler(target_hz=5)
+
 while True:
     success, frame = camera.read()
     
@@ -24,10 +29,12 @@ while True:
     
     frame_count += 1
     
-    # Only process every 3rd frame (faster performance)
-    if frame_count % 3 == 0:
+    # Only process as many frames as the machine can keep up with
+    if scheduler.should_detect():
         # Run YOLOv8 detection
+        start = time.perf_counter()
         results = model(frame, verbose=False)
+        scheduler.record_inference(time.perf_counter() - start)
         
         # Draw boxes around detected objects
         annotated_frame = results[0].plot()
@@ -37,10 +44,14 @@ while True:
                    "Phase 1: YOLOv8 Detection - Press Q to quit", 
                    (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
         
+        cv2.putText(annotated_frame, scheduler.status_text(), 
+                   (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 0), 2)
+        
         # Print what was detected (in console)
         detections = results[0].boxes
         if len(detections) > 0 and frame_count % 30 == 0:  # Print every 30 frames
             print(f"\n🎯 Frame {frame_count} - Detected {len(detections)} object(s):")
+            print(f"⏱️ {scheduler.status_text()}")
             
             # CHALLENGE 1: Count people
             num_people = sum(1 for detection in detections 
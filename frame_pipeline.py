@@ -0,0 +1,324 @@
+import queue
+import threading
+import time
+import traceback
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+
+def parse_source(source):
+    """Turn '0' into the device index 0; RTSP URLs and file paths pass through"""
+    if isinstance(source, str) and source.isdigit():
+        return int(source)
+    return source
+
+
+@dataclass
+class FramePacket:
+    """A camera frame travelling through the pipeline"""
+    camera_id: str
+    frame_number: int
+    frame: Any  # BGR image from the camera
+    captured_at: float  # time.perf_counter() when the frame was read
+    result: Any = None  # YOLO result for this frame
+    decision: Optional[dict] = None  # SafetyDecisionEngine decision
+    annotated_frame: Any = None  # Frame with boxes and alerts drawn on it
+
+    @property
+    def latency_ms(self) -> float:
+        """Time since this frame was captured, in milliseconds"""
+        return (time.perf_counter() - self.captured_at) * 1000
+
+
+class LatestQueue:
+    """
+    Bounded queue that throws away the oldest item when full
+    so the next stage always works on the freshest frame
+    """
+
+    def __init__(self, maxsize=1):
+        self._queue = queue.Queue(maxsize=maxsize)
+        self.dropped = 0  # Items thrown away because a stage was busy
+
+    def put(self, item):
+        while True:
+            try:
+                self._queue.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout=None):
+        """Return the next item, or None if nothing arrived in time"""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def get_nowait(self):
+        """Return the next item, or None if the queue is empty"""
+        try:
+            return self._queue.get_nowait()
+        except queue.Empty:
+            return None
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+
+class FramePipeline:
+    """
+    Runs capture, inference and rendering in their own threads.
+
+    cameras: {camera_id: cv2.VideoCapture-like object}
+    analyze(packets) fills in packet.result and packet.decision for the
+        latest frame of every camera, so one batched model call can
+        serve all streams
+    render(packet) -> annotated frame, or None to skip drawing entirely
+        (headless: analyzed packets go straight to get_frame())
+
+    Every camera gets its own capture thread and a LatestQueue holding
+    only its newest frame, so when inference is slow stale frames are
+    dropped instead of piling up behind it.
+    Finished packets are collected with get_frame() (call it from the
+    main thread, which is where cv2.imshow has to run).
+    Pass a MetricsRegistry as metrics to export stage timings, queue
+    depths and frame counters. on_capture(camera_id, frame) sees every
+    captured frame, dropped ones included, on the capture thread; its
+    errors are logged and never stop the camera.
+    A batch whose analyze() raises is logged and skipped; after
+    max_consecutive_errors failures in a row the pipeline stops itself
+    (running turns False and `error` holds the last exception) instead
+    of leaving the monitor waiting on frames that never come. A packet
+    whose render() raises is logged and shown undrawn.
+    """
+
+    def __init__(self, cameras: dict, analyze: Callable, render: Optional[Callable], queue_size=1, metrics=None,
+                 on_capture: Optional[Callable] = None, max_consecutive_errors=10):
+        self.cameras = cameras
+        self.analyze = analyze
+        self.render = render
+        self.on_capture = on_capture
+        self.max_consecutive_errors = max_consecutive_errors
+
+        self.capture_queues = {camera_id: LatestQueue(queue_size) for camera_id in cameras}
+        self.render_queue = LatestQueue(queue_size * len(cameras))
+        self.display_queue = LatestQueue(queue_size * len(cameras))
+
+        self.frames_captured = {camera_id: 0 for camera_id in cameras}
+        self.frames_analyzed = 0
+        self.batches_run = 0
+        self.analyze_errors = 0
+        self.render_errors = 0
+        self.capture_hook_errors = 0
+        self.error = None  # Set when repeated analyze() failures stopped the pipeline
+
+        self._active_cameras = len(cameras)
+        self._lock = threading.Lock()
+        self._frame_ready = threading.Event()
+        self._stop_event = threading.Event()
+        self._threads = []
+
+        self._timers = {}
+        if metrics is not None:
+            self._register_metrics(metrics)
+
+    def _register_metrics(self, metrics):
+        for stage in ('capture', 'analyze', 'render'):
+            self._timers[stage] = metrics.timer('stage_seconds', "Time spent in each stage", stage=stage)
+
+        for camera_id, capture_queue in self.capture_queues.items():
+            metrics.counter('frames_captured_total', "Frames read from the camera",
+                            function=lambda c=camera_id: self.frames_captured[c], camera=camera_id)
+            metrics.counter('frames_dropped_total', "Frames replaced by a newer one before inference",
+                            function=lambda q=capture_queue: q.dropped, camera=camera_id)
+            metrics.gauge('queue_depth', "Frames waiting for the next stage",
+                          function=capture_queue.qsize, queue=f'capture-{camera_id}')
+
+        metrics.gauge('queue_depth', function=self.render_queue.qsize, queue='render')
+        metrics.gauge('queue_depth', function=self.display_queue.qsize, queue='display')
+        metrics.counter('frames_analyzed_total', "Frames that went through analyze()",
+                        function=lambda: self.frames_analyzed)
+        metrics.counter('batches_total', "Batched analyze() calls", function=lambda: self.batches_run)
+        metrics.counter('analyze_errors_total', "Batches whose analyze() raised", function=lambda: self.analyze_errors)
+        metrics.counter('render_errors_total', "Frames whose render() raised (shown without drawings)",
+                        function=lambda: self.render_errors)
+
+    def _observe(self, stage, start):
+        timer = self._timers.get(stage)
+        if timer is not None:
+            timer.observe(time.perf_counter() - start)
+
+    def start(self):
+        workers = [(f'capture-{camera_id}', self._capture_loop, (camera_id,))
+                   for camera_id in self.cameras]
+        workers.append(('inference', self._inference_loop, ()))
+        if self.render is not None:
+            workers.append(('render', self._render_loop, ()))
+
+        for name, target, args in workers:
+            thread = threading.Thread(target=target, args=args,
+                                      name=f'pipeline-{name}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        self._stop_event.set()
+        for thread in self._threads:
+            thread.join(timeout=2)
+        self._threads = []
+
+    @property
+    def running(self) -> bool:
+        return not self._stop_event.is_set()
+
+    @property
+    def frames_dropped(self) -> int:
+        """Frames that were replaced by a newer one before inference got to them"""
+        return sum(q.dropped for q in self.capture_queues.values())
+
+    def get_frame(self, timeout=0.1) -> Optional[FramePacket]:
+        """Return the next rendered packet, or None if nothing is ready yet"""
+        return self.display_queue.get(timeout=timeout)
+
+    def _capture_loop(self, camera_id):
+        camera = self.cameras[camera_id]
+
+        while self.running:
+            start = time.perf_counter()
+            success, frame = camera.read()
+            if not success:
+                break
+            self._observe('capture', start)
+            if self.on_capture is not None:
+                try:
+                    self.on_capture(camera_id, frame)
+                except Exception as e:
+                    self.capture_hook_errors += 1
+                    if self.capture_hook_errors == 1 or self.capture_hook_errors % 100 == 0:
+                        print(f"⚠️ on_capture failed for {camera_id} ({self.capture_hook_errors} so far), "
+                              f"still capturing: {e!r}")
+
+            self.frames_captured[camera_id] += 1
+            self.capture_queues[camera_id].put(FramePacket(
+                camera_id=camera_id,
+                frame_number=self.frames_captured[camera_id],
+                frame=frame,
+                captured_at=time.perf_counter()
+            ))
+            self._frame_ready.set()
+
+        # Keep going while other cameras are still delivering frames
+        with self._lock:
+            self._active_cameras -= 1
+            if self._active_cameras == 0:
+                self._stop_event.set()
+
+    def _inference_loop(self):
+        consecutive_errors = 0
+        while self.running:
+            self._frame_ready.wait(timeout=0.1)
+            self._frame_ready.clear()
+
+            # Latest frame from every camera that has one waiting
+            packets = [q.get_nowait() for q in self.capture_queues.values()]
+            packets = [packet for packet in packets if packet is not None]
+            if not packets:
+                continue
+
+            start = time.perf_counter()
+            try:
+                self.analyze(packets)
+            except Exception as e:
+                self.analyze_errors += 1
+                consecutive_errors += 1
+                print(f"⚠️ Analyzing {len(packets)} frame(s) failed ({consecutive_errors} in a row): {e!r}")
+                if consecutive_errors == 1:
+                    traceback.print_exc()
+                if consecutive_errors >= self.max_consecutive_errors:
+                    print(f"❌ Stopping the pipeline after {consecutive_errors} failed batches in a row")
+                    self.error = e
+                    self._stop_event.set()
+                continue
+            consecutive_errors = 0
+            self._observe('analyze', start)
+            self.frames_analyzed += len(packets)
+            self.batches_run += 1
+
+            next_queue = self.render_queue if self.render is not None else self.display_queue
+            for packet in packets:
+                next_queue.put(packet)
+
+    def _render_loop(self):
+        while self.running:
+            packet = self.render_queue.get(timeout=0.1)
+            if packet is None:
+                continue
+
+            start = time.perf_counter()
+            try:
+                packet.annotated_frame = self.render(packet)
+            except Exception as e:
+                self.render_errors += 1
+                if self.render_errors == 1:
+                    traceback.print_exc()
+                if self.render_errors == 1 or self.render_errors % 100 == 0:  # Once per frame would flood the console
+                    print(f"⚠️ Drawing {packet.camera_id} frame {packet.frame_number} failed "
+                          f"({self.render_errors} so far), showing it undrawn: {e!r}")
+                packet.annotated_frame = packet.frame
+            self._observe('render', start)
+            self.display_queue.put(packet)
+
+
+# Test the pipeline
+if __name__ == "__main__":
+    print("Testing Frame Pipeline...\n")
+
+    class FakeCamera:
+        """Produces a frame every 10 ms, like a 100 FPS webcam"""
+        def __init__(self, frames):
+            self.remaining = frames
+
+        def read(self):
+            time.sleep(0.01)
+            self.remaining -= 1
+            return self.remaining >= 0, 'frame'
+
+    calls = []
+
+    def slow_analyze(packets):
+        time.sleep(0.05)  # One batch is 5x slower than a camera
+        calls.append(len(packets))
+        if len(calls) == 3:
+            raise RuntimeError("simulated model failure")  # Logged and skipped, the pipeline keeps going
+        for packet in packets:
+            packet.decision = {'frame': packet.frame_number}
+
+    cameras = {'cam0': FakeCamera(100), 'cam1': FakeCamera(100)}
+    rendered = []
+
+    def render(packet):
+        rendered.append(packet.frame_number)
+        if len(rendered) == 5:
+            raise ValueError("simulated drawing failure")  # The frame is still shown, undrawn
+        return packet.frame
+
+    pipeline = FramePipeline(cameras, slow_analyze, render=render)
+    pipeline.start()
+
+    latencies = []
+    while pipeline.running or pipeline.display_queue.qsize():
+        packet = pipeline.get_frame()
+        if packet is not None:
+            latencies.append(packet.latency_ms)
+    pipeline.stop()
+
+    print(f"  Captured: {pipeline.frames_captured}")
+    print(f"  Analyzed: {pipeline.frames_analyzed} in {pipeline.batches_run} batches")
+    print(f"  Dropped before inference: {pipeline.frames_dropped}")
+    print(f"  Failed batches: {pipeline.analyze_errors}, failed renders: {pipeline.render_errors}")
+    print(f"  Max latency: {max(latencies):.0f} ms")
@@ -0,0 +1,130 @@
+import math
+import time
+from collections import deque
+
+
+class AdaptiveScheduler:
+    """
+    Picks how many frames to skip between detections from measured timings,
+    instead of a hard-coded frame_count % N.
+
+    Call should_detect() once per camera frame and record_inference()
+    after every model call. The interval is chosen so that:
+      - inference uses at most cpu_budget of the loop time (so capture and
+        display keep up), but
+      - detections still happen at least target_hz times per second
+        (or within max_latency_ms) whenever the machine can manage it.
+    When the target can't be met even at every frame, the scheduler backs
+    off to the CPU budget so the camera buffer doesn't go stale.
+    """
+
+    def __init__(self, target_hz=5.0, max_latency_ms=None, cpu_budget=0.7,
+                 max_interval=30, smoothing=0.2, verbose=True):
+        if max_latency_ms is not None:
+            target_hz = 1000.0 / max_latency_ms
+
+        self.target_hz = target_hz
+        self.cpu_budget = cpu_budget  # Max fraction of the loop spent on inference
+        self.max_interval = max_interval
+        self.smoothing = smoothing  # Weight of the newest sample in the moving averages
+        self.verbose = verbose
+
+        self.interval = 1  # Run detection every N frames
+        self.frame_time = None  # Seconds per frame without inference (capture, drawing, display)
+        self.inference_time = None  # Seconds per model call
+
+        self._frames_since_detection = 0
+        self._last_tick = None
+        self._pending_inference = 0.0
+        self._detection_times = deque(maxlen=50)
+
+    def _average(self, current, sample):
+        if current is None:
+            return sample
+        return current + self.smoothing * (sample - current)
+
+    def should_detect(self) -> bool:
+        """
+        Call once per frame
+        Returns: True if this frame should go through the model
+        """
+
+        now = time.perf_counter()
+        if self._last_tick is not None:
+            overhead = max(0.0, now - self._last_tick - self._pending_inference)
+            self.frame_time = self._average(self.frame_time, overhead)
+        self._last_tick = now
+        self._pending_inference = 0.0
+
+        self._frames_since_detection += 1
+        if self._frames_since_detection >= self.interval:
+            self._frames_since_detection = 0
+            return True
+        return False
+
+    def record_inference(self, seconds):
+        """Report how long the model call for this frame took"""
+        self.inference_time = self._average(self.inference_time, seconds)
+        self._pending_inference = seconds
+        self._detection_times.append(time.perf_counter())
+        self._update_interval()
+
+    def _update_interval(self):
+        if not self.frame_time or self.inference_time is None:
+            return
+
+        inference, frame = self.inference_time, self.frame_time
+
+        # Densest interval that keeps inference inside the CPU budget
+        budget_interval = math.ceil(inference * (1 - self.cpu_budget) / (self.cpu_budget * frame))
+
+        # Sparsest interval that still meets the detection rate target
+        target_interval = math.floor((1.0 / self.target_hz - inference) / frame)
+
+        if target_interval >= 1:
+            interval = min(budget_interval, target_interval)
+        else:
+            interval = budget_interval  # Target out of reach: don't fall behind the camera
+
+        interval = max(1, min(self.max_interval, interval))
+
+        if interval != self.interval:
+            if self.verbose:
+                print(f"🔁 Detection interval {self.interval} → {interval} frames "
+                      f"(inference {inference * 1000:.0f} ms, {self.achieved_hz:.1f} Hz)")
+            self.interval = interval
+
+    @property
+    def achieved_hz(self) -> float:
+        """Detections per second over the recent window"""
+        if len(self._detection_times) < 2:
+            return 0.0
+        span = self._detection_times[-1] - self._detection_times[0]
+        return (len(self._detection_times) - 1) / span if span > 0 else 0.0
+
+    @property
+    def target_met(self) -> bool:
+        return self.achieved_hz >= self.target_hz
+
+    def status_text(self) -> str:
+        """Short summary for the video overlay"""
+        return f"Detect every {self.interval} frame(s) | {self.achieved_hz:.1f} Hz (target {self.target_hz:.0f})"
+
+
+# Test the scheduler
+if __name__ == "__main__":
+    print("Testing Adaptive Scheduler...\n")
+
+    def simulate(label, inference_seconds, frames=120):
+        scheduler = AdaptiveScheduler(target_hz=5, verbose=False)
+        for _ in range(frames):
+            time.sleep(0.005)  # Capture + display
+            if scheduler.should_detect():
+                time.sleep(inference_seconds)
+                scheduler.record_inference(inference_seconds)
+        print(f"{label}: every {scheduler.interval} frame(s), "
+              f"{scheduler.achieved_hz:.1f} Hz, target met: {scheduler.target_met}")
+
+    simulate("Fast box (10 ms inference)", 0.01)
+    simulate("Loaded box (60 ms inference)", 0.06)
+    simulate("Overloaded box (300 ms inference)", 0.3, frames=40)
@@ -0,0 +1,124 @@
+from dataclasses import dataclass
+import numpy as np
+
+
+@dataclass
+class AssociationResult:
+    """Which helmet (if any) belongs to each person"""
+    helmet_index: np.ndarray  # (people,) index into the helmet boxes, -1 = no helmet
+    scores: np.ndarray  # (people,) match score of the assigned helmet, 0 if none
+
+    @property
+    def has_helmet(self) -> np.ndarray:
+        return self.helmet_index >= 0
+
+    @property
+    def unprotected(self) -> np.ndarray:
+        """Indices of the people without a helmet"""
+        return np.flatnonzero(self.helmet_index < 0)
+
+
+def xywh_to_xyxy(boxes: np.ndarray) -> np.ndarray:
+    """(center x, center y, width, height) -> (x1, y1, x2, y2)"""
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    half = boxes[:, 2:] / 2
+    return np.concatenate([boxes[:, :2] - half, boxes[:, :2] + half], axis=1)
+
+
+def head_regions(person_xyxy: np.ndarray, above=0.15, below=0.45) -> np.ndarray:
+    """
+    Where a worn helmet should be: the top of each person box,
+    stretched a little upwards because hard hats stick out over the head
+    """
+    heights = person_xyxy[:, 3] - person_xyxy[:, 1]
+    regions = person_xyxy.copy()
+    regions[:, 1] = person_xyxy[:, 1] - heights * above
+    regions[:, 3] = person_xyxy[:, 1] + heights * below
+    return regions
+
+
+def overlap_matrices(regions: np.ndarray, helmets: np.ndarray):
+    """
+    Geometry of every region x helmet pair in one broadcasted pass
+    Returns: (containment, iou), both shaped (regions, helmets)
+        containment = share of the helmet box that lies inside the region
+    """
+
+    rx1, ry1, rx2, ry2 = (regions[:, i, None] for i in range(4))
+    hx1, hy1, hx2, hy2 = helmets.T
+
+    inter_w = np.minimum(rx2, hx2) - np.maximum(rx1, hx1)
+    inter_h = np.minimum(ry2, hy2) - np.maximum(ry1, hy1)
+    np.clip(inter_w, 0, None, out=inter_w)
+    np.clip(inter_h, 0, None, out=inter_h)
+    intersection = inter_w * inter_h
+
+    region_area = (rx2 - rx1) * (ry2 - ry1)
+    helmet_area = np.maximum((hx2 - hx1) * (hy2 - hy1), 1e-6)
+
+    containment = intersection / helmet_area
+    iou = intersection / np.maximum(region_area + helmet_area - intersection, 1e-6)
+
+    return containment, iou
+
+
+def greedy_match(scores: np.ndarray, valid: np.ndarray):
+    """
+    Assign rows to columns best score first, each used at most once
+    Returns: list of (row, column) pairs
+    """
+
+    rows, columns = np.nonzero(valid)
+    order = np.argsort(-scores[rows, columns], kind='stable')
+
+    matches = []
+    rows_done, columns_done = set(), set()
+    for row, column in zip(rows[order].tolist(), columns[order].tolist()):
+        if row not in rows_done and column not in columns_done:
+            matches.append((row, column))
+            rows_done.add(row)
+            columns_done.add(column)
+
+    return matches
+
+
+def associate_helmets(person_boxes, helmet_boxes, min_containment=0.5) -> AssociationResult:
+    """
+    Match helmets to people (boxes are (center x, center y, width, height)).
+
+    Every pair is scored by how much of the helmet sits in the person's head
+    region (with IoU as a tie-breaker), then pairs are assigned best-first so
+    each helmet is worn by at most one person.
+    """
+
+    people = xywh_to_xyxy(person_boxes)
+    helmets = xywh_to_xyxy(helmet_boxes)
+
+    helmet_index = np.full(len(people), -1, dtype=np.int32)
+    scores = np.zeros(len(people), dtype=np.float32)
+
+    if len(people) == 0 or len(helmets) == 0:
+        return AssociationResult(helmet_index, scores)
+
+    containment, iou = overlap_matrices(head_regions(people), helmets)
+
+    # Only plausible pairs go into the assignment
+    pair_scores = 0.7 * containment + 0.3 * iou
+    for person, helmet in greedy_match(pair_scores, containment >= min_containment):
+        helmet_index[person] = helmet
+        scores[person] = pair_scores[person, helmet]
+
+    return AssociationResult(helmet_index, scores)
+
+
+# Test the association
+if __name__ == "__main__":
+    print("Testing Helmet Association...\n")
+
+    people = [(100, 50, 50, 100), (200, 60, 50, 100), (300, 60, 50, 100)]
+    helmets = [(110, 40, 30, 25), (305, 15, 30, 25), (500, 500, 30, 25)]  # Last one is on a shelf
+
+    result = associate_helmets(people, helmets)
+    for person, helmet in enumerate(result.helmet_index):
+        status = f"helmet {helmet} (score {result.scores[person]:.2f})" if helmet >= 0 else "NO HELMET"
+        print(f"  Person {person} at {people[person]}: {status}")
@@ -0,0 +1,127 @@
+import hashlib
+import math
+import os
+import cv2
+import numpy as np
+from dataset_config import DATASET_DIR
+
+CACHE_DIR = os.path.join(DATASET_DIR, 'cache')
+
+
+def resize_long_side(image, imgsz=416):
+    """Resize so the longer side is imgsz, the way ultralytics loads training images"""
+    height, width = image.shape[:2]
+    ratio = imgsz / max(height, width)
+    if ratio == 1:
+        return image
+    size = (min(math.ceil(width * ratio), imgsz), min(math.ceil(height * ratio), imgsz))
+    return cv2.resize(image, size, interpolation=cv2.INTER_LINEAR if ratio > 1 else cv2.INTER_AREA)
+
+
+def content_key(paths, imgsz=416) -> str:
+    """Hash of every image's bytes (in order) and the input size - any edit, addition or new imgsz changes it"""
+    digest = hashlib.sha1(f'imgsz={imgsz}'.encode())
+    for path in paths:
+        with open(path, 'rb') as f:
+            digest.update(hashlib.sha1(f.read()).digest())
+    return digest.hexdigest()[:16]
+
+
+class ImageCache:
+    """
+    Decoded and resized images of a dataset split, built once and reused
+    by every training run.
+
+    All images live in one preallocated (n, imgsz, imgsz, 3) uint8 array
+    saved as .npy under cache_dir, each one in the top-left corner at its
+    resized shape (longer side = imgsz). The file name is content_key(), so
+    changed images or another imgsz build a new cache instead of reading a
+    stale one. Loaded as a copy-on-write memory map by default - dataloader
+    workers then share the OS page cache instead of each holding a copy -
+    or fully into RAM with in_memory=True.
+    """
+
+    def __init__(self, paths, imgsz=416, cache_dir=CACHE_DIR, in_memory=False, verbose=True):
+        self.paths = list(paths)
+        self.imgsz = imgsz
+        self.cache_dir = cache_dir
+        self.verbose = verbose
+
+        self.key = content_key(self.paths, imgsz)
+        self.images_path = os.path.join(cache_dir, f'{self.key}_{imgsz}_images.npy')
+        self.shapes_path = os.path.join(cache_dir, f'{self.key}_{imgsz}_shapes.npy')
+
+        self.built = False  # True when this instance had to decode the images
+        if not os.path.exists(self.images_path) or not os.path.exists(self.shapes_path):
+            self.build()
+            self.built = True
+
+        self.images = np.load(self.images_path, mmap_mode=None if in_memory else 'c')
+        self.shapes = np.load(self.shapes_path)  # (n, 4): original height, width, resized height, width
+
+    def __len__(self):
+        return len(self.paths)
+
+    @property
+    def nbytes(self) -> int:
+        return self.images.nbytes
+
+    def build(self):
+        """Decode and resize every image into a new cache file"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Renamed when complete, so an interrupted (or concurrent) build is never read half-written
+        partial_path = f'{self.images_path}.{os.getpid()}.partial'
+        images = np.lib.format.open_memmap(partial_path, mode='w+', dtype=np.uint8,
+                                           shape=(len(self.paths), self.imgsz, self.imgsz, 3))
+        shapes = np.zeros((len(self.paths), 4), dtype=np.int32)
+
+        for index, path in enumerate(self.paths):
+            image = cv2.imread(path)
+            if image is None:
+                raise FileNotFoundError(f"Could not read image {path}")
+            resized = resize_long_side(image, self.imgsz)
+            height, width = resized.shape[:2]
+            images[index, :height, :width] = resized
+            shapes[index] = (*image.shape[:2], height, width)
+
+        images.flush()
+        del images
+        np.save(self.shapes_path, shapes)
+        os.replace(partial_path, self.images_path)
+
+        if self.verbose:
+            size_mb = len(self.paths) * self.imgsz * self.imgsz * 3 / 1e6
+            print(f"💾 Cached {len(self.paths)} images at {self.imgsz} px ({size_mb:.0f} MB) in {self.images_path}")
+
+    def image(self, index):
+        """Returns: (resized image, original (height, width), resized (height, width)) - like ultralytics load_image"""
+        original_height, original_width, height, width = self.shapes[index].tolist()
+        return self.images[index, :height, :width], (original_height, original_width), (height, width)
+
+
+# Test the cache
+if __name__ == "__main__":
+    import time
+    from dataset_config import split_images
+
+    print("Testing Image Cache...\n")
+
+    paths = split_images('train')
+
+    start = time.perf_counter()
+    decoded = [resize_long_side(cv2.imread(path)) for path in paths]
+    decode_seconds = time.perf_counter() - start
+    print(f"  Decode + resize {len(paths)} JPEGs: {decode_seconds * 1000:.0f} ms")
+
+    cache = ImageCache(paths, imgsz=416)
+    print(f"  Cache key {cache.key} ({'built' if cache.built else 'reused'}), {cache.nbytes / 1e6:.0f} MB")
+
+    start = time.perf_counter()
+    cached = [np.ascontiguousarray(cache.image(index)[0]) for index in range(len(cache))]
+    cache_seconds = time.perf_counter() - start
+    print(f"  Read {len(cached)} images from the cache: {cache_seconds * 1000:.0f} ms "
+          f"({decode_seconds / cache_seconds:.0f}x faster)")
+
+    identical = all(np.array_equal(a, b) for a, b in zip(decoded, cached))
+    print(f"  Same pixels as decoding: {identical}")
+    print(f"  Key at imgsz=320: {content_key(paths, 320)} (separate cache)")
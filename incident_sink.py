@@ -0,0 +1,162 @@
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+_STOP = object()
+
+
+class IncidentSink:
+    """
+    Streams incidents to disk as JSON lines from a background thread.
+
+    write() only copies the record into a queue, so the frame loop never
+    waits for the disk. The writer thread flushes in batches (every
+    flush_seconds or batch_size records) and starts a new file every day
+    and whenever the current one grows past max_bytes:
+
+        incidents/violations-2024-05-01.jsonl
+        incidents/violations-2024-05-01.1.jsonl
+        ...
+
+    After a restart it carries on in the day's highest-numbered file.
+    """
+
+    def __init__(self, directory='incidents', prefix='violations', max_bytes=50_000_000,
+                 flush_seconds=1.0, batch_size=200, max_pending=10_000):
+        self.directory = directory
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.flush_seconds = flush_seconds
+        self.batch_size = batch_size
+
+        self.written = 0
+        self.dropped = 0  # Records lost because the queue was full (disk can't keep up)
+        self.current_path = None
+
+        os.makedirs(directory, exist_ok=True)
+
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._file = None
+        self._day = None
+        self._part = 0
+        self._thread = threading.Thread(target=self._writer_loop, name='incident-sink', daemon=True)
+        self._thread.start()
+
+    def write(self, incident, event='opened'):
+        """Queue an incident (SafetyIncident or dict) without blocking"""
+        record = dict(incident) if isinstance(incident, dict) else incident.to_dict()
+        record['event'] = event
+
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        """Flush everything still queued and stop the writer"""
+        self._queue.put(_STOP)
+        self._thread.join()
+        if self.dropped:
+            print(f"⚠️ {self.dropped} incident records were dropped because the disk could not keep up")
+
+    def _writer_loop(self):
+        batch = []
+        last_flush = time.monotonic()
+
+        while True:
+            timeout = max(0.0, self.flush_seconds - (time.monotonic() - last_flush))
+            try:
+                record = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                record = None
+
+            if record is _STOP:
+                self._flush(batch)
+                if self._file is not None:
+                    self._file.close()
+                return
+
+            if record is not None:
+                batch.append(record)
+
+            if len(batch) >= self.batch_size or time.monotonic() - last_flush >= self.flush_seconds:
+                self._flush(batch)
+                batch = []
+                last_flush = time.monotonic()
+
+    def _flush(self, batch):
+        if not batch:
+            return
+
+        self._rotate_if_needed()
+        self._file.write(''.join(json.dumps(record, separators=(',', ':')) + '\n' for record in batch))
+        self._file.flush()
+        self.written += len(batch)
+
+    def _rotate_if_needed(self):
+        day = datetime.now().strftime('%Y-%m-%d')
+
+        if day != self._day:
+            self._day, self._part = day, self._last_part(day)
+        elif self._file is not None and self._file.tell() < self.max_bytes:
+            return
+        else:
+            self._part += 1
+
+        if self._file is not None:
+            self._file.close()
+
+        self.current_path = self._path(day, self._part)
+        self._file = open(self.current_path, 'a')
+
+    def _path(self, day, part):
+        suffix = f'.{part}' if part else ''
+        return os.path.join(self.directory, f'{self.prefix}-{day}{suffix}.jsonl')
+
+    def _last_part(self, day) -> int:
+        """Highest part of the day already on disk (0 if none), so a restart doesn't write into an older part"""
+        stem = f'{self.prefix}-{day}'
+        parts = [0]
+        for name in os.listdir(self.directory):
+            middle = name[len(stem):-len('.jsonl')] if name.startswith(stem) and name.endswith('.jsonl') else None
+            if middle is not None and middle[:1] == '.' and middle[1:].isdigit():
+                parts.append(int(middle[1:]))
+        return max(parts)
+
+
+def read_incidents(path):
+    """Load the records of one JSONL incident file"""
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+# Test the sink
+if __name__ == "__main__":
+    import tempfile
+
+    print("Testing Incident Sink...\n")
+
+    with tempfile.TemporaryDirectory() as directory:
+        sink = IncidentSink(directory, max_bytes=20_000, flush_seconds=0.2)
+
+        start = time.perf_counter()
+        for i in range(1000):
+            sink.write({'incident_type': 'no_helmet', 'severity': 'medium', 'frame_number': i})
+        enqueue_ms = (time.perf_counter() - start) * 1000
+
+        sink.close()
+
+        files = sorted(os.listdir(directory))
+        records = sum(len(read_incidents(os.path.join(directory, name))) for name in files)
+        print(f"  Queued 1000 incidents in {enqueue_ms:.1f} ms")
+        print(f"  Written: {sink.written} records in {len(files)} file(s) ({records} read back)")
+
+        # A restart carries on in the newest part instead of appending to part 0
+        sink = IncidentSink(directory, max_bytes=20_000, flush_seconds=0.2)
+        sink.write({'incident_type': 'no_helmet', 'severity': 'high', 'frame_number': 1000})
+        sink.close()
+        print(f"  After a restart: appended to {os.path.basename(sink.current_path)} "
+              f"({len(os.listdir(directory))} file(s) now)")
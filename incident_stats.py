@@ -0,0 +1,145 @@
+import time
+import numpy as np
+
+# Columns of the bucket arrays
+FRAMES, VIOLATION_FRAMES, SAFETY_SUM, LOW, MEDIUM, HIGH = range(6)
+SEVERITY_COLUMNS = {'low': LOW, 'medium': MEDIUM, 'high': HIGH}
+
+
+def summarize_totals(totals) -> dict:
+    """Readable aggregates of one row of counters (session, shift, window - or several of them summed)"""
+    frames = totals[FRAMES]
+    return {
+        'frames_analyzed': int(frames),
+        'violation_rate': float(totals[VIOLATION_FRAMES] / frames * 100) if frames else 0.0,
+        'mean_safety_percentage': float(totals[SAFETY_SUM] / frames) if frames else 100.0,
+        'total_incidents': int(totals[LOW] + totals[MEDIUM] + totals[HIGH]),
+        'high_severity': int(totals[HIGH]),
+        'medium_severity': int(totals[MEDIUM]),
+        'low_severity': int(totals[LOW]),
+    }
+
+
+class RollingWindow:
+    """
+    Aggregates over the last span_seconds, kept in a fixed ring of buckets.
+    Old buckets are reset when time wraps around to them, so memory and
+    query cost depend only on the number of buckets, never on history.
+    """
+
+    def __init__(self, span_seconds, buckets=60):
+        self.bucket_seconds = span_seconds / buckets
+        self.values = np.zeros((buckets, 6))
+        self.epochs = np.full(buckets, -1, dtype=np.int64)  # Which time slot each bucket holds
+
+    def _bucket(self, now):
+        epoch = int(now // self.bucket_seconds)
+        index = epoch % len(self.epochs)
+        if self.epochs[index] != epoch:
+            self.values[index] = 0
+            self.epochs[index] = epoch
+        return index
+
+    def add(self, column, amount, now):
+        self.values[self._bucket(now), column] += amount
+
+    def totals(self, now) -> np.ndarray:
+        current = int(now // self.bucket_seconds)
+        live = self.epochs > current - len(self.epochs)
+        return self.values[live].sum(axis=0)
+
+
+class IncidentStatistics:
+    """
+    Running counters for SafetyDecisionEngine, updated as frames and
+    incidents come in, so reading them is O(1) however long the session runs
+
+    With shift_hours the shift counters restart on their own at every
+    shift boundary - shift_start_hour (local time) and every shift_hours
+    after it, e.g. 06:00, 14:00 and 22:00 for 8-hour shifts - and the
+    shift that just ended is kept as 'previous_shift'. start_shift()
+    starts one by hand at any time.
+    """
+
+    WINDOWS = {'last_1_min': 60, 'last_15_min': 15 * 60, 'last_1_hour': 60 * 60}
+
+    def __init__(self, buckets=60, shift_hours=None, shift_start_hour=6):
+        self.session = np.zeros(6)
+        self.shift = np.zeros(6)
+        self.previous_shift = None
+        self.shift_started = time.time()
+        self.shift_seconds = shift_hours * 3600 if shift_hours else None
+        self.shift_start_hour = shift_start_hour
+        self._shift_number = self._shift_of(self.shift_started)
+        self.windows = {name: RollingWindow(span, buckets) for name, span in self.WINDOWS.items()}
+
+    def _shift_of(self, now):
+        """Number of the scheduled shift `now` falls in (None without shift_hours)"""
+        if self.shift_seconds is None:
+            return None
+        local = now + time.localtime(now).tm_gmtoff - self.shift_start_hour * 3600
+        return int(local // self.shift_seconds)
+
+    def _add(self, column, amount, now):
+        if self.shift_seconds is not None and self._shift_of(now) != self._shift_number:
+            self.start_shift(now)
+        self.session[column] += amount
+        self.shift[column] += amount
+        for window in self.windows.values():
+            window.add(column, amount, now)
+
+    def record_frame(self, violation: bool, safety_percentage: float, now=None):
+        now = time.time() if now is None else now
+        self._add(FRAMES, 1, now)
+        self._add(SAFETY_SUM, safety_percentage, now)
+        if violation:
+            self._add(VIOLATION_FRAMES, 1, now)
+
+    def record_incident(self, severity: str, now=None):
+        now = time.time() if now is None else now
+        self._add(SEVERITY_COLUMNS[severity], 1, now)
+
+    def start_shift(self, now=None):
+        """Close the current shift and reset the shift aggregates (session totals keep counting)"""
+        now = time.time() if now is None else now
+        self.previous_shift = summarize_totals(self.shift)
+        self.shift = np.zeros(6)
+        self.shift_started = now
+        self._shift_number = self._shift_of(now)
+
+    def summary(self, now=None) -> dict:
+        """Session totals plus the rolling windows and current shift"""
+        now = time.time() if now is None else now
+
+        summary = summarize_totals(self.session)
+        summary['windows'] = {name: summarize_totals(window.totals(now)) for name, window in self.windows.items()}
+        summary['windows']['shift'] = summarize_totals(self.shift)
+        if self.previous_shift is not None:
+            summary['windows']['previous_shift'] = self.previous_shift
+        return summary
+
+
+# Test the statistics
+if __name__ == "__main__":
+    print("Testing Incident Statistics...\n")
+
+    stats = IncidentStatistics(shift_hours=8)
+    start = 1_000_000.0
+
+    # Two hours of frames, one per second; violations only in the last 10 minutes
+    for second in range(2 * 60 * 60):
+        now = start + second
+        violation = second >= 110 * 60
+        stats.record_frame(violation, 50.0 if violation else 100.0, now)
+        if violation and second % 60 == 0:
+            stats.record_incident('high', now)
+
+    summary = stats.summary(now)
+    for name in ['last_1_min', 'last_15_min', 'last_1_hour', 'shift', 'previous_shift']:
+        window = summary['windows'][name]
+        print(f"  {name:>14}: {window['frames_analyzed']:>5} frames, "
+              f"violation rate {window['violation_rate']:5.1f}%, "
+              f"mean safety {window['mean_safety_percentage']:5.1f}%, "
+              f"{window['total_incidents']} incidents")
+    print(f"  Shift started at {time.strftime('%H:%M', time.localtime(stats.shift_started))} "
+          f"(8-hour shifts from 06:00)")
@@ -0,0 +1,105 @@
+import os
+import numpy as np
+
+DEFAULT_WEIGHTS = 'runs/detect/train6/weights/best.pt'
+
+# Where export_model.py puts each backend's artifact, relative to best.pt
+BACKEND_FILES = {
+    'pytorch': '{stem}.pt',
+    'onnx': '{stem}.onnx',
+    'onnx-int8': '{stem}_int8.onnx',
+    'openvino': '{stem}_openvino_model',
+    'openvino-int8': '{stem}_int8_openvino_model',
+}
+
+
+def backend_path(backend='pytorch', weights=DEFAULT_WEIGHTS) -> str:
+    """Path of the exported model for a backend"""
+    if backend not in BACKEND_FILES:
+        raise ValueError(f"Unknown backend '{backend}', choose from {', '.join(BACKEND_FILES)}")
+
+    folder, filename = os.path.split(weights)
+    stem = os.path.splitext(filename)[0]
+    return os.path.join(folder, BACKEND_FILES[backend].format(stem=stem))
+
+
+def fused_path(weights=DEFAULT_WEIGHTS) -> str:
+    """Where the ready-to-run copy of best.pt is cached (best_fused.pt)"""
+    folder, filename = os.path.split(weights)
+    return os.path.join(folder, f'{os.path.splitext(filename)[0]}_fused.pt')
+
+
+def build_fused_weights(weights=DEFAULT_WEIGHTS) -> str:
+    """
+    Save a copy of the checkpoint with Conv+BatchNorm already fused, in
+    float32 and without training state, so loading it skips those steps
+    """
+
+    import torch
+
+    checkpoint = torch.load(weights, map_location='cpu', weights_only=False)
+    model = (checkpoint.get('ema') or checkpoint['model']).float().fuse().eval()
+    checkpoint.update({'model': model, 'ema': None, 'optimizer': None})
+
+    path = fused_path(weights)
+    torch.save(checkpoint, path)
+    return path
+
+
+def load_model(backend='pytorch', weights=DEFAULT_WEIGHTS, fused=False):
+    """
+    Load the helmet model on the chosen backend.
+
+    ONNX Runtime and OpenVINO models are wrapped by ultralytics' YOLO class
+    too, so callers keep using model(frames, verbose=False) -> Results
+    whichever backend is active.
+    fused=True loads the cached best_fused.pt (PyTorch only), rebuilding it
+    when best.pt is newer.
+    """
+
+    from ultralytics import YOLO  # Pulls in torch - only import it when a model is really needed
+
+    path = backend_path(backend, weights)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"{path} not found - run: python export_model.py --backend {backend}")
+
+    if fused and backend == 'pytorch':
+        cached = fused_path(weights)
+        if not os.path.exists(cached) or os.path.getmtime(cached) < os.path.getmtime(path):
+            build_fused_weights(weights)
+        path = cached
+
+    return YOLO(path, task='detect')
+
+
+def warm_up(model, batch_sizes=(1,), frame_shape=(480, 640, 3)):
+    """Run blank frames through the model so the first real frame doesn't pay one-off setup costs"""
+    frame = np.zeros(frame_shape, dtype=np.uint8)
+    for batch_size in batch_sizes:
+        model([frame] * batch_size, verbose=False)
+
+
+def letterbox(image, size=416, color=(114, 114, 114)):
+    """
+    Resize keeping the aspect ratio and pad to a size x size square
+    Returns: (padded image, scale, (pad_x, pad_y))
+    """
+
+    import cv2  # Here, so importing this module doesn't load cv2 on the monitor's main thread
+
+    height, width = image.shape[:2]
+    scale = min(size / height, size / width)
+    new_width, new_height = round(width * scale), round(height * scale)
+
+    resized = cv2.resize(image, (new_width, new_height), interpolation=cv2.INTER_LINEAR)
+    pad_x, pad_y = (size - new_width) // 2, (size - new_height) // 2
+
+    padded = np.full((size, size, 3), color, dtype=np.uint8)
+    padded[pad_y:pad_y + new_height, pad_x:pad_x + new_width] = resized
+    return padded, scale, (pad_x, pad_y)
+
+
+def to_input_tensor(images, size=416) -> np.ndarray:
+    """BGR images -> float32 NCHW batch in 0..1, the layout the exported models expect"""
+    batch = np.stack([letterbox(image, size)[0] for image in images])
+    return np.ascontiguousarray(batch[..., ::-1].transpose(0, 3, 1, 2), dtype=np.float32) / 255.0
@@ -0,0 +1,286 @@
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+import urllib.request
+from concurrent.futures import Future
+from urllib.parse import parse_qs, urlencode, urlparse
+
+import numpy as np
+from safety_decision_engine import SafetyDecisionEngine, DetectionBatch
+from incident_sink import IncidentSink
+from metrics import MetricsRegistry, MetricsServer
+
+DEFAULT_PORT = 9110
+DEFAULT_URL = f'http://127.0.0.1:{DEFAULT_PORT}'
+
+
+def batch_to_dict(batch: DetectionBatch) -> dict:
+    return {
+        'class_ids': batch.class_ids.tolist(),
+        'confidences': batch.confidences.tolist(),
+        'boxes': batch.boxes.tolist(),
+        'names': {str(class_id): name for class_id, name in batch.names.items()},
+    }
+
+
+def batch_from_dict(data: dict) -> DetectionBatch:
+    return DetectionBatch(
+        class_ids=np.array(data['class_ids'], dtype=np.int32),
+        confidences=np.array(data['confidences'], dtype=np.float32),
+        boxes=np.array(data['boxes'], dtype=np.float32).reshape(-1, 4),
+        names={int(class_id): name for class_id, name in data['names'].items()},
+    )
+
+
+class DynamicBatcher:
+    """
+    Collects frames from concurrent requests into one model call.
+
+    A batch is run as soon as max_batch_size frames are waiting, or
+    max_wait_ms after its first frame arrived - whichever comes first -
+    so a lone client pays at most max_wait_ms extra latency.
+    """
+
+    def __init__(self, model, max_batch_size=8, max_wait_ms=10, metrics=None):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+
+        self._requests = queue.Queue()
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name='dynamic-batcher', daemon=True)
+
+        metrics = metrics or MetricsRegistry()
+        self._model_timer = metrics.timer('model_seconds', "Time per batched model call")
+        self._wait_timer = metrics.timer('queue_wait_seconds', "Time a frame waited to join a batch")
+        self._frames = metrics.counter('frames_total', "Frames run through the model")
+        self._batches = metrics.counter('batches_total', "Batched model calls")
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop_event.set()
+        self._thread.join(timeout=2)
+
+    def submit(self, frame) -> Future:
+        """Queue a BGR frame; the future resolves to its DetectionBatch"""
+        future = Future()
+        self._requests.put((frame, future, time.perf_counter()))
+        return future
+
+    def detect(self, frame) -> DetectionBatch:
+        return self.submit(frame).result()
+
+    def _collect(self):
+        try:
+            batch = [self._requests.get(timeout=0.1)]
+        except queue.Empty:
+            return []
+
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._requests.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self):
+        while not self._stop_event.is_set():
+            batch = self._collect()
+            if not batch:
+                continue
+
+            start = time.perf_counter()
+            for _, _, queued_at in batch:
+                self._wait_timer.observe(start - queued_at)
+
+            try:
+                results = self.model([frame for frame, _, _ in batch], verbose=False)
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+
+            self._model_timer.observe(time.perf_counter() - start)
+            self._frames.inc(len(batch))
+            self._batches.inc()
+
+            for (_, future, _), result in zip(batch, results):
+                future.set_result(DetectionBatch.from_result(result))
+
+
+class InferenceService:
+    """
+    Resident inference daemon: loads the model once and serves every tool.
+
+    POST /detect?camera=cam0&frame=12&decide=1
+        body: raw BGR pixels (X-Frame-Shape: height,width,channels header)
+        returns: {'detections': {...}, 'decision': {...} or null}
+    With decide=1 the service also runs the camera's SafetyDecisionEngine
+    (one per camera id, created on first use) and returns its decision.
+    Their incidents stream to JSONL files under incident_dir, so a service
+    running for weeks only keeps each camera's most recent ones in memory.
+    GET /health, GET /metrics
+    """
+
+    def __init__(self, model, port=DEFAULT_PORT, max_batch_size=8, max_wait_ms=10, track_workers=True,
+                 incident_dir='incidents', max_incidents_in_memory=1000):
+        self.track_workers = track_workers
+        self.incident_dir = incident_dir
+        self.max_incidents_in_memory = max_incidents_in_memory
+        self.sink = None  # Opened with the first engine
+        self.metrics = MetricsRegistry(namespace='inference_service')
+        self.batcher = DynamicBatcher(model, max_batch_size, max_wait_ms, self.metrics)
+
+        self.engines = {}  # camera_id -> (SafetyDecisionEngine, lock)
+        self._engines_lock = threading.Lock()
+        self.started_at = time.time()
+
+        self.server = MetricsServer(self.metrics, port)
+        self.server.add_route('/detect', self._detect_page, methods=('POST',))
+        self.server.add_route('/health', self._health_page)
+        self.metrics.gauge('cameras', "Cameras with a decision engine", function=lambda: len(self.engines))
+
+    def start(self):
+        self.batcher.start()
+        self.server.start()
+        return self
+
+    def stop(self):
+        """Stop serving, close every open incident and flush them all to disk"""
+        self.server.stop()
+        self.batcher.stop()
+        with self._engines_lock:
+            for engine, lock in self.engines.values():
+                with lock:
+                    engine.close_open_incidents()
+            if self.sink is not None:
+                self.sink.close()
+                print(f"📄 Streamed {self.sink.written} incident records to {self.incident_dir}/")
+
+    def decide(self, camera_id, batch, frame_num) -> dict:
+        with self._engines_lock:
+            if camera_id not in self.engines:
+                if self.sink is None:
+                    self.sink = IncidentSink(self.incident_dir)
+                engine = SafetyDecisionEngine(camera_id, track_workers=self.track_workers, sink=self.sink,
+                                              max_incidents_in_memory=self.max_incidents_in_memory)
+                self.engines[camera_id] = (engine, threading.Lock())
+            engine, lock = self.engines[camera_id]
+
+        with lock:  # Frames of one camera must reach its engine one at a time
+            return engine.analyze_batch(batch, frame_num)
+
+    def _detect_page(self, request):
+        query = parse_qs(urlparse(request.path).query)
+        length = int(request.headers.get('Content-Length', 0))
+        shape = tuple(int(value) for value in request.headers.get('X-Frame-Shape', '').split(','))
+        frame = np.frombuffer(request.rfile.read(length), dtype=np.uint8).reshape(shape)
+
+        batch = self.batcher.detect(frame)
+        decision = None
+        if query.get('decide', ['0'])[0] == '1':
+            decision = self.decide(query.get('camera', ['cam0'])[0], batch, int(query.get('frame', ['0'])[0]))
+
+        _send_json(request, {'detections': batch_to_dict(batch), 'decision': decision})
+
+    def _health_page(self, request):
+        _send_json(request, {
+            'status': 'ok',
+            'uptime_seconds': round(time.time() - self.started_at, 1),
+            'max_batch_size': self.batcher.max_batch_size,
+            'max_wait_ms': self.batcher.max_wait * 1000,
+            'cameras': sorted(self.engines),
+        })
+
+
+def _send_json(request, data):
+    body = json.dumps(data).encode()
+    request.send_response(200)
+    request.send_header('Content-Type', 'application/json')
+    request.send_header('Content-Length', str(len(body)))
+    request.end_headers()
+    request.wfile.write(body)
+
+
+class InferenceClient:
+    """
+    Thin client for InferenceService - no ultralytics/torch import,
+    so tools using it start instantly and share the daemon's model
+    """
+
+    def __init__(self, url=DEFAULT_URL, timeout=10.0):
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+
+    def detect(self, frame, camera_id='cam0', frame_num=0, decide=False):
+        """
+        Run one BGR frame through the service
+        Returns: (DetectionBatch, decision or None)
+        """
+
+        frame = np.ascontiguousarray(frame)
+        query = urlencode({'camera': camera_id, 'frame': frame_num, 'decide': int(decide)})
+        request = urllib.request.Request(f'{self.url}/detect?{query}', data=frame.tobytes(), method='POST',
+                                         headers={'X-Frame-Shape': ','.join(map(str, frame.shape)),
+                                                  'Content-Type': 'application/octet-stream'})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            data = json.load(response)
+        return batch_from_dict(data['detections']), data['decision']
+
+    def health(self) -> dict:
+        with urllib.request.urlopen(f'{self.url}/health', timeout=self.timeout) as response:
+            return json.load(response)
+
+
+def main():
+    from inference_backend import DEFAULT_WEIGHTS, BACKEND_FILES, backend_path, load_model, warm_up
+
+    parser = argparse.ArgumentParser(description="Resident helmet inference service shared by all tools")
+    parser.add_argument('--weights', default=DEFAULT_WEIGHTS)
+    parser.add_argument('--backend', default='pytorch', choices=list(BACKEND_FILES))
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--max-batch-size', type=int, default=8)
+    parser.add_argument('--max-wait-ms', type=float, default=10, help="Longest a frame waits for a batch to fill")
+    parser.add_argument('--no-tracking', action='store_true', help="Per-frame decisions instead of tracked workers")
+    parser.add_argument('--incident-dir', default='incidents', help="Folder for the daily JSONL incident files")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("🧠 HELMET INFERENCE SERVICE")
+    print("=" * 60)
+
+    if not os.path.exists(backend_path(args.backend, args.weights)):
+        print(f"❌ Model not found at {backend_path(args.backend, args.weights)}")
+        return
+
+    start = time.perf_counter()
+    print(f"📥 Loading model ({args.backend})...")
+    model = load_model(args.backend, args.weights, fused=True)
+    warm_up(model, sorted({1, args.max_batch_size}))
+    print(f"🔥 Loaded and warmed up in {time.perf_counter() - start:.1f} s")
+
+    service = InferenceService(model, args.port, args.max_batch_size, args.max_wait_ms,
+                               track_workers=not args.no_tracking, incident_dir=args.incident_dir).start()
+    print(f"✅ Serving on http://127.0.0.1:{args.port} "
+          f"(batches of up to {args.max_batch_size}, {args.max_wait_ms:g} ms max wait). Ctrl+C to stop")
+
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("\n🛑 Stopping...")
+    service.stop()
+
+
+if __name__ == "__main__":
+    main()
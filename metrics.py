@@ -0,0 +1,235 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+
+class Counter:
+    """Value that only goes up (frames, incidents, ...); can read it from a function at scrape time"""
+
+    def __init__(self, function=None):
+        self.value = 0
+        self.function = function
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def get(self):
+        return self.function() if self.function is not None else self.value
+
+
+class Gauge:
+    """Value that goes up and down; can read it from a function at scrape time"""
+
+    def __init__(self, function=None):
+        self.value = 0
+        self.function = function
+
+    def set(self, value):
+        self.value = value
+
+    def get(self):
+        return self.function() if self.function is not None else self.value
+
+
+class RateMeter:
+    """Events per second over the last window_seconds"""
+
+    def __init__(self, window_seconds=5.0):
+        self.window_seconds = window_seconds
+        self._events = deque(maxlen=1024)  # (time, count)
+
+    def mark(self, count=1):
+        self._events.append((time.monotonic(), count))
+
+    def get(self):
+        cutoff = time.monotonic() - self.window_seconds
+        recent = [count for stamp, count in list(self._events) if stamp >= cutoff]
+        return sum(recent) / self.window_seconds
+
+
+class StageTimer:
+    """
+    Durations of one pipeline stage.
+    Sum and count are exact; quantiles come from a fixed-size window of
+    every sample_every-th measurement, so the hot path only appends a float.
+    """
+
+    QUANTILES = (0.5, 0.95, 0.99)
+
+    def __init__(self, sample_every=1, window=512):
+        self.sample_every = sample_every
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        self.count += 1
+        self.sum += seconds
+        if self.count % self.sample_every == 0:
+            self.samples.append(seconds)
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def quantile(self, q):
+        samples = list(self.samples)
+        return float(np.quantile(samples, q)) if samples else 0.0
+
+
+class MetricsRegistry:
+    """
+    All monitor metrics, rendered in Prometheus text format.
+    Metrics with the same name and different labels form one family:
+        metrics.timer('stage_seconds', stage='inference')
+    """
+
+    def __init__(self, namespace='safety_monitor'):
+        self.namespace = namespace
+        self._families = {}  # name -> (type, help, {labels: metric})
+        self._lock = threading.Lock()
+
+    def _get(self, kind, factory, name, help_text, labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            family = self._families.setdefault(name, (kind, help_text, {}))
+            if key not in family[2]:
+                family[2][key] = factory()
+            return family[2][key]
+
+    def counter(self, name, help_text='', function=None, **labels) -> Counter:
+        return self._get('counter', lambda: Counter(function), name, help_text, labels)
+
+    def gauge(self, name, help_text='', function=None, **labels) -> Gauge:
+        return self._get('gauge', lambda: Gauge(function), name, help_text, labels)
+
+    def rate(self, name, help_text='', **labels) -> RateMeter:
+        return self._get('gauge', RateMeter, name, help_text, labels)
+
+    def timer(self, name, help_text='', sample_every=1, **labels) -> StageTimer:
+        return self._get('summary', lambda: StageTimer(sample_every), name, help_text, labels)
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            families = [(name, kind, help_text, list(metrics.items()))
+                        for name, (kind, help_text, metrics) in self._families.items()]
+
+        for name, kind, help_text, metrics in families:
+            full_name = f'{self.namespace}_{name}'
+            lines.append(f'# HELP {full_name} {help_text}')
+            lines.append(f'# TYPE {full_name} {kind}')
+
+            for labels, metric in metrics:
+                if kind == 'summary':
+                    for q in StageTimer.QUANTILES:
+                        lines.append(f'{full_name}{_labels(labels + (("quantile", q),))} {metric.quantile(q):.6f}')
+                    lines.append(f'{full_name}_sum{_labels(labels)} {metric.sum:.6f}')
+                    lines.append(f'{full_name}_count{_labels(labels)} {metric.count}')
+                else:
+                    lines.append(f'{full_name}{_labels(labels)} {metric.get()}')
+
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(pairs) -> str:
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{value}"' for key, value in pairs) + '}'
+
+
+class MetricsServer:
+    """
+    Small local HTTP server; /metrics serves the registry.
+    Other features can hang their own pages on it with add_route().
+    A route answers only its own methods (GET unless told otherwise);
+    any other method gets 405.
+    """
+
+    def __init__(self, registry: MetricsRegistry, port=9108, host='127.0.0.1'):
+        self.registry = registry
+        self.routes = {'/metrics': (self._metrics_page, ('GET',))}
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server._dispatch(self, 'GET')
+
+            def do_POST(self):
+                server._dispatch(self, 'POST')
+
+            def log_message(self, *args):
+                pass  # Keep the console for the monitor
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name='metrics-server', daemon=True)
+
+    def add_route(self, path, handler, methods=('GET',)):
+        """handler(request) writes the whole response using the BaseHTTPRequestHandler"""
+        self.routes[path] = (handler, tuple(methods))
+
+    def _dispatch(self, request, method):
+        route = self.routes.get(request.path.split('?')[0])
+        if route is None:
+            request.send_error(404)
+            return
+        handler, methods = route
+        if method not in methods:
+            request.send_response(405)
+            request.send_header('Allow', ', '.join(methods))
+            request.send_header('Content-Length', '0')
+            request.end_headers()
+            return
+        handler(request)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def _metrics_page(self, request):
+        body = self.registry.render().encode()
+        request.send_response(200)
+        request.send_header('Content-Type', 'text/plain; version=0.0.4')
+        request.send_header('Content-Length', str(len(body)))
+        request.end_headers()
+        request.wfile.write(body)
+
+
+# Test the metrics
+if __name__ == "__main__":
+    import urllib.request
+
+    print("Testing Metrics...\n")
+
+    metrics = MetricsRegistry()
+    frames = metrics.counter('frames_captured_total', "Frames read from the camera", camera='cam0')
+    inference = metrics.timer('stage_seconds', "Time spent per stage", stage='inference')
+    metrics.gauge('queue_depth', "Frames waiting", function=lambda: 1, queue='capture')
+
+    start = time.perf_counter()
+    for _ in range(10_000):
+        frames.inc()
+        with inference.time():
+            pass
+    overhead_us = (time.perf_counter() - start) / 10_000 * 1e6
+
+    server = MetricsServer(metrics, port=0).start()
+    port = server.httpd.server_address[1]
+    print(urllib.request.urlopen(f'http://127.0.0.1:{port}/metrics').read().decode())
+    server.stop()
+
+    print(f"Instrumentation overhead: {overhead_us:.2f} µs per counted + timed frame")
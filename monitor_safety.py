@@ -1,137 +1,680 @@
-import cv2
-from ultralytics import YOLO
+import time
+startup_began = time.perf_counter()  # Reference for the time-to-first-decision metric
+
 import os
-from safety_decision_engine import SafetyDecisionEngine, Detection
+import signal
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from safety_decision_engine import SafetyDecisionEngine, DetectionBatch, save_all_incidents
+from frame_pipeline import FramePipeline, FramePacket, parse_source
+from metrics import MetricsRegistry, MetricsServer
+# Optional features (and cv2, see "Opening cameras") are imported where they are switched on
 
 print("=" * 60)
 print("🚨 REAL-TIME SAFETY MONITORING SYSTEM")
 print("=" * 60)
 
-# Load model
+# Settings
 model_path = 'runs/detect/train6/weights/best.pt'
-if not os.path.exists(model_path):
-    print(f"❌ Model not found!")
-    exit()
+inference_backend = 'pytorch'  # 'onnx', 'onnx-int8', 'openvino', 'openvino-int8' (see export_model.py)
+inference_service_url = None  # e.g. 'http://127.0.0.1:9110' to share inference_service.py's model instead of loading one
+camera_sources = [0]  # Device indices, RTSP URLs or video files - one model serves them all
+pipelined = True  # Run capture, inference and rendering in separate threads
+motion_gating = True  # Skip YOLO while the scene is not changing
+detection_target_hz = 5  # Sequential mode: detect at least this often, machine permitting
+track_workers = True  # Follow workers between detections: one incident per worker
+incident_log_dir = 'incidents'  # Stream incidents to daily JSONL files (None = violations.json at the end)
+shift_hours = 8  # 'shift' statistics restart at 06:00 and every shift_hours after (N key or None = by hand)
+metrics_port = 9108  # Prometheus metrics at http://127.0.0.1:9108/metrics (None = off)
+show_metrics_overlay = True  # Draw FPS and latency on the video
+headless = False  # No window and no drawing; watch http://127.0.0.1:9108/preview.mjpg instead
+snapshot_dir = 'snapshots'  # Violation snapshots and POST /snapshot saves
+save_violation_snapshots = True
+alert_webhook_url = None  # POST every alert as JSON here (e.g. a Slack/Teams incoming webhook)
+alert_dir = None  # Drop every alert as a JSON file in this folder
+alert_syslog_address = None  # e.g. ('localhost', 514) to send alerts to syslog
+alert_coalesce_seconds = 2.0  # Incidents of one camera and severity within this window become one alert
+clip_dir = 'clips'  # Video + thumbnail of every violation, encoded in a background process (None = off)
+clip_pre_seconds = 5  # Clip starts this long before the violation...
+clip_post_seconds = 5  # ...and ends this long after it
+clip_fps = 10  # Memory per camera: (pre + post + 3 s) x fps frames of at most clip_max_width pixels
+clip_max_width = 640
+# Polygon zones where helmets are required, per camera; cameras without zones check the whole frame.
+# Only the zones' regions are run through the model. Rules override the engine's safety_rules, e.g.
+#   {'cam0': [('scaffolding', [(120, 80), (900, 80), (900, 700), (120, 700)], {'min_violation_frames': 3})]}
+camera_zones = {}
+zone_imgsz = 416  # Zone crops are letterboxed to the size the model was trained at
+tiled_inference = False  # Slice high-resolution frames into overlapping tiles to find small, distant helmets
+tile_budget_ms = None  # Model time allowed per frame when tiling; picks the tile count (None = up to 6 tiles)
+dynamic_resolution = True  # Switch the model input size with load, backlog and crowd size (local model only;
+                           # needs dynamic shapes: pytorch, or ONNX/OpenVINO exported by export_model.py)
+inference_sizes = (320, 416, 640)
+use_fused_model_cache = True  # Load the pre-fused best_fused.pt (built once next to best.pt)
 
-print("📥 Loading model...")
-model = YOLO(model_path)
+startup_seconds = {'imports': time.perf_counter() - startup_began}
 
-# Create decision engine
-print("🧠 Initializing safety decision engine...")
-engine = SafetyDecisionEngine()
+# Load model (or connect to the inference service that already has it loaded)
+model = None
+inference_client = None
+model_error = None
 
-print("\n📷 Starting safety monitoring...")
-print("Controls: Q=Quit, S=Save screenshot, V=View violations\n")
+# Input size for the next model call; every size is warmed up at startup so switching is free
+resolution = None
+if dynamic_resolution and not inference_service_url:
+    from resolution_controller import ResolutionController
+
+    resolution = ResolutionController(inference_sizes, zone_imgsz, latency_budget_ms=1000 / detection_target_hz)
+
+
+def load_and_warm_up():
+    """Runs while the cameras open: ultralytics/torch import, model load, warm-up"""
+    global model, model_error, resolution
+
+    try:
+        start = time.perf_counter()
+        model = load_model(inference_backend, model_path, fused=use_fused_model_cache)
+        startup_seconds['model_load'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        if resolution is not None:
+            try:
+                resolution.warm_up(model, batch_size=len(camera_sources))
+            except Exception as e:  # A fixed-shape export (older OpenVINO IR) only runs at the size it was made for
+                print(f"⚠️ {inference_backend} model has a fixed input size, staying at {zone_imgsz} px "
+                      f"(re-export with export_model.py for dynamic resolution): {e}")
+                resolution = None
+        if resolution is None:
+            warm_up(model, sorted({1, len(camera_sources)}))
+        startup_seconds['warm_up'] = time.perf_counter() - start
+    except Exception as e:
+        model_error = e
+
+
+model_loader = None
+
+if inference_service_url:
+    from inference_service import InferenceClient  # Only the thin client - no torch in this process
+
+    inference_client = InferenceClient(inference_service_url)
+    try:
+        inference_client.health()
+    except OSError:
+        print(f"❌ Inference service not reachable at {inference_service_url} - start it with: python inference_service.py")
+        exit()
+    print(f"🔌 Using inference service at {inference_service_url}")
+else:
+    from inference_backend import load_model, backend_path, warm_up
+
+    if not os.path.exists(backend_path(inference_backend, model_path)):
+        print(f"❌ Model not found!")
+        exit()
+
+    print(f"📥 Loading model ({inference_backend}) in the background...")
+    model_loader = threading.Thread(target=load_and_warm_up, name='model-loader', daemon=True)
+    model_loader.start()
+
+print("\n📷 Opening cameras...")
+start = time.perf_counter()
+import cv2  # First loaded here, while the model-loader thread is already running
+cameras = {}
+for index, source in enumerate(camera_sources):
+    camera_id = f'cam{index}'
+    camera = cv2.VideoCapture(parse_source(source))
+
+    if not camera.isOpened():
+        print(f"❌ Camera not found: {source}")
+        continue
 
-camera = cv2.VideoCapture(0)
+    print(f"   ✅ {camera_id}: {source}")
+    cameras[camera_id] = camera
 
-if not camera.isOpened():
-    print("❌ Camera not found!")
+if not cameras:
+    print("❌ No cameras available!")
     exit()
+startup_seconds['cameras'] = time.perf_counter() - start
+
+if model_loader is not None:
+    model_loader.join()
+    if model_error is not None:
+        print(f"❌ Error loading model: {model_error}")
+        exit()
+    print(f"✅ Model loaded in {startup_seconds['model_load']:.1f} s, "
+          f"warmed up in {startup_seconds['warm_up']:.1f} s")
+
+# Tiles and their count are picked per frame size from the measured model time
+tiler = None
+if tiled_inference and model is not None:
+    from tiled_inference import TiledDetector
+
+    tiler = TiledDetector(model, zone_imgsz, budget_ms=tile_budget_ms)
+
+# Create one decision engine per camera
+print("🧠 Initializing safety decision engines...")
+sink = None
+if incident_log_dir:
+    from incident_sink import IncidentSink
+
+    sink = IncidentSink(incident_log_dir)
+
+recorder = None
+if clip_dir:
+    from clip_recorder import ClipRecorder
+
+    recorder = ClipRecorder(clip_dir, clip_pre_seconds, clip_post_seconds, clip_fps, clip_max_width).start()
+
+engines = {camera_id: SafetyDecisionEngine(camera_id, track_workers=track_workers, sink=sink, recorder=recorder,
+                                           shift_hours=shift_hours)
+           for camera_id in cameras if not camera_zones.get(camera_id)}
+zoned_cameras = set(cameras) - set(engines)
+if zoned_cameras:
+    from roi_zones import Zone, ZonedSafetyEngine, crop_zone, to_frame_coordinates
+
+    for camera_id in zoned_cameras:
+        zones = [zone if isinstance(zone, Zone) else Zone(*zone) for zone in camera_zones[camera_id]]
+        engines[camera_id] = ZonedSafetyEngine(camera_id, zones, track_workers=track_workers, sink=sink,
+                                               recorder=recorder, shift_hours=shift_hours)
+
+violation_counts = {camera_id: 0 for camera_id in cameras}
+frame_counts = {camera_id: 0 for camera_id in cameras}
+
+# Motion gate per camera, plus the last result/decision to reuse while it is closed
+gates = {}
+if motion_gating:
+    from motion_gate import MotionGate
+
+    gates = {camera_id: MotionGate() for camera_id in cameras}
+last_analysis = {}
+
+# Hot-path instrumentation
+metrics = MetricsRegistry()
+stage_timers = {stage: metrics.timer('stage_seconds', "Time spent in each stage", stage=stage)
+                for stage in ('capture', 'model', 'decision', 'render', 'display')}
+latency_timer = metrics.timer('latency_seconds', "Time from capture to display")
+inference_fps = metrics.rate('inference_fps', "Frames run through the model per second")
+display_fps = metrics.rate('display_fps', "Frames shown per second")
+incident_counters = {camera_id: metrics.counter('incidents_total', "New safety incidents", camera=camera_id)
+                     for camera_id in cameras}
+startup_phases = {phase: metrics.gauge('startup_seconds', "Time spent in each startup phase", phase=phase)
+                  for phase in startup_seconds}
+for phase, seconds in startup_seconds.items():
+    startup_phases[phase].set(seconds)
+metrics.gauge('inference_imgsz', "Model input size in use", function=lambda: current_imgsz())
+time_to_first_decision = metrics.gauge('time_to_first_decision_seconds',
+                                       "Process start to the first safety decision")
+for camera_id, gate in gates.items():
+    metrics.counter('frames_gated_total', "Frames that skipped the model because nothing moved",
+                    function=lambda g=gate: g.gated_frames, camera=camera_id)
+
+# Notifications are delivered from the dispatcher's own thread; the frame loop only enqueues
+alerts = None
+if alert_webhook_url or alert_dir or alert_syslog_address:
+    from alert_dispatcher import AlertDispatcher, WebhookSink, FileSink, SyslogSink
+
+    alert_sinks = ([WebhookSink(alert_webhook_url)] if alert_webhook_url else []) + \
+                  ([FileSink(alert_dir)] if alert_dir else []) + \
+                  ([SyslogSink(alert_syslog_address)] if alert_syslog_address else [])
+    alerts = AlertDispatcher(alert_sinks, alert_coalesce_seconds, metrics=metrics).start()
+    print(f"🔔 Alerts: {', '.join(sink.name for sink in alert_sinks)}")
+
+# One request per camera in flight at once, so the service can batch them
+service_requests = ThreadPoolExecutor(max_workers=len(cameras)) if inference_client is not None else None
+
+metrics_server = None
+if metrics_port:
+    metrics_server = MetricsServer(metrics, metrics_port).start()
+    print(f"📈 Metrics: http://127.0.0.1:{metrics_port}/metrics")
+
+
+def current_imgsz():
+    return resolution.size if resolution is not None else zone_imgsz
+
+
+def downstream_backlog():
+    """
+    Analyzed frames waiting to be drawn or shown. Capture queues only ever
+    hold the newest frame, so a CPU that can't keep up shows here instead
+    """
+    if pipeline is None:
+        return 0
+    return pipeline.render_queue.qsize() + pipeline.display_queue.qsize()
+
+
+def analyze_frames(packets):
+    """
+    Run one batched detection over the latest frame of each camera
+    Returns: True if the model ran, False if every frame reused its last detections
+    """
+
+    if motion_gating:
+        # Static scenes reuse the last detections and decision
+        to_infer = []
+        for packet in packets:
+            scene_changed = gates[packet.camera_id].should_infer(packet.frame)
+            if scene_changed or packet.camera_id not in last_analysis:
+                to_infer.append(packet)
+            else:
+                packet.result, packet.decision = last_analysis[packet.camera_id]
+        packets = to_infer
+
+    if not packets:
+        return False
+
+    imgsz = current_imgsz()
+
+    # Model inputs: the crop of every active zone of zoned cameras, the whole frame of the others
+    inputs = []  # (packet, zone name or None, CropTransform or None, image)
+    for packet in packets:
+        engine = engines[packet.camera_id]
+        if packet.camera_id in zoned_cameras:
+            for zone in engine.active_zones():
+                image, transform = crop_zone(packet.frame, zone, imgsz)
+                inputs.append((packet, zone.name, transform, image))
+        else:
+            inputs.append((packet, None, None, packet.frame))
+
+    model_start = time.perf_counter()
+    if inference_client is not None:
+        batches = list(service_requests.map(
+            lambda item: inference_client.detect(item[3], item[0].camera_id, item[0].frame_number)[0],
+            inputs))
+        results = [None] * len(inputs)  # The service sends detections, not ultralytics results
+    elif inputs and tiler is not None:
+        tiler.imgsz = imgsz
+        batches = tiler.detect([image for _, _, _, image in inputs])
+        results = [None] * len(inputs)  # Merged tiles have no single ultralytics result to plot
+    elif inputs:
+        results = model([image for _, _, _, image in inputs], imgsz=imgsz, verbose=False)
+        # Convert detections to our format (one array copy for all boxes)
+        batches = [DetectionBatch.from_result(result) for result in results]
+    else:
+        results, batches = [], []
+    model_seconds = time.perf_counter() - model_start
+    stage_timers['model'].observe(model_seconds)
+    inference_fps.mark(len(inputs))
+
+    if inference_client is None:
+        for batch in batches:
+            batch.imgsz = imgsz  # Recorded with every decision and incident
+
+    full_frame = {}  # camera_id -> (result, batch)
+    zone_batches = {packet.camera_id: {} for packet in packets}  # camera_id -> {zone: batch on the full frame}
+    for (packet, zone_name, transform, _), result, batch in zip(inputs, results, batches):
+        if zone_name is None:
+            full_frame[packet.camera_id] = (result, batch)
+        else:
+            zone_batches[packet.camera_id][zone_name] = to_frame_coordinates(batch, transform)
+
+    for packet in packets:
+        start = time.perf_counter()
+        engine = engines[packet.camera_id]
 
-frame_count = 0
-violation_count = 0
-
-while True:
-    success, frame = camera.read()
-    
-    if not success:
-        break
-    
-    frame_count += 1
-    
-    # Process every 3rd frame for speed
-    if frame_count % 3 == 0:
-        # Run detection
-        results = model(frame, verbose=False)
-        annotated_frame = results[0].plot()
-        
-        # Convert detections to our format
-        detections = []
-        for box in results[0].boxes:
-            class_id = int(box.cls[0])
-            class_name = results[0].names[class_id]
-            confidence = float(box.conf[0])
-            bbox = box.xywh[0].cpu().numpy()
-            
-            detections.append(Detection(
-                object_type=class_name,
-                confidence=confidence,
-                bbox=tuple(bbox)
-            ))
-        
         # Make decision
-        decision = engine.analyze_detections(detections, frame_count)
-        
-        # Get alert message and color
-        alert_message = engine.get_alert_message(decision)
-        alert_color = engine.get_alert_color(decision)
-        
-        # Update violation count
-        if decision['safety_status'] == 'VIOLATION':
-            violation_count += 1
-        
-        # Draw alerts on frame
-        cv2.putText(annotated_frame, alert_message,
-                   (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, alert_color, 2)
-        
-        cv2.putText(annotated_frame,
-                   f"Helmets: {decision['helmets']} | People: {decision['people']} | Safety: {decision['safety_percentage']:.0f}%",
-                   (10, 70), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
-        
-        cv2.putText(annotated_frame,
-                   f"Violations Detected: {violation_count}",
-                   (10, 110), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 2)
-        
+        if packet.camera_id in zoned_cameras:
+            result = None  # Crop results can't be plotted on the full frame
+            decision = engine.analyze_zones(zone_batches[packet.camera_id], packet.frame_number)
+        else:
+            result, batch = full_frame[packet.camera_id]
+            decision = engine.analyze_batch(batch, packet.frame_number)
+
+        # Update violation count (new incidents only - a tracked worker counts once)
+        violation_counts[packet.camera_id] += len(decision['violations'])
+        incident_counters[packet.camera_id].inc(len(decision['violations']))
+        if alerts is not None:
+            for incident in decision['violations']:
+                alerts.submit(incident)
+
+        packet.result = result
+        packet.decision = decision
+        last_analysis[packet.camera_id] = (result, decision)
+        stage_timers['decision'].observe(time.perf_counter() - start)
+
+    if resolution is not None and inputs:
+        resolution.observe(model_seconds * 1000, downstream_backlog(),
+                           max(packet.decision['people'] for packet in packets))
+
+    if not time_to_first_decision.value:
+        time_to_first_decision.set(time.perf_counter() - startup_began)
+        print(f"⏱️ First decision {time_to_first_decision.value:.2f} s after start "
+              f"({', '.join(f'{phase} {seconds:.2f} s' for phase, seconds in startup_seconds.items())})")
+    return bool(inputs)
+
+
+def draw_tracks(frame, tracks):
+    """Label each tracked worker with their id (red = no helmet)"""
+    for track in tracks:
+        x, y, w, h = track['bbox']
+        color = (0, 255, 0) if track['has_helmet'] else (0, 0, 255)
+        cv2.putText(frame, f"#{track['track_id']}", (int(x - w / 2), int(y - h / 2) - 8),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+    return frame
+
+
+def draw_alerts(annotated_frame, decision, latency_ms=None, status_text=None):
+    """Draw the alert, counters and controls on an annotated frame"""
+    engine = engines[decision['camera_id']]
+    alert_message = engine.get_alert_message(decision)
+    alert_color = engine.get_alert_color(decision)
+
+    # Zone outlines (red while someone inside is unprotected)
+    if decision['camera_id'] in zoned_cameras:
+        for zone in engine.active_zones():
+            status = decision.get('zones', {}).get(zone.name, {}).get('safety_status')
+            cv2.polylines(annotated_frame, [zone.polygon.astype('int32')], True,
+                          (0, 0, 255) if status == 'VIOLATION' else (255, 200, 0), 2)
+            x, y = zone.polygon.min(axis=0).astype(int)
+            cv2.putText(annotated_frame, zone.name, (int(x) + 5, int(y) + 20),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 200, 0), 2)
+
+    # Outline every worker without a helmet
+    for x, y, w, h in decision.get('unprotected_boxes', []):
+        cv2.rectangle(annotated_frame, (int(x - w / 2), int(y - h / 2)), (int(x + w / 2), int(y + h / 2)),
+                      (0, 0, 255), 3)
+
+    draw_tracks(annotated_frame, decision.get('tracks', []))
+
+    cv2.putText(annotated_frame, alert_message,
+               (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, alert_color, 2)
+
+    cv2.putText(annotated_frame,
+               f"Helmets: {decision['protected']}/{decision['people']} worn | Safety: {decision['safety_percentage']:.0f}%",
+               (10, 70), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
+
+    cv2.putText(annotated_frame,
+               f"Violations Detected: {violation_counts[decision['camera_id']]}",
+               (10, 110), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 2)
+
+    if latency_ms is not None:
         cv2.putText(annotated_frame,
-                   "Press V to see violations | Q=Quit",
-                   (10, frame.shape[0] - 20), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (200, 200, 200), 1)
-        
-    else:
-        annotated_frame = frame
-    
-    cv2.imshow('🚨 Safety Monitoring System', annotated_frame)
-    
-    key = cv2.waitKey(1) & 0xFF
-    
+                   f"Latency: {latency_ms:.0f} ms",
+                   (10, 150), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 0), 2)
+
+    if status_text is not None:
+        cv2.putText(annotated_frame, status_text,
+                   (10, 150), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 0), 2)
+
+    cv2.putText(annotated_frame,
+               "Press V to see violations | Q=Quit",
+               (10, annotated_frame.shape[0] - 20), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (200, 200, 200), 1)
+
+    return annotated_frame
+
+
+def draw_metrics(frame):
+    """FPS and latency overlay in the top-right corner"""
+    text = (f"{display_fps.get():.1f} FPS | model {inference_fps.get():.1f} FPS "
+            f"{stage_timers['model'].quantile(0.5) * 1000:.0f} ms @ {current_imgsz()} px | "
+            f"p95 latency {latency_timer.quantile(0.95) * 1000:.0f} ms")
+    (width, _), _ = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)
+    cv2.putText(frame, text, (frame.shape[1] - width - 10, 20), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 0), 1)
+    return frame
+
+
+def show_frame(camera_id, frame, captured_at=None):
+    """Display a frame and record display metrics"""
+    start = time.perf_counter()
+    if show_metrics_overlay:
+        draw_metrics(frame)
+    cv2.imshow(f'🚨 Safety Monitoring System - {camera_id}', frame)
+    stage_timers['display'].observe(time.perf_counter() - start)
+    display_fps.mark()
+    if captured_at is not None:
+        latency_timer.observe(time.perf_counter() - captured_at)
+
+
+def plot_result(packet):
+    """Frame with the model's boxes drawn on it (a plain copy when detections came from the service)"""
+    if packet.result is None:
+        return packet.frame.copy()
+    return packet.result.plot(img=packet.frame)
+
+
+def render_packet(packet):
+    """Render stage of the pipeline: boxes + alerts for an analyzed frame"""
+    return draw_alerts(plot_result(packet), packet.decision, packet.latency_ms)
+
+
+# Frames are only drawn for the preview stream and snapshots (always on in headless mode)
+preview = None
+if metrics_server is not None or save_violation_snapshots:
+    from preview_stream import PreviewStream
+
+    preview = PreviewStream(render_packet, snapshot_dir)
+    metrics.gauge('preview_clients', "Connected MJPEG preview clients", function=lambda: preview.viewers)
+    metrics.counter('frames_rendered_on_demand_total', "Frames drawn for the preview and snapshots",
+                    function=lambda: preview.frames_rendered)
+if metrics_server is not None:
+    preview.add_routes(metrics_server)
+    print(f"🎥 Preview: http://127.0.0.1:{metrics_port}/preview.mjpg | Snapshot: POST /snapshot")
+elif headless:
+    print("⚠️ Headless without metrics_port: no preview stream or snapshot API")
+
+
+def publish(packet):
+    """Hand an analyzed packet to the preview stream and keep evidence of violations"""
+    if preview is None:
+        return
+    preview.publish(packet)
+    if save_violation_snapshots and packet.decision['violations']:
+        filename = preview.save_violation(packet)
+        if filename:
+            print(f"📸 Violation snapshot: {filename}")
+
+
+def print_statistics():
+    """Print violation statistics for every camera"""
+    for camera_id, engine in engines.items():
+        stats = engine.get_statistics()
+        print(f"📷 {camera_id}:")
+        print(f"  Total Violations: {stats['total_incidents']}")
+        print(f"  High Severity: {stats['high_severity']}")
+        print(f"  Medium Severity: {stats['medium_severity']}")
+        print(f"  Low Severity: {stats['low_severity']}")
+        print(f"  Mean Safety: {stats['mean_safety_percentage']:.0f}% over {stats['frames_analyzed']} analyzed frames")
+
+        for window_name, window in stats['windows'].items():
+            print(f"    {window_name}: {window['total_incidents']} incidents, "
+                  f"violation rate {window['violation_rate']:.0f}%, "
+                  f"mean safety {window['mean_safety_percentage']:.0f}%")
+
+        if motion_gating:
+            gate_stats = gates[camera_id].get_statistics()
+            print(f"  Frames Inferred: {gate_stats['inferred_frames']} | "
+                  f"Skipped (no motion): {gate_stats['gated_frames']} ({gate_stats['gated_percentage']:.0f}%)")
+
+
+def handle_key(key, annotated_frames):
+    """
+    Handle keyboard commands
+    Returns: False when the user wants to quit
+    """
+
     if key == ord('q'):
-        break
-    
+        return False
+
     if key == ord('v'):
         # Show violations
-        stats = engine.get_statistics()
         print("\n" + "=" * 60)
         print("📊 VIOLATION STATISTICS")
         print("=" * 60)
-        print(f"Total Violations: {stats['total_incidents']}")
-        print(f"High Severity: {stats['high_severity']}")
-        print(f"Medium Severity: {stats['medium_severity']}")
-        print(f"Low Severity: {stats['low_severity']}")
+        print_statistics()
         print("=" * 60 + "\n")
-    
+
+    if key == ord('n'):
+        for engine in engines.values():
+            engine.start_shift()
+        print("🕐 New shift started - the previous one is listed as previous_shift (V)")
+
     if key == ord('s'):
-        filename = f'safety_monitor_{frame_count}.png'
-        cv2.imwrite(filename, annotated_frame)
-        print(f"📸 Saved: {filename}")
+        for camera_id, annotated_frame in annotated_frames.items():
+            filename = f'safety_monitor_{camera_id}_{frame_counts[camera_id]}.png'
+            cv2.imwrite(filename, annotated_frame)
+            print(f"📸 Saved: {filename}")
+
+    return True
+
+
+# Ctrl+C / SIGTERM end the session cleanly (the only way to stop a headless monitor)
+stop_requested = threading.Event()
+signal.signal(signal.SIGINT, lambda *args: stop_requested.set())
+signal.signal(signal.SIGTERM, lambda *args: stop_requested.set())
+
+print("\n📷 Starting safety monitoring...")
+if headless:
+    print("🖥️ Headless mode: no window, frames are drawn only on request. Ctrl+C to stop\n")
+else:
+    print("Controls: Q=Quit, S=Save screenshot, V=View violations, N=Start a new shift\n")
+
+annotated_frames = {}  # Last frame shown for each camera
+pipeline = None
+
+if pipelined:
+    print("⚡ Pipelined mode: capture, inference and rendering run in parallel")
+    pipeline = FramePipeline(cameras, analyze_frames, None if headless else render_packet, metrics=metrics,
+                             on_capture=recorder.push if recorder is not None else None)
+    pipeline.start()
+
+    latencies = deque(maxlen=30)  # Recent ones for the periodic report
+    latency_sum, latency_count = 0.0, 0  # Whole run, for the final average
+
+    while pipeline.running and not stop_requested.is_set():
+        packet = pipeline.get_frame()
+
+        if packet is not None:
+            frame_counts[packet.camera_id] = packet.frame_number
+            latencies.append(packet.latency_ms)
+            latency_sum += packet.latency_ms
+            latency_count += 1
+            publish(packet)
+            if not headless:
+                annotated_frames[packet.camera_id] = packet.annotated_frame
+                show_frame(packet.camera_id, packet.annotated_frame, packet.captured_at)
+
+            # Report end-to-end latency every 30 analyzed frames
+            if latency_count % 30 == 0:
+                print(f"⏱️ {packet.camera_id} frame {packet.frame_number}: latency {packet.latency_ms:.0f} ms "
+                      f"(avg {sum(latencies) / len(latencies):.0f} ms)")
+
+        if headless:
+            continue
+        key = cv2.waitKey(1) & 0xFF
+        if not handle_key(key, annotated_frames):
+            break
+
+    pipeline.stop()
+    if pipeline.error is not None:
+        print(f"❌ Detection stopped after repeated errors: {pipeline.error!r}")
+
+    if latency_count:
+        print(f"\n⏱️ Average end-to-end latency: {latency_sum / latency_count:.0f} ms")
+        print(f"⚡ Analyzed {pipeline.frames_analyzed} of {sum(pipeline.frames_captured.values())} frames "
+              f"in {pipeline.batches_run} batches ({pipeline.frames_dropped} stale frames dropped)")
+
+else:
+    from frame_scheduler import AdaptiveScheduler
+
+    scheduler = AdaptiveScheduler(target_hz=detection_target_hz)
+    clip_errors = 0
+
+    while cameras and not stop_requested.is_set():
+        # Grab one frame from every camera that is still delivering
+        frames = {}
+        captured_at = {}
+        for camera_id, camera in list(cameras.items()):
+            with stage_timers['capture'].time():
+                success, frame = camera.read()
+            if not success:
+                camera.release()
+                del cameras[camera_id]
+                continue
+
+            frame_counts[camera_id] += 1
+            if recorder is not None:
+                try:
+                    recorder.push(camera_id, frame)
+                except Exception as e:  # Clips are best effort, the camera keeps going
+                    clip_errors += 1
+                    if clip_errors == 1 or clip_errors % 100 == 0:
+                        print(f"⚠️ Clip buffer failed for {camera_id} ({clip_errors} so far): {e!r}")
+            frames[camera_id] = frame
+            captured_at[camera_id] = time.perf_counter()
+
+        if not frames:
+            break
+
+        # Detection interval adapts to how fast inference currently is
+        if scheduler.should_detect():
+            packets = [FramePacket(camera_id, frame_counts[camera_id], frame, captured_at[camera_id])
+                       for camera_id, frame in frames.items()]
+
+            start = time.perf_counter()
+            if analyze_frames(packets):  # Gated frames are nearly free and would understate the model's cost
+                scheduler.record_inference(time.perf_counter() - start)
+
+            if not headless:
+                with stage_timers['render'].time():
+                    for packet in packets:
+                        packet.annotated_frame = draw_alerts(plot_result(packet), packet.decision,
+                                                             status_text=scheduler.status_text())
+                        annotated_frames[packet.camera_id] = packet.annotated_frame
+
+            for packet in packets:
+                publish(packet)
+        elif headless:
+            pass  # Nothing to draw between detections
+        elif track_workers:
+            # Between detections, carry the tracked workers forward
+            with stage_timers['render'].time():
+                for camera_id, frame in frames.items():
+                    annotated_frames[camera_id] = draw_tracks(frame, engines[camera_id].predict_tracks(frame_counts[camera_id]))
+        else:
+            annotated_frames.update(frames)
+
+        if headless:
+            continue
+
+        for camera_id in frames:
+            show_frame(camera_id, annotated_frames[camera_id], captured_at[camera_id])
+
+        key = cv2.waitKey(1) & 0xFF
+        if not handle_key(key, annotated_frames):
+            break
 
 # Clean up
-camera.release()
-cv2.destroyAllWindows()
+for camera in cameras.values():
+    camera.release()
+if not headless:
+    cv2.destroyAllWindows()
+if metrics_server is not None:
+    metrics_server.stop()
+if alerts is not None:
+    alerts.stop()  # Sends what is still coalescing or queued (up to 5 s)
+if service_requests is not None:
+    service_requests.shutdown()
 
 print("\n" + "=" * 60)
 print("🛑 MONITORING STOPPED")
 print("=" * 60)
 
 # Show final statistics
-stats = engine.get_statistics()
 print(f"\n📊 FINAL STATISTICS:")
-print(f"  Total Violations Detected: {stats['total_incidents']}")
-print(f"  High Severity: {stats['high_severity']}")
-print(f"  Medium Severity: {stats['medium_severity']}")
-print(f"  Low Severity: {stats['low_severity']}")
+print_statistics()
 
 # Save violations
-engine.save_incidents('violations.json')
+for engine in engines.values():
+    engine.close_open_incidents()
+
+if sink is not None:
+    sink.close()
+    print(f"📄 Streamed {sink.written} incident records to {incident_log_dir}/")
+else:
+    save_all_incidents(engines.values(), 'violations.json')
+
+if recorder is not None:
+    buffer_mb = recorder.memory_bytes / 1e6
+    recorder.stop()  # Clips still recording end with the frames already captured
+    print(f"🎬 Saved {recorder.clips_saved}/{recorder.clips_requested} violation clips to {clip_dir}/ "
+          f"({buffer_mb:.0f} MB pre-roll buffers)")
 
 print("\n✅ Safety monitoring session complete!")
-print("=" * 60)
\ No newline at end of file
+print("=" * 60)
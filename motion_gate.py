@@ -0,0 +1,96 @@
+import time
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """
+    Cheap pre-filter that decides whether a frame is worth running YOLO on.
+
+    Each frame is shrunk to a small grayscale image and compared with a
+    running-average background. Inference only runs when enough pixels
+    changed, or when refresh_seconds passed since the last inference
+    (so a worker standing perfectly still is still re-checked).
+    """
+
+    def __init__(self, motion_threshold=0.01, pixel_threshold=25,
+                 refresh_seconds=2.0, downscale_width=160, learning_rate=0.05):
+        self.motion_threshold = motion_threshold  # Fraction of pixels that must change
+        self.pixel_threshold = pixel_threshold  # Gray-level difference that counts as change
+        self.refresh_seconds = refresh_seconds
+        self.downscale_width = downscale_width
+        self.learning_rate = learning_rate  # How fast the background adapts (lighting etc.)
+
+        self.background = None
+        self.last_inference = 0.0
+        self.last_motion = 0.0  # Fraction of changed pixels in the last frame
+
+        self.inferred_frames = 0
+        self.gated_frames = 0
+
+    def _prepare(self, frame):
+        height, width = frame.shape[:2]
+        scale = self.downscale_width / width
+        small = cv2.resize(frame, (self.downscale_width, max(1, int(height * scale))),
+                           interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+        return cv2.GaussianBlur(gray, (5, 5), 0)
+
+    def should_infer(self, frame) -> bool:
+        """
+        Feed a frame through the gate
+        Returns: True if the frame needs full detection
+        """
+
+        gray = self._prepare(frame)
+
+        if self.background is None:
+            self.background = gray.astype(np.float32)
+            self.last_motion = 1.0
+        else:
+            diff = cv2.absdiff(gray, cv2.convertScaleAbs(self.background))
+            self.last_motion = np.count_nonzero(diff > self.pixel_threshold) / diff.size
+            cv2.accumulateWeighted(gray, self.background, self.learning_rate)
+
+        now = time.monotonic()
+        refresh_due = now - self.last_inference >= self.refresh_seconds
+
+        if self.last_motion >= self.motion_threshold or refresh_due:
+            self.last_inference = now
+            self.inferred_frames += 1
+            return True
+
+        self.gated_frames += 1
+        return False
+
+    def get_statistics(self) -> dict:
+        """
+        How many frames were skipped vs. sent to the model
+        """
+
+        total = self.inferred_frames + self.gated_frames
+
+        return {
+            'inferred_frames': self.inferred_frames,
+            'gated_frames': self.gated_frames,
+            'gated_percentage': (self.gated_frames / total * 100) if total else 0.0,
+        }
+
+
+# Test the gate
+if __name__ == "__main__":
+    print("Testing Motion Gate...\n")
+
+    gate = MotionGate(refresh_seconds=60)
+    scene = np.full((480, 640, 3), 90, dtype=np.uint8)
+
+    # Static scene: only the first frame should be inferred
+    for _ in range(50):
+        gate.should_infer(scene)
+    print(f"Static scene: {gate.get_statistics()}")
+
+    # Someone walks in
+    moving = scene.copy()
+    cv2.rectangle(moving, (200, 100), (320, 400), (230, 230, 230), -1)
+    print(f"Person enters -> infer: {gate.should_infer(moving)} "
+          f"(motion {gate.last_motion * 100:.1f}%)")
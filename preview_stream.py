@@ -0,0 +1,168 @@
+import json
+import os
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+import cv2
+
+
+class PreviewStream:
+    """
+    Renders annotated frames only when someone asks for one.
+
+    The monitor publishes every analyzed packet (a reference - nothing is
+    copied or drawn). Frames are rendered with render(packet) only for:
+      - MJPEG clients of /preview.mjpg, while they are connected
+      - snapshots requested through /snapshot
+      - violation snapshots (save_violation)
+    so a headless monitor nobody is watching spends no CPU on drawing.
+    """
+
+    def __init__(self, render, snapshot_dir='snapshots', max_fps=10, jpeg_quality=80):
+        self.render = render
+        self.snapshot_dir = snapshot_dir
+        self.max_fps = max_fps
+        self.jpeg_quality = jpeg_quality
+
+        self.viewers = 0  # Connected MJPEG clients
+        self.frames_rendered = 0
+
+        self._latest = {}  # camera_id -> newest analyzed packet
+        self._saved_violations = {}  # camera_id -> frame of the last violation snapshot
+        self._condition = threading.Condition()
+
+    @property
+    def watching(self) -> bool:
+        return self.viewers > 0
+
+    def publish(self, packet):
+        """Called for every analyzed packet; only wakes the stream if a client is connected"""
+        self._latest[packet.camera_id] = packet
+        if self.viewers:
+            with self._condition:
+                self._condition.notify_all()
+
+    def annotated(self, packet):
+        """Annotated frame for a packet, rendering it if nobody has yet"""
+        if packet.annotated_frame is None:
+            packet.annotated_frame = self.render(packet)
+            self.frames_rendered += 1
+        return packet.annotated_frame
+
+    def save_snapshots(self):
+        """Render and save the newest frame of every camera (the API version of the S key)"""
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        filenames = []
+        for camera_id, packet in list(self._latest.items()):
+            filename = os.path.join(self.snapshot_dir, f'safety_monitor_{camera_id}_{packet.frame_number}.png')
+            cv2.imwrite(filename, self.annotated(packet))
+            filenames.append(filename)
+        return filenames
+
+    def save_violation(self, packet):
+        """Save the annotated frame of a new violation, once per analyzed frame"""
+        decision = packet.decision
+        if not decision['violations'] or self._saved_violations.get(packet.camera_id) == decision['frame']:
+            return None  # Motion gating can hand us the same decision again
+
+        self._saved_violations[packet.camera_id] = decision['frame']
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        filename = os.path.join(self.snapshot_dir, f"violation_{packet.camera_id}_{decision['frame']}.jpg")
+        cv2.imwrite(filename, self.annotated(packet))
+        return filename
+
+    def add_routes(self, server):
+        """Serve /preview.mjpg?camera=cam0 and /snapshot from a MetricsServer"""
+        server.add_route('/preview.mjpg', self._stream_page)
+        server.add_route('/snapshot', self._snapshot_page, methods=('POST',))
+
+    def _encode(self, packet):
+        success, jpeg = cv2.imencode('.jpg', self.annotated(packet), [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+        return jpeg.tobytes() if success else None
+
+    def _stream_page(self, request):
+        query = parse_qs(urlparse(request.path).query)
+        camera_id = query.get('camera', [next(iter(self._latest), 'cam0')])[0]
+
+        request.send_response(200)
+        request.send_header('Content-Type', 'multipart/x-mixed-replace; boundary=frame')
+        request.send_header('Cache-Control', 'no-cache')
+        request.end_headers()
+
+        with self._condition:
+            self.viewers += 1
+        try:
+            last_packet = None
+            while True:
+                with self._condition:
+                    self._condition.wait(timeout=1.0)
+
+                packet = self._latest.get(camera_id)
+                if packet is None or packet is last_packet:
+                    continue
+                last_packet = packet
+
+                jpeg = self._encode(packet)
+                if jpeg is None:
+                    continue
+                request.wfile.write(b'--frame\r\nContent-Type: image/jpeg\r\n'
+                                    b'Content-Length: %d\r\n\r\n' % len(jpeg) + jpeg + b'\r\n')
+                time.sleep(1 / self.max_fps)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # Client went away
+        finally:
+            with self._condition:
+                self.viewers -= 1
+
+    def _snapshot_page(self, request):
+        body = json.dumps({'saved': self.save_snapshots()}).encode()
+        request.send_response(200)
+        request.send_header('Content-Type', 'application/json')
+        request.send_header('Content-Length', str(len(body)))
+        request.end_headers()
+        request.wfile.write(body)
+
+
+# Test the preview stream
+if __name__ == "__main__":
+    import tempfile
+    import urllib.request
+
+    import numpy as np
+    from frame_pipeline import FramePacket
+    from metrics import MetricsRegistry, MetricsServer
+
+    print("Testing Preview Stream...\n")
+
+    def render(packet):
+        frame = packet.frame.copy()
+        cv2.putText(frame, f"frame {packet.frame_number}", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
+        return frame
+
+    preview = PreviewStream(render, snapshot_dir=tempfile.mkdtemp())
+    server = MetricsServer(MetricsRegistry(), port=0).start()
+    preview.add_routes(server)
+    port = server.httpd.server_address[1]
+
+    def publish_frames(count):
+        for frame_number in range(1, count + 1):
+            packet = FramePacket('cam0', frame_number, np.zeros((240, 320, 3), np.uint8), time.perf_counter())
+            packet.decision = {'frame': frame_number, 'violations': []}
+            preview.publish(packet)
+            time.sleep(0.01)
+
+    publish_frames(100)
+    print(f"  Nobody watching: {preview.frames_rendered} frames rendered")
+
+    stream = urllib.request.urlopen(f'http://127.0.0.1:{port}/preview.mjpg?camera=cam0')
+    threading.Thread(target=publish_frames, args=(100,), daemon=True).start()
+    received = 0
+    while received < 5:
+        received += stream.readline().startswith(b'--frame')
+    stream.close()
+    print(f"  With a viewer: {preview.frames_rendered} frames rendered, {received} MJPEG parts received")
+
+    saved = json.loads(urllib.request.urlopen(f'http://127.0.0.1:{port}/snapshot', data=b'').read())
+    print(f"  Snapshot via API: {saved['saved']}")
+    server.stop()
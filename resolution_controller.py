@@ -0,0 +1,111 @@
+import time
+import numpy as np
+
+
+class ResolutionController:
+    """
+    Picks the model input size (e.g. 320 / 416 / 640) from how loaded the
+    monitor is, as a middle ground between full accuracy and dropping frames.
+
+    Call observe() after every model call. It steps one size down when
+    inference runs over latency_budget_ms or frames queue up behind it, and
+    one size up when the next size would still fit the budget. Sizes above
+    default_size are only used for crowded scenes (many people means small
+    heads); when the crowd leaves, the controller drifts back to the default.
+    A switch needs `patience` observations in a row asking for it and at
+    least cooldown_seconds since the last one, so it doesn't flap.
+    Switching only changes the imgsz passed to the model - see warm_up().
+    """
+
+    def __init__(self, sizes=(320, 416, 640), default_size=416, latency_budget_ms=200, queue_limit=1,
+                 crowd_people=6, headroom=0.8, patience=5, cooldown_seconds=5.0, smoothing=0.2, verbose=True):
+        self.sizes = sorted(sizes)
+        self.default_size = default_size
+        self.latency_budget_ms = latency_budget_ms
+        self.queue_limit = queue_limit  # Frames waiting for inference before it counts as overload
+        self.crowd_people = crowd_people
+        self.headroom = headroom  # Step up only if the next size is predicted under this share of the budget
+        self.patience = patience
+        self.cooldown_seconds = cooldown_seconds
+        self.smoothing = smoothing
+        self.verbose = verbose
+
+        self.size = default_size
+        self.latency_ms = None  # Moving average of model time at the current size
+        self.switches = 0
+
+        self._wanted = 0  # -1 / +1 direction asked for by the last observations
+        self._streak = 0
+        self._last_switch = 0.0
+
+    def warm_up(self, model, frame_shape=(480, 640, 3), batch_size=1):
+        """Run every size once at startup so the first switch doesn't pay allocation costs"""
+        frame = np.zeros(frame_shape, dtype=np.uint8)
+        for size in self.sizes:
+            model([frame] * batch_size, imgsz=size, verbose=False)
+
+    def _predicted_ms(self, size) -> float:
+        """Model time scales roughly with the number of input pixels"""
+        return self.latency_ms * (size / self.size) ** 2
+
+    def observe(self, inference_ms, queue_depth=0, people=0) -> int:
+        """
+        Report one model call (and the last decision's people count)
+        Returns: the size to use for the next frames
+        """
+
+        if self.latency_ms is None:
+            self.latency_ms = inference_ms
+        else:
+            self.latency_ms += self.smoothing * (inference_ms - self.latency_ms)
+
+        index = self.sizes.index(self.size)
+        ceiling = self.sizes[-1] if people >= self.crowd_people else self.default_size
+
+        if index > 0 and (self.latency_ms > self.latency_budget_ms or queue_depth > self.queue_limit
+                          or self.size > ceiling):
+            wanted = -1
+        elif (index + 1 < len(self.sizes) and self.sizes[index + 1] <= ceiling and queue_depth == 0
+              and self._predicted_ms(self.sizes[index + 1]) < self.headroom * self.latency_budget_ms):
+            wanted = 1
+        else:
+            wanted = 0
+
+        self._streak = self._streak + 1 if wanted == self._wanted else 1
+        self._wanted = wanted
+
+        now = time.monotonic()
+        if wanted and self._streak >= self.patience and now - self._last_switch >= self.cooldown_seconds:
+            self._switch(self.sizes[index + wanted], now, queue_depth, people)
+
+        return self.size
+
+    def _switch(self, size, now, queue_depth, people):
+        if self.verbose:
+            print(f"🔍 Inference size {self.size} → {size} (model {self.latency_ms:.0f} ms, "
+                  f"queue {queue_depth}, {people} people)")
+        self.latency_ms = self._predicted_ms(size)
+        self.size = size
+        self.switches += 1
+        self._last_switch = now
+        self._streak = 0
+
+
+# Test the controller
+if __name__ == "__main__":
+    print("Testing Resolution Controller...\n")
+
+    controller = ResolutionController(latency_budget_ms=120, cooldown_seconds=0, verbose=True)
+    ms_per_pixel = 90 / 416 ** 2  # 90 ms at 416
+
+    def simulate(label, frames, load=1.0, people=0, queue_depth=0):
+        for _ in range(frames):
+            controller.observe(ms_per_pixel * controller.size ** 2 * load, queue_depth, people)
+        print(f"  {label}: {controller.size}\n")
+
+    simulate("Normal load", 20)
+    simulate("CPU contention (1.5x slower)", 20, load=1.5)
+    simulate("Load gone", 20)
+    simulate("Crowded scene on a fast box", 20, load=0.3, people=10)
+    simulate("Crowd leaves", 20, load=0.3)
+    print(f"  {controller.switches} switches")
@@ -0,0 +1,211 @@
+from dataclasses import dataclass, field
+from typing import NamedTuple
+import time
+import numpy as np
+from inference_backend import letterbox
+from safety_decision_engine import SafetyDecisionEngine, DetectionBatch
+from incident_stats import IncidentStatistics
+
+
+@dataclass
+class Zone:
+    """A polygon area of one camera where helmets are required"""
+    name: str  # 'scaffolding', 'loading_bay', ...
+    polygon: np.ndarray  # (n, 2) corner points in full-frame pixels
+    rules: dict = field(default_factory=dict)  # Overrides for SafetyDecisionEngine.safety_rules
+    active: bool = True
+
+    def __post_init__(self):
+        self.polygon = np.asarray(self.polygon, dtype=np.float32).reshape(-1, 2)
+
+    def bounds(self, frame_shape, margin=0.15) -> tuple:
+        """
+        Bounding rectangle of the polygon, grown by margin of its size so
+        the heads of people standing at the zone's edge are in the crop too
+        Returns: (x1, y1, x2, y2) clipped to the frame
+        """
+        height, width = frame_shape[:2]
+        low, high = self.polygon.min(axis=0), self.polygon.max(axis=0)
+        grow = (high - low) * margin
+        x1, y1 = np.maximum(low - grow, 0).astype(int).tolist()
+        x2, y2 = np.minimum(high + grow, [width, height]).astype(int).tolist()
+        return x1, y1, x2, y2
+
+    def contains(self, points: np.ndarray) -> np.ndarray:
+        """Even-odd rule point-in-polygon test for (n, 2) points at once"""
+        points = np.asarray(points, dtype=np.float32).reshape(-1, 2)
+        x, y = points[:, 0:1], points[:, 1:2]
+        x1, y1 = self.polygon[:, 0], self.polygon[:, 1]
+        x2, y2 = np.roll(x1, -1), np.roll(y1, -1)
+
+        crosses = (y1 > y) != (y2 > y)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            x_cross = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+        return np.count_nonzero(crosses & (x < x_cross), axis=1) % 2 == 1
+
+
+class CropTransform(NamedTuple):
+    """How a letterboxed zone crop maps back onto the full frame"""
+    scale: float
+    pad_x: int
+    pad_y: int
+    offset_x: int
+    offset_y: int
+
+
+def crop_region(frame, region, size=416):
+    """
+    Cut (x1, y1, x2, y2) out of the frame and letterbox it to the model's
+    input size, so crops of any shape batch together
+    Returns: (size x size image, CropTransform)
+    """
+    x1, y1, x2, y2 = region
+    image, scale, (pad_x, pad_y) = letterbox(frame[y1:y2, x1:x2], size)
+    return image, CropTransform(scale, pad_x, pad_y, x1, y1)
+
+
+def crop_zone(frame, zone: Zone, size=416):
+    """Letterboxed crop of a zone's bounding region - Returns: (image, CropTransform)"""
+    return crop_region(frame, zone.bounds(frame.shape), size)
+
+
+def to_frame_coordinates(batch: DetectionBatch, transform: CropTransform) -> DetectionBatch:
+    """Detections on a letterboxed crop -> detections on the full frame"""
+    boxes = batch.boxes / transform.scale
+    boxes[:, 0] += transform.offset_x - transform.pad_x / transform.scale
+    boxes[:, 1] += transform.offset_y - transform.pad_y / transform.scale
+    return DetectionBatch(batch.class_ids, batch.confidences, boxes, batch.names, batch.imgsz)
+
+
+class ZonedSafetyEngine:
+    """
+    Safety decisions for a camera split into zones.
+
+    Every zone gets its own SafetyDecisionEngine (camera id 'cam0/zone'),
+    whose safety_rules are the defaults extended by the zone's rules.
+    A person belongs to a zone when their feet (bottom centre of the box)
+    are inside its polygon, so people in unmonitored areas never raise
+    violations. analyze_zones() merges the zones into one decision with
+    the same keys as SafetyDecisionEngine.analyze_batch, plus 'zones'.
+    """
+
+    def __init__(self, camera_id, zones, track_workers=False, sink=None, recorder=None, shift_hours=None):
+        self.camera_id = camera_id
+        self.zones = zones
+        self.engines = {}
+        for zone in zones:
+            engine = SafetyDecisionEngine(f'{camera_id}/{zone.name}', track_workers=track_workers, sink=sink,
+                                          recorder=recorder, shift_hours=shift_hours)
+            engine.safety_rules.update(zone.rules)
+            self.engines[zone.name] = engine
+        # Whole camera; each zone engine keeps its own too
+        self.statistics = IncidentStatistics(shift_hours=shift_hours)
+
+    @property
+    def incidents(self) -> list:
+        return sorted((incident for engine in self.engines.values() for incident in engine.incidents),
+                      key=lambda incident: incident.timestamp)
+
+    def active_zones(self) -> list:
+        return [zone for zone in self.zones if zone.active]
+
+    def analyze_zones(self, batches: dict, frame_num: int) -> dict:
+        """
+        batches: {zone name: DetectionBatch in full-frame coordinates}
+        Returns: decision report for the whole camera
+        """
+
+        decisions = {}
+        for zone in self.active_zones():
+            batch = batches.get(zone.name)
+            if batch is None:
+                continue
+
+            x, y, _, height = batch.boxes.T
+            inside = zone.contains(np.stack([x, y + height / 2], axis=1))
+            decisions[zone.name] = self.engines[zone.name].analyze_batch(
+                batch.filter(~batch.class_mask('person') | inside), frame_num)
+
+        people = sum(decision['people'] for decision in decisions.values())
+        protected = sum(decision['protected'] for decision in decisions.values())
+        violation = any(decision['safety_status'] == 'VIOLATION' for decision in decisions.values())
+
+        decision = {
+            'camera_id': self.camera_id,
+            'frame': frame_num,
+            'timestamp': next(iter(decisions.values()))['timestamp'] if decisions else None,
+            'people': people,
+            'helmets': sum(decision['helmets'] for decision in decisions.values()),
+            'protected': protected,
+            'unprotected_boxes': [box for decision in decisions.values() for box in decision['unprotected_boxes']],
+            'violations': [incident for decision in decisions.values() for incident in decision['violations']],
+            'tracks': [track for decision in decisions.values() for track in decision.get('tracks', [])],
+            'safety_status': 'VIOLATION' if violation else 'SAFE',
+            'safety_percentage': protected / people * 100 if people else 100,
+            'imgsz': next(iter(decisions.values()))['imgsz'] if decisions else None,
+            'zones': {name: {'safety_status': decision['safety_status'],
+                             'people': decision['people'],
+                             'protected': decision['protected']} for name, decision in decisions.items()},
+        }
+
+        now = time.time()
+        self.statistics.record_frame(violation, decision['safety_percentage'], now)
+        for incident in decision['violations']:
+            self.statistics.record_incident(incident['severity'], now)
+
+        return decision
+
+    def predict_tracks(self, frame_num: int) -> list:
+        return [track for engine in self.engines.values() for track in engine.predict_tracks(frame_num)]
+
+    def close_open_incidents(self):
+        for engine in self.engines.values():
+            engine.close_open_incidents()
+
+    def get_alert_message(self, decision: dict) -> str:
+        return SafetyDecisionEngine.get_alert_message(self, decision)
+
+    def get_alert_color(self, decision: dict) -> tuple:
+        return SafetyDecisionEngine.get_alert_color(self, decision)
+
+    def get_statistics(self) -> dict:
+        return self.statistics.summary()
+
+    def start_shift(self):
+        self.statistics.start_shift()
+        for engine in self.engines.values():
+            engine.start_shift()
+
+
+# Test the zones
+if __name__ == "__main__":
+    from safety_decision_engine import Detection
+
+    print("Testing ROI Zones...\n")
+
+    frame = np.zeros((1080, 1920, 3), dtype=np.uint8)
+    scaffolding = Zone('scaffolding', [(100, 100), (900, 100), (900, 900), (100, 900)], {'min_detection_confidence': 0.6})
+    loading_bay = Zone('loading_bay', [(1200, 500), (1800, 500), (1800, 1000), (1200, 1000)])
+
+    image, transform = crop_zone(frame, scaffolding)
+    print(f"  Crop: {image.shape} from bounds {scaffolding.bounds(frame.shape)}, scale {transform.scale:.3f}")
+
+    # A box found at the centre of the crop lands at the centre of the zone
+    crop_batch = DetectionBatch.from_detections([Detection('person', 0.9, (208, 208, 40, 80))])
+    print(f"  Crop centre -> frame: {to_frame_coordinates(crop_batch, transform).boxes[0][:2]}")
+
+    engine = ZonedSafetyEngine('cam0', [scaffolding, loading_bay])
+    batches = {
+        'scaffolding': DetectionBatch.from_detections([
+            Detection('person', 0.9, (500, 500, 100, 200)),  # Inside, no helmet
+            Detection('person', 0.9, (1000, 500, 100, 200)),  # Feet outside the polygon
+        ]),
+        'loading_bay': DetectionBatch.from_detections([
+            Detection('person', 0.9, (1500, 700, 100, 200)),
+            Detection('helmet', 0.9, (1500, 620, 60, 40)),
+        ]),
+    }
+    decision = engine.analyze_zones(batches, frame_num=1)
+    print(f"  Alert: {engine.get_alert_message(decision)}")
+    print(f"  Zones: {decision['zones']}")
+    print(f"  Incidents: {[incident.camera_id for incident in engine.incidents]}")
@@ -1,7 +1,15 @@
+from array import array
+from collections import deque
 from dataclasses import dataclass
 from datetime import datetime
-from typing import List
+from enum import IntEnum
+from typing import List, Optional
 import json
+import time
+import numpy as np
+from helmet_association import associate_helmets
+from tracker import IoUTracker
+from incident_stats import IncidentStatistics
 
 @dataclass
 class Detection:
@@ -11,13 +19,124 @@ class Detection:
     bbox: tuple  # (x, y, width, height)
 
 @dataclass
+class DetectionBatch:
+    """
+    All detections of one frame, stored column by column
+    (one NumPy array per field instead of one object per box)
+    """
+    class_ids: np.ndarray  # (n,) int class index
+    confidences: np.ndarray  # (n,) 0.0 to 1.0
+    boxes: np.ndarray  # (n, 4) as (x, y, width, height)
+    names: dict  # class index -> 'helmet', 'person', ...
+    imgsz: Optional[int] = None  # Model input size the detections were made at
+    
+    @classmethod
+    def from_result(cls, result):
+        """
+        Build from an ultralytics result with a single device-to-host copy
+        """
+        
+        # boxes.data rows are (x1, y1, x2, y2, [track_id,] conf, cls)
+        data = result.boxes.data.cpu().numpy()
+        xyxy = data[:, :4].astype(np.float32)
+        
+        boxes = np.empty_like(xyxy)
+        boxes[:, 2:] = xyxy[:, 2:] - xyxy[:, :2]  # width, height
+        boxes[:, :2] = xyxy[:, :2] + boxes[:, 2:] / 2  # center x, y (same as boxes.xywh)
+        
+        return cls(
+            class_ids=data[:, -1].astype(np.int32),
+            confidences=data[:, -2].astype(np.float32),
+            boxes=boxes,
+            names=result.names
+        )
+    
+    @classmethod
+    def from_detections(cls, detections: List[Detection]):
+        """
+        Build from a list of Detection objects
+        """
+        
+        names = dict(enumerate(sorted({d.object_type for d in detections})))
+        ids = {name: class_id for class_id, name in names.items()}
+        
+        return cls(
+            class_ids=np.array([ids[d.object_type] for d in detections], dtype=np.int32),
+            confidences=np.array([d.confidence for d in detections], dtype=np.float32),
+            boxes=np.array([d.bbox for d in detections], dtype=np.float32).reshape(-1, 4),
+            names=names
+        )
+    
+    def __len__(self):
+        return len(self.class_ids)
+    
+    def class_mask(self, object_type: str) -> np.ndarray:
+        """Boolean mask of the detections of one type"""
+        matching_ids = [class_id for class_id, name in self.names.items() if name == object_type]
+        return np.isin(self.class_ids, matching_ids)
+    
+    def filter(self, mask: np.ndarray):
+        """Keep only the detections where mask is True"""
+        return DetectionBatch(self.class_ids[mask], self.confidences[mask], self.boxes[mask], self.names, self.imgsz)
+    
+    def to_detections(self) -> List[Detection]:
+        """Per-box Detection objects (only for code that needs them)"""
+        return [Detection(self.names[int(class_id)], float(conf), tuple(box))
+                for class_id, conf, box in zip(self.class_ids, self.confidences, self.boxes)]
+
+class IncidentType(IntEnum):
+    NO_HELMET = 0
+    NO_VEST = 1
+
+class Severity(IntEnum):
+    LOW = 0
+    MEDIUM = 1
+    HIGH = 2
+
+@dataclass(slots=True)
 class SafetyIncident:
-    """Represents a safety violation"""
-    timestamp: str
-    incident_type: str  # 'no_helmet', 'no_vest', etc.
-    severity: str  # 'low', 'medium', 'high'
-    description: str
+    """
+    Represents a safety violation
+    Kept compact (slots, numbers and enum codes) because long-running
+    monitors hold many of them - use to_dict() for the readable version
+    """
+    timestamp: float  # time.time() when it started
+    incident_type: IncidentType
+    severity: Severity
     frame_number: int
+    camera_id: str = 'cam0'  # Which camera saw it
+    unprotected_count: int = 1  # How many people were without helmet
+    bboxes: array = None  # Flat (x, y, width, height, ...) of each unprotected person
+    track_id: int = -1  # Worker this incident belongs to (-1 = not tracked)
+    end_timestamp: Optional[float] = None  # When the worker put a helmet on or left the scene
+    imgsz: int = 0  # Model input size the violation was seen at (0 = unknown)
+    clip_path: str = ''  # Pre/post-roll video of the violation (see ClipRecorder)
+    
+    def __post_init__(self):
+        self.bboxes = array('f', [value for bbox in (self.bboxes or []) for value in bbox])
+    
+    @property
+    def description(self) -> str:
+        if self.track_id >= 0:
+            return f"Worker #{self.track_id} without helmet"
+        return f"{self.unprotected_count} person/people without helmet"
+    
+    def to_dict(self) -> dict:
+        """Readable, JSON-ready version of the incident"""
+        return {
+            'timestamp': datetime.fromtimestamp(self.timestamp).isoformat(),
+            'incident_type': self.incident_type.name.lower(),
+            'severity': self.severity.name.lower(),
+            'description': self.description,
+            'frame_number': self.frame_number,
+            'camera_id': self.camera_id,
+            'bboxes': [tuple(self.bboxes[i:i + 4]) for i in range(0, len(self.bboxes), 4)],
+            'track_id': self.track_id,
+            'end_timestamp': (datetime.fromtimestamp(self.end_timestamp).isoformat()
+                              if self.end_timestamp is not None else None),
+            'imgsz': self.imgsz or None,
+            'clip_path': self.clip_path or None,
+        }
 
 class SafetyDecisionEngine:
     """
@@ -25,12 +144,30 @@ class SafetyDecisionEngine:
     Like a smart safety supervisor!
     """
     
-    def __init__(self):
-        self.incidents = []  # Track all violations
+    def __init__(self, camera_id='cam0', track_workers=False, sink=None, max_incidents_in_memory=10_000,
+                 recorder=None, shift_hours=None):
+        self.camera_id = camera_id
+        
+        # Most recent violations only, so memory stays bounded however long the engine runs.
+        # Callers that need every incident give it a sink, which streams them all to disk
+        self.incidents = deque(maxlen=max_incidents_in_memory)
+        self.incidents_evicted = 0  # Pushed out of self.incidents (still on disk with a sink)
+        self.statistics = IncidentStatistics(shift_hours=shift_hours)  # Running totals + rolling windows
+        
+        # Optional IncidentSink that streams incidents to disk as they happen
+        self.sink = sink
+        
+        # Optional ClipRecorder that saves a video of every new incident in the background
+        self.recorder = recorder
+        
+        # Follow workers across frames so each one raises a single incident
+        self.tracker = IoUTracker() if track_workers else None
         self.safety_rules = {
             'require_helmet': True,
             'require_vest': False,  # Not checking for vest yet
             'min_detection_confidence': 0.5,  # 50% confidence minimum
+            'match_helmets_to_people': True,  # Check each person's head, not just the totals
+            'min_violation_frames': 2,  # Tracked worker must be seen without helmet this often
         }
     
     def analyze_detections(self, detections: List[Detection], frame_num: int) -> dict:
@@ -39,47 +176,169 @@ class SafetyDecisionEngine:
         Returns: decision report
         """
         
+        return self.analyze_batch(DetectionBatch.from_detections(detections), frame_num)
+    
+    def analyze_batch(self, batch: DetectionBatch, frame_num: int) -> dict:
+        """
+        Same as analyze_detections, but works on whole arrays at once
+        Returns: decision report
+        """
+        
+        # Ignore detections the model isn't sure about
+        # (the tracker still gets weak person boxes to keep its tracks alive)
+        all_people = batch.filter(batch.class_mask('person'))
+        batch = batch.filter(batch.confidences >= self.safety_rules['min_detection_confidence'])
+        
         # Count what we found
-        people_count = sum(1 for d in detections if d.object_type == 'person')
-        helmets_count = sum(1 for d in detections if d.object_type == 'helmet')
+        person_boxes = batch.boxes[batch.class_mask('person')]
+        helmet_boxes = batch.boxes[batch.class_mask('helmet')]
+        people_count = len(person_boxes)
+        helmets_count = len(helmet_boxes)
+        
+        # Work out which people are unprotected
+        if self.safety_rules['match_helmets_to_people']:
+            association = associate_helmets(person_boxes, helmet_boxes)
+            unprotected_boxes = [tuple(map(float, person_boxes[i])) for i in association.unprotected]
+            protected_count = people_count - len(unprotected_boxes)
+        else:
+            unprotected_boxes = []
+            protected_count = min(people_count, helmets_count)
         
         # Make decision
         decision = {
+            'camera_id': self.camera_id,
             'frame': frame_num,
             'timestamp': datetime.now().isoformat(),
             'people': people_count,
             'helmets': helmets_count,
+            'protected': protected_count,
+            'unprotected_boxes': unprotected_boxes,
             'violations': [],
-            'safety_status': 'SAFE'
+            'safety_status': 'SAFE',
+            'imgsz': batch.imgsz,  # Lets accuracy be compared with the resolution used under load
         }
         
         # Rule 1: Check for people without helmets
-        if self.safety_rules['require_helmet']:
-            if people_count > helmets_count:
-                violation_count = people_count - helmets_count
+        if self.safety_rules['require_helmet'] and self.tracker is not None:
+            all_association = associate_helmets(all_people.boxes, helmet_boxes)
+            self._update_tracked_incidents(decision, all_people.boxes, all_people.confidences,
+                                           all_association.has_helmet, frame_num)
+        
+        elif self.safety_rules['require_helmet']:
+            if people_count > protected_count:
+                violation_count = people_count - protected_count
                 
                 incident = SafetyIncident(
-                    timestamp=datetime.now().isoformat(),
-                    incident_type='no_helmet',
-                    severity='high' if violation_count > 2 else 'medium',
-                    description=f"{violation_count} person/people without helmet",
-                    frame_number=frame_num
+                    timestamp=time.time(),
+                    incident_type=IncidentType.NO_HELMET,
+                    severity=Severity.HIGH if violation_count > 2 else Severity.MEDIUM,
+                    frame_number=frame_num,
+                    camera_id=self.camera_id,
+                    unprotected_count=violation_count,
+                    bboxes=unprotected_boxes,
+                    imgsz=batch.imgsz or 0
                 )
                 
-                self.incidents.append(incident)
-                decision['violations'].append(incident.__dict__)
+                self._record_incident(incident)
+                decision['violations'].append(incident.to_dict())
                 decision['safety_status'] = 'VIOLATION'
         
         # Calculate safety percentage
         if people_count > 0:
-            safety_percentage = (helmets_count / people_count) * 100
+            safety_percentage = (protected_count / people_count) * 100
         else:
             safety_percentage = 100  # No people = safe!
         
         decision['safety_percentage'] = safety_percentage
+        self.statistics.record_frame(decision['safety_status'] == 'VIOLATION', safety_percentage)
         
         return decision
     
+    def _update_tracked_incidents(self, decision, person_boxes, person_confidences, has_helmet, frame_num):
+        """
+        Rule 1 for tracked workers: one incident per worker, from the moment
+        they are seen without a helmet until they put one on or leave
+        """
+        
+        tracks, lost = self.tracker.update(person_boxes, person_confidences, frame_num, has_helmet)
+        now = time.time()
+        
+        for track in lost:
+            self._close_incident(track, now)
+        
+        seen = [track for track in tracks if track.last_frame == frame_num]
+        unprotected = [track for track in seen if not track.has_helmet]
+        
+        for track in seen:
+            if track.has_helmet:
+                track.unprotected_frames = 0
+                self._close_incident(track, now)
+                continue
+            
+            track.unprotected_frames += 1
+            if track.incident is None and track.unprotected_frames >= self.safety_rules['min_violation_frames']:
+                track.incident = SafetyIncident(
+                    timestamp=now,
+                    incident_type=IncidentType.NO_HELMET,
+                    severity=Severity.HIGH if len(unprotected) > 2 else Severity.MEDIUM,
+                    frame_number=frame_num,
+                    camera_id=self.camera_id,
+                    bboxes=[tuple(map(float, track.box))],
+                    track_id=track.track_id,
+                    imgsz=decision['imgsz'] or 0
+                )
+                
+                self._record_incident(track.incident)
+                decision['violations'].append(track.incident.to_dict())
+        
+        if any(track.incident is not None for track in unprotected):
+            decision['safety_status'] = 'VIOLATION'
+        
+        decision['tracks'] = [{'track_id': track.track_id,
+                               'bbox': tuple(map(float, track.box)),
+                               'has_helmet': track.has_helmet} for track in seen]
+    
+    def _record_incident(self, incident):
+        self.statistics.record_incident(incident.severity.name.lower())
+        
+        if self.recorder is not None:
+            incident.clip_path = self.recorder.request_clip(incident)
+        if self.sink is not None:
+            self.sink.write(incident)
+        if len(self.incidents) == self.incidents.maxlen:
+            self.incidents_evicted += 1
+        self.incidents.append(incident)
+    
+    def _close_incident(self, track, timestamp):
+        if track.incident is not None:
+            track.incident.end_timestamp = timestamp
+            if self.sink is not None:
+                self.sink.write(track.incident, event='closed')
+            track.incident = None
+    
+    def predict_tracks(self, frame_num: int) -> list:
+        """
+        Carry tracked workers forward to a frame that wasn't run through the model
+        Returns: list of {'track_id', 'bbox', 'has_helmet'}
+        """
+        
+        if self.tracker is None:
+            return []
+        
+        return [{'track_id': track.track_id,
+                 'bbox': tuple(map(float, track.box)),
+                 'has_helmet': track.has_helmet} for track in self.tracker.predict(frame_num)]
+    
+    def close_open_incidents(self):
+        """
+        End every incident that is still open (e.g. when monitoring stops)
+        """
+        
+        if self.tracker is not None:
+            now = time.time()
+            for track in self.tracker.tracks:
+                self._close_incident(track, now)
+    
     def get_alert_message(self, decision: dict) -> str:
         """
         Create a human-readable alert message
@@ -93,10 +352,10 @@ class SafetyDecisionEngine:
         
         else:  # VIOLATION
             people = decision['people']
-            helmets = decision['helmets']
-            missing = people - helmets
+            protected = decision.get('protected', decision['helmets'])
+            missing = people - protected
             
-            return f"🚨 DANGER: {missing} person/people without helmet! ({helmets}/{people} safe)"
+            return f"🚨 DANGER: {missing} person/people without helmet! ({protected}/{people} safe)"
     
     def get_alert_color(self, decision: dict) -> tuple:
         """
@@ -118,24 +377,42 @@ class SafetyDecisionEngine:
         Save all violations to a file
         """
         
-        incident_data = [incident.__dict__ for incident in self.incidents]
+        incident_data = [incident.to_dict() for incident in self.incidents]
         
         with open(filename, 'w') as f:
             json.dump(incident_data, f, indent=2)
         
         print(f"📄 Saved {len(self.incidents)} incidents to {filename}")
+        if self.incidents_evicted:
+            print(f"⚠️ {self.incidents_evicted} older incidents were no longer in memory - use an IncidentSink")
     
     def get_statistics(self) -> dict:
         """
         Get statistics about violations
+        (session totals, plus 'windows' for the last 1 min / 15 min / 1 h / shift)
         """
         
-        return {
-            'total_incidents': len(self.incidents),
-            'high_severity': sum(1 for i in self.incidents if i.severity == 'high'),
-            'medium_severity': sum(1 for i in self.incidents if i.severity == 'medium'),
-            'low_severity': sum(1 for i in self.incidents if i.severity == 'low'),
-        }
+        return self.statistics.summary()
+
+    def start_shift(self):
+        """Start a new shift in the statistics by hand (besides the scheduled shift_hours boundaries)"""
+        self.statistics.start_shift()
+
+
+def save_all_incidents(engines, filename='violations.json'):
+    """
+    Save the violations of several cameras' engines to one file
+    """
+
+    incident_data = [incident.to_dict() for engine in engines for incident in engine.incidents]
+
+    with open(filename, 'w') as f:
+        json.dump(incident_data, f, indent=2)
+
+    print(f"📄 Saved {len(incident_data)} incidents from {len(engines)} camera(s) to {filename}")
+    evicted = sum(engine.incidents_evicted for engine in engines)
+    if evicted:
+        print(f"⚠️ {evicted} older incidents were no longer in memory - set incident_log_dir to keep them all")
 
 
 # Test the engine
@@ -167,6 +444,31 @@ if __name__ == "__main__":
     print(f"  Alert: {engine.get_alert_message(decision_2)}")
     print(f"  Status: {decision_2['safety_status']}\n")
     
+    # Low-confidence detections are ignored
+    test_detections_3 = [
+        Detection('person', 0.95, (100, 50, 50, 100)),
+        Detection('person', 0.30, (200, 60, 50, 100)),
+        Detection('helmet', 0.92, (110, 40, 30, 25)),
+    ]
+    
+    decision_3 = engine.analyze_batch(DetectionBatch.from_detections(test_detections_3), frame_num=51)
+    print("Test 3 (Low-confidence person ignored):")
+    print(f"  Alert: {engine.get_alert_message(decision_3)}")
+    print(f"  Status: {decision_3['safety_status']}\n")
+    
+    # A tracked worker without a helmet raises one incident, not one per frame
+    tracked_engine = SafetyDecisionEngine(track_workers=True)
+    for frame in range(1, 31):
+        walking_worker = [Detection('person', 0.9, (100 + frame * 3, 200, 50, 100))]
+        tracked_engine.analyze_detections(walking_worker, frame_num=frame)
+    tracked_engine.close_open_incidents()
+    
+    print("Test 4 (Tracked worker, 30 frames without helmet):")
+    print(f"  Incidents: {len(tracked_engine.incidents)}")
+    incident = tracked_engine.incidents[0].to_dict()
+    print(f"  {incident['description']}: {incident['timestamp']} -> {incident['end_timestamp']}\n")
+    
     # Show statistics
     stats = engine.get_statistics()
-    print(f"Statistics: {stats}")
\ No newline at end of file
+    print(f"Statistics: { {key: value for key, value in stats.items() if key != 'windows'} }")
+    print(f"Last minute: {stats['windows']['last_1_min']}")
\ No newline at end of file
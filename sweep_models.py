@@ -0,0 +1,233 @@
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from datetime import datetime
+
+import cv2
+import numpy as np
+from dataset_config import local_data_yaml, split_images
+from image_cache import ImageCache
+from inference_backend import DEFAULT_WEIGHTS, load_model
+
+PROJECT = 'runs/sweep'
+THREAD_VARIABLES = ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS')
+
+
+@contextmanager
+def job_thread_limits(threads):
+    """
+    Environment the spawned jobs start with. OpenMP/MKL/OpenBLAS read these
+    once, when numpy and cv2 load - which in a spawned job happens while
+    unpickling the initializer, too early for it to set them
+    """
+
+    saved = {variable: os.environ.get(variable) for variable in THREAD_VARIABLES}
+    os.environ.update({variable: str(threads) for variable in THREAD_VARIABLES})
+    try:
+        yield
+    finally:
+        for variable, value in saved.items():
+            if value is None:
+                os.environ.pop(variable, None)
+            else:
+                os.environ[variable] = value
+
+
+def limit_threads(threads):
+    """Pool initializer: cap OpenCV's own thread pool (it can be changed at runtime)"""
+    cv2.setNumThreads(threads)
+
+
+def prepare_shared_files(configs, data_yaml):
+    """
+    Write what every job would otherwise race to create: the base weights
+    (downloaded on first load) and ultralytics' labels.cache of each split.
+    Building the datasets only reads the label files - no model runs
+    """
+
+    from ultralytics import YOLO
+    from ultralytics.data import YOLODataset
+    from ultralytics.data.utils import check_det_dataset
+
+    for name in dict.fromkeys(config['model'] for config in configs):
+        YOLO(name)
+
+    data = check_det_dataset(data_yaml)
+    for split in ('train', 'val'):
+        YOLODataset(img_path=data[split], data=data, task='detect', augment=False,
+                    imgsz=min(config['imgsz'] for config in configs))
+
+
+def train_and_validate(config, data_yaml, epochs, batch, conf_values, threads, retrain=False):
+    """
+    One sweep job (runs in its own process): a short training run for a
+    model size and imgsz, then one validation per confidence threshold
+    Returns: one row per conf value
+    """
+
+    import torch
+    from ultralytics import YOLO
+    from functools import partial
+    from train_helmet_model import CachedDetectionTrainer
+
+    torch.set_num_threads(threads)  # ultralytics picks its own count on import
+
+    weights = config.get('weights')
+    train_seconds = 0.0
+    if weights is None:
+        weights = os.path.join(PROJECT, config['name'], 'weights', 'best.pt')
+        if retrain or not os.path.exists(weights):
+            start = time.perf_counter()
+            YOLO(config['model']).train(
+                data=data_yaml, epochs=epochs, imgsz=config['imgsz'], batch=batch, device='cpu',
+                project=PROJECT, name=config['name'], exist_ok=True, plots=False, verbose=False,
+                trainer=partial(CachedDetectionTrainer, cache='mmap', workers=0),
+            )
+            train_seconds = time.perf_counter() - start
+
+    model = YOLO(weights)
+    rows = []
+    for conf in conf_values:
+        metrics = model.val(data=data_yaml, imgsz=config['imgsz'], conf=conf, batch=batch,
+                            device='cpu', plots=False, verbose=False)
+        rows.append({
+            'name': config['name'],
+            'model': config['model'],
+            'imgsz': config['imgsz'],
+            'conf': conf,
+            'weights': weights,
+            'map50': float(metrics.box.map50),
+            'map50_95': float(metrics.box.map),
+            'model_mb': os.path.getsize(weights) / 1e6,
+            'train_seconds': round(train_seconds, 1),
+        })
+    return rows
+
+
+def measure_latency(rows, threads, frames=50, warmup=3):
+    """
+    CPU ms/frame of every row, one configuration at a time with the same
+    thread count, so jobs don't skew each other's numbers
+    """
+
+    import torch
+
+    torch.set_num_threads(threads)
+    images = [cv2.imread(path) for path in split_images('valid')[:frames]]
+
+    by_weights = sorted(rows, key=lambda row: row['weights'])
+    for weights, group in itertools.groupby(by_weights, key=lambda row: row['weights']):
+        # Not fused=True: that writes a *_fused.pt next to every checkpoint (predict fuses in memory anyway)
+        model = load_model('pytorch', weights)
+        for row in group:
+            for image in images[:warmup]:
+                model(image, imgsz=row['imgsz'], conf=row['conf'], verbose=False)
+
+            latencies = []
+            for image in images:
+                start = time.perf_counter()
+                model(image, imgsz=row['imgsz'], conf=row['conf'], verbose=False)
+                latencies.append((time.perf_counter() - start) * 1000)
+            row['ms_per_frame'] = float(np.median(latencies))
+
+
+def pareto_front(rows, accuracy='map50_95', cost='ms_per_frame'):
+    """Mark rows no other row beats on both accuracy and cost (ties on both don't count as beaten)"""
+    for row in rows:
+        row['pareto'] = not any(
+            other[accuracy] >= row[accuracy] and other[cost] <= row[cost]
+            and (other[accuracy] > row[accuracy] or other[cost] < row[cost])
+            for other in rows)
+    return [row for row in rows if row['pareto']]
+
+
+def format_table(rows) -> str:
+    lines = ["| config | conf | mAP50 | mAP50-95 | ms/frame | model MB | Pareto |",
+             "|---|---|---|---|---|---|---|"]
+    for row in sorted(rows, key=lambda row: row['ms_per_frame']):
+        lines.append(f"| {row['name']} | {row['conf']:.2f} | {row['map50']:.3f} | {row['map50_95']:.3f} | "
+                     f"{row['ms_per_frame']:.1f} | {row['model_mb']:.1f} | {'★' if row['pareto'] else ''} |")
+    return '\n'.join(lines)
+
+
+def main():
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count() or 1
+
+    parser = argparse.ArgumentParser(description="Speed/accuracy sweep over model size, imgsz and conf threshold")
+    parser.add_argument('--models', nargs='+', default=['yolov8n.pt', 'yolov8s.pt'])
+    parser.add_argument('--imgsz', type=int, nargs='+', default=[320, 416])
+    parser.add_argument('--conf', type=float, nargs='+', default=[0.25, 0.4, 0.5])
+    parser.add_argument('--epochs', type=int, default=15, help="Short runs - enough to rank configurations")
+    parser.add_argument('--batch', type=int, default=8)
+    parser.add_argument('--threads-per-job', type=int, default=2)
+    parser.add_argument('--jobs', type=int, default=None, help="Parallel jobs (default: cores / threads per job)")
+    parser.add_argument('--latency-frames', type=int, default=50)
+    parser.add_argument('--no-baseline', action='store_true', help="Don't include the deployed model as is")
+    parser.add_argument('--retrain', action='store_true', help="Train again even if runs/sweep has the weights")
+    parser.add_argument('--output', default='benchmarks')
+    args = parser.parse_args()
+
+    jobs = args.jobs or max(1, cores // args.threads_per_job)
+
+    print("=" * 60)
+    print("🧪 MODEL SWEEP")
+    print("=" * 60)
+
+    configs = [{'name': f"{os.path.splitext(model)[0]}_{imgsz}", 'model': model, 'imgsz': imgsz}
+               for model in args.models for imgsz in args.imgsz]
+    if not args.no_baseline and os.path.exists(DEFAULT_WEIGHTS):
+        configs.append({'name': 'deployed_416', 'model': DEFAULT_WEIGHTS, 'imgsz': 416, 'weights': DEFAULT_WEIGHTS})
+
+    data_yaml = local_data_yaml()
+    for imgsz in sorted({config['imgsz'] for config in configs}):  # Build image caches once, before jobs race for them
+        for split in ('train', 'valid'):
+            ImageCache(split_images(split), imgsz)
+    prepare_shared_files(configs, data_yaml)
+
+    print(f"⚙️ {len(configs)} configurations x {len(args.conf)} conf values, "
+          f"{jobs} parallel jobs x {args.threads_per_job} threads ({cores} cores)")
+
+    rows = []
+    start = time.perf_counter()
+    context = multiprocessing.get_context('spawn')  # Fresh interpreters, so each job's thread limits apply
+    with job_thread_limits(args.threads_per_job), \
+            ProcessPoolExecutor(jobs, mp_context=context, initializer=limit_threads,
+                                initargs=(args.threads_per_job,)) as pool:
+        futures = {pool.submit(train_and_validate, config, data_yaml, args.epochs, args.batch, args.conf,
+                               args.threads_per_job, args.retrain): config for config in configs}
+        for future in as_completed(futures):
+            config = futures[future]
+            try:
+                rows.extend(future.result())
+                print(f"   ✅ {config['name']}")
+            except Exception as e:
+                print(f"   ❌ {config['name']}: {e}")
+    print(f"🧠 Training and validation took {time.perf_counter() - start:.0f} s")
+
+    if not rows:
+        return
+
+    print(f"⏱️ Measuring CPU latency on {args.latency_frames} validation images ({args.threads_per_job} threads)...")
+    measure_latency(rows, args.threads_per_job, args.latency_frames)
+    front = pareto_front(rows)
+
+    table = format_table(rows)
+    print("\n" + table)
+    print(f"\n★ {len(front)} Pareto-optimal configuration(s) - nothing else is both faster and more accurate")
+
+    os.makedirs(args.output, exist_ok=True)
+    stem = os.path.join(args.output, f"{datetime.now():%Y%m%d_%H%M%S}_sweep")
+    with open(f'{stem}.json', 'w') as f:
+        json.dump({'args': vars(args), 'cores': cores, 'rows': rows}, f, indent=2)
+    with open(f'{stem}.md', 'w') as f:
+        f.write(table + '\n')
+    print(f"\n📄 Saved results to {stem}.json and {stem}.md")
+
+
+if __name__ == "__main__":
+    main()
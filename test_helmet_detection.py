@@ -1,6 +1,9 @@
 import cv2
 from ultralytics import YOLO
 import os
+import time
+from motion_gate import MotionGate
+from frame_scheduler import AdaptiveScheduler
 
 print("=" * 60)
 print("🎬 TESTING YOUR TRAINED HELMET DETECTION MODEL")
@@ -47,6 +50,13 @@ print("💡 Try: yourself, a toy helmet, people, etc.\n")
 frame_count = 0
 saved_count = 0
 
+# Skip the model while nothing in front of the camera moves
+gate = MotionGate()
+last_results = None
+
+# Picks the detection interval from measured inference time
+scheduler = AdaptiveScheduler(target_hz=5)
+
 while True:
     success, frame = camera.read()
     
@@ -56,49 +66,58 @@ while True:
     
     frame_count += 1
     
-    # Only process every 2nd frame for speed
-    if frame_count % 2 == 0:
+    # Only process as many frames as the machine can keep up with
+    if scheduler.should_detect():
         try:
-            # Run detection with YOUR trained model
-            results = model(frame, verbose=False)
-            annotated_frame = results[0].plot()
-            
-            # Get all detections
-            detections = results[0].boxes
+            # Only run the model when the scene changed (or nothing cached yet)
+            scene_changed = gate.should_infer(frame)
             
-            # Count helmets and people
-            helmets = 0
-            people = 0
-            
-            for detection in detections:
-                class_id = int(detection.cls[0])
-                class_name = results[0].names[class_id]
-                confidence = float(detection.conf[0])
+            if scene_changed or last_results is None:
+                # Run detection with YOUR trained model
+                start = time.perf_counter()
+                results = model(frame, verbose=False)
+                scheduler.record_inference(time.perf_counter() - start)
+                last_results = results
                 
-                if class_name == 'helmet':
-                    helmets += 1
-                elif class_name == 'person':
-                    people += 1
-            
-            # Calculate safety status
-            if people > 0:
-                safety_percentage = (helmets / people) * 100
-            else:
-                safety_percentage = 0
+                # Get all detections
+                detections = results[0].boxes
+                
+                # Count helmets and people
+                helmets = 0
+                people = 0
+                
+                for detection in detections:
+                    class_id = int(detection.cls[0])
+                    class_name = results[0].names[class_id]
+                    confidence = float(detection.conf[0])
+                    
+                    if class_name == 'helmet':
+                        helmets += 1
+                    elif class_name == 'person':
+                        people += 1
+                
+                # Calculate safety status
+                if people > 0:
+                    safety_percentage = (helmets / people) * 100
+                else:
+                    safety_percentage = 0
+                
+                # Determine safety level
+                if people == 0:
+                    status = "✅ SAFE - No people detected"
+                    color = (0, 255, 0)  # Green
+                elif helmets == people:
+                    status = "✅ SAFE - All have helmets!"
+                    color = (0, 255, 0)  # Green
+                elif safety_percentage >= 80:
+                    status = f"⚠️ WARNING - {safety_percentage:.0f}% have helmets"
+                    color = (0, 165, 255)  # Orange
+                else:
+                    status = f"🚨 DANGER - Only {safety_percentage:.0f}% have helmets!"
+                    color = (0, 0, 255)  # Red
             
-            # Determine safety level
-            if people == 0:
-                status = "✅ SAFE - No people detected"
-                color = (0, 255, 0)  # Green
-            elif helmets == people:
-                status = "✅ SAFE - All have helmets!"
-                color = (0, 255, 0)  # Green
-            elif safety_percentage >= 80:
-                status = f"⚠️ WARNING - {safety_percentage:.0f}% have helmets"
-                color = (0, 165, 255)  # Orange
-            else:
-                status = f"🚨 DANGER - Only {safety_percentage:.0f}% have helmets!"
-                color = (0, 0, 255)  # Red
+            # Draw the latest detections on the current frame
+            annotated_frame = last_results[0].plot(img=frame)
             
             # Add status text to frame
             cv2.putText(annotated_frame, status, 
@@ -109,6 +128,11 @@ while True:
                        f"Helmets: {helmets} | People: {people}", 
                        (10, 70), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
             
+            # Add detection rate
+            cv2.putText(annotated_frame, 
+                       scheduler.status_text(), 
+                       (10, 110), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 0), 2)
+            
             # Add instructions
             cv2.putText(annotated_frame, 
                        "Q=Quit | S=Save | Your Trained Model", 
@@ -147,5 +171,8 @@ print("=" * 60)
 print(f"📊 Statistics:")
 print(f"   - Total frames processed: {frame_count}")
 print(f"   - Screenshots saved: {saved_count}")
+gate_stats = gate.get_statistics()
+print(f"   - Frames analyzed: {gate_stats['inferred_frames']}")
+print(f"   - Frames skipped (no motion): {gate_stats['gated_frames']} ({gate_stats['gated_percentage']:.0f}%)")
 print(f"\n🎉 Your trained model is working!")
 print("=" * 60)
\ No newline at end of file
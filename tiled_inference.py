@@ -0,0 +1,171 @@
+import math
+import time
+import numpy as np
+from helmet_association import xywh_to_xyxy
+from roi_zones import crop_region, to_frame_coordinates
+from safety_decision_engine import DetectionBatch
+
+
+def tile_size(frame_shape, columns, rows, overlap=0.2, imgsz=416) -> tuple:
+    """Side lengths of the tiles of a grid (never smaller than the model input, where the frame allows)"""
+    height, width = frame_shape[:2]
+    tile_width = math.ceil(width / (columns - (columns - 1) * overlap))
+    tile_height = math.ceil(height / (rows - (rows - 1) * overlap))
+    return min(width, max(tile_width, imgsz)), min(height, max(tile_height, imgsz))
+
+
+def choose_grid(frame_shape, imgsz=416, max_tiles=6, overlap=0.2):
+    """
+    The columns x rows grid (at most max_tiles) whose tiles are shrunk the
+    least when letterboxed to imgsz; no more tiles than native resolution
+    needs, and fewer tiles on a tie
+    Returns: (columns, rows)
+    """
+
+    height, width = frame_shape[:2]
+    stride = imgsz * (1 - overlap)
+    native_columns = max(1, math.ceil((width - imgsz) / stride) + 1)
+    native_rows = max(1, math.ceil((height - imgsz) / stride) + 1)
+
+    grids = [(columns, rows) for columns in range(1, native_columns + 1)
+             for rows in range(1, native_rows + 1) if columns * rows <= max(1, max_tiles)]
+    return min(grids, key=lambda grid: (max(tile_size(frame_shape, *grid, overlap, imgsz)), grid[0] * grid[1]))
+
+
+def plan_tiles(frame_shape, columns, rows, overlap=0.2, imgsz=416) -> list:
+    """
+    Overlapping tiles covering the frame
+    Returns: list of (x1, y1, x2, y2)
+    """
+
+    height, width = frame_shape[:2]
+    tile_width, tile_height = tile_size(frame_shape, columns, rows, overlap, imgsz)
+
+    xs = np.linspace(0, width - tile_width, columns).round().astype(int) if columns > 1 else [0]
+    ys = np.linspace(0, height - tile_height, rows).round().astype(int) if rows > 1 else [0]
+    return [(int(x), int(y), int(x) + tile_width, int(y) + tile_height) for y in ys for x in xs]
+
+
+def merge_detections(batches: list, iou_threshold=0.5, ios_threshold=0.7) -> DetectionBatch:
+    """
+    Concatenate the detections of all tiles and drop duplicates with a
+    class-wise greedy NMS. A box cut by a tile edge hardly passes an IoU
+    test against the full box of the neighbouring tile, but lies almost
+    entirely inside it, so intersection-over-smaller is checked as well.
+    """
+
+    names = batches[0].names
+    class_ids = np.concatenate([batch.class_ids for batch in batches])
+    confidences = np.concatenate([batch.confidences for batch in batches])
+    boxes = np.concatenate([batch.boxes for batch in batches]).reshape(-1, 4)
+
+    xyxy = xywh_to_xyxy(boxes)
+    areas = boxes[:, 2] * boxes[:, 3]
+    order = np.argsort(-confidences)
+    keep = []
+
+    while order.size:
+        best, rest = order[0], order[1:]
+        keep.append(best)
+
+        top_left = np.maximum(xyxy[best, :2], xyxy[rest, :2])
+        bottom_right = np.minimum(xyxy[best, 2:], xyxy[rest, 2:])
+        intersection = np.prod(np.clip(bottom_right - top_left, 0, None), axis=1)
+        iou = intersection / (areas[best] + areas[rest] - intersection + 1e-9)
+        ios = intersection / (np.minimum(areas[best], areas[rest]) + 1e-9)
+
+        duplicate = (class_ids[rest] == class_ids[best]) & ((iou > iou_threshold) | (ios > ios_threshold))
+        order = rest[~duplicate]
+
+    keep = np.array(keep, dtype=np.int64)
+    return DetectionBatch(class_ids[keep], confidences[keep], boxes[keep], names, batches[0].imgsz)
+
+
+class TiledDetector:
+    """
+    Sliced inference for high-resolution cameras.
+
+    Each frame is cut into overlapping tiles (plus one downscaled view of
+    the whole frame, for objects bigger than a tile), all tiles of all
+    frames go through the model as one batch, and the results are merged
+    back with merge_detections(). Frames no bigger than a tile are simply
+    run whole.
+
+    The grid is chosen from the frame resolution and, with budget_ms, the
+    CPU budget: the measured time per model input decides how many tiles
+    fit in budget_ms per frame.
+    """
+
+    def __init__(self, model, imgsz=416, budget_ms=None, max_tiles=6, include_full_frame=True,
+                 min_overlap=0.15, overlap_pixels=64, smoothing=0.2):
+        self.model = model
+        self.imgsz = imgsz
+        self.budget_ms = budget_ms
+        self.max_tiles = max_tiles
+        self.include_full_frame = include_full_frame
+        self.min_overlap = min_overlap
+        self.overlap_pixels = overlap_pixels  # Overlap must fit a whole helmet
+        self.smoothing = smoothing
+
+        self.ms_per_input = None  # Running average of the model time per tile
+        self._plans = {}  # (frame shape, imgsz, max tiles) -> tiles
+
+    def tile_limit(self) -> int:
+        """How many tiles per frame the CPU budget allows"""
+        if self.budget_ms is None or self.ms_per_input is None:
+            return self.max_tiles
+        affordable = int(self.budget_ms / self.ms_per_input) - int(self.include_full_frame)
+        return max(1, min(self.max_tiles, affordable))
+
+    def plan(self, frame_shape) -> list:
+        """Tiles for a frame of this shape under the current budget ([] = run the frame whole)"""
+        key = (frame_shape[:2], self.imgsz, self.tile_limit())
+        if key not in self._plans:
+            overlap = max(self.min_overlap, self.overlap_pixels / self.imgsz)
+            columns, rows = choose_grid(frame_shape, self.imgsz, key[2], overlap)
+            self._plans[key] = plan_tiles(frame_shape, columns, rows, overlap, self.imgsz) if columns * rows > 1 else []
+        return self._plans[key]
+
+    def detect(self, frames) -> list:
+        """Returns: one merged DetectionBatch per frame, in full-frame coordinates"""
+        images, owners, transforms = [], [], []
+        for index, frame in enumerate(frames):
+            height, width = frame.shape[:2]
+            tiles = self.plan(frame.shape)
+            if not tiles or self.include_full_frame:
+                tiles = tiles + [(0, 0, width, height)]
+            for region in tiles:
+                image, transform = crop_region(frame, region, self.imgsz)
+                images.append(image)
+                owners.append(index)
+                transforms.append(transform)
+
+        start = time.perf_counter()
+        results = self.model(images, imgsz=self.imgsz, verbose=False)
+        ms_per_input = (time.perf_counter() - start) * 1000 / len(images)
+        self.ms_per_input = (ms_per_input if self.ms_per_input is None else
+                             (1 - self.smoothing) * self.ms_per_input + self.smoothing * ms_per_input)
+
+        per_frame = [[] for _ in frames]
+        for owner, transform, result in zip(owners, transforms, results):
+            per_frame[owner].append(to_frame_coordinates(DetectionBatch.from_result(result), transform))
+
+        return [merge_detections(batches) for batches in per_frame]
+
+
+# Test the tiling
+if __name__ == "__main__":
+    print("Testing Tiled Inference...\n")
+
+    for shape in [(480, 640), (1080, 1920), (2160, 3840)]:
+        for max_tiles in [4, 12]:
+            columns, rows = choose_grid(shape, 416, max_tiles, overlap=0.15)
+            x1, y1, x2, y2 = plan_tiles(shape, columns, rows, overlap=0.15)[0]
+            print(f"  {shape[1]}x{shape[0]}, max {max_tiles:>2} tiles: {columns}x{rows} grid of {x2 - x1}x{y2 - y1} px tiles")
+
+    # The same helmet seen whole in one tile and cut in half by the edge of the next
+    tile_a = DetectionBatch(np.array([0]), np.array([0.9], np.float32),
+                            np.array([[400, 300, 40, 40]], np.float32), {0: 'helmet'})
+    tile_b = DetectionBatch(np.array([0]), np.array([0.6], np.float32),
+                            np.array([[390, 300, 20, 40]], np.float32), {0: 'helmet'})
+    print(f"\n  Cut-off duplicate merged: {len(merge_detections([tile_a, tile_b]))} box(es) left")
@@ -0,0 +1,139 @@
+from dataclasses import dataclass
+from typing import Any, List, Optional
+import numpy as np
+from helmet_association import xywh_to_xyxy, overlap_matrices, greedy_match
+
+
+@dataclass
+class Track:
+    """One worker followed across frames"""
+    track_id: int
+    box: np.ndarray  # (x, y, width, height) - predicted between detections
+    velocity: np.ndarray  # (dx, dy) of the box center per frame
+    confidence: float
+    last_frame: int  # Frame the track was last matched to a detection
+    hits: int = 1  # Detections matched so far
+    has_helmet: bool = True
+    unprotected_frames: int = 0  # Consecutive detection frames without a helmet
+    incident: Optional[Any] = None  # Open SafetyIncident for this worker, if any
+
+    @property
+    def confirmed(self) -> bool:
+        return self.hits >= 2
+
+
+class IoUTracker:
+    """
+    Lightweight ByteTrack-style tracker.
+
+    Track boxes are moved with a constant-velocity prediction (a simple
+    alpha-beta filter instead of a full Kalman filter), so detection can
+    run only every few frames. On detection frames, confident detections
+    are matched to tracks by IoU first, then low-confidence ones get a
+    chance to keep existing tracks alive.
+    """
+
+    def __init__(self, iou_threshold=0.3, high_confidence=0.5, max_missed_frames=30, smoothing=0.5):
+        self.iou_threshold = iou_threshold
+        self.high_confidence = high_confidence
+        self.max_missed_frames = max_missed_frames  # Drop a track after this many frames unseen
+        self.smoothing = smoothing  # Weight of the newest motion in the velocity estimate
+
+        self.tracks: List[Track] = []
+        self.frame_num = 0  # Frame the track boxes are predicted for
+        self._next_id = 1
+
+    def predict(self, frame_num: int) -> List[Track]:
+        """Move every track forward to frame_num without running detection"""
+        steps = frame_num - self.frame_num
+        if steps > 0:
+            for track in self.tracks:
+                track.box[:2] += track.velocity * steps
+            self.frame_num = frame_num
+        return self.tracks
+
+    def _match(self, tracks, boxes):
+        if not tracks or len(boxes) == 0:
+            return []
+        track_boxes = xywh_to_xyxy(np.array([track.box for track in tracks]))
+        _, iou = overlap_matrices(track_boxes, xywh_to_xyxy(boxes))
+        return greedy_match(iou, iou >= self.iou_threshold)
+
+    def update(self, boxes, confidences, frame_num: int, has_helmet=None):
+        """
+        Feed the person detections of a frame
+        Returns: (current tracks, tracks that were lost)
+        """
+
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        confidences = np.asarray(confidences, dtype=np.float32)
+        if has_helmet is None:
+            has_helmet = np.ones(len(boxes), dtype=bool)
+
+        self.predict(frame_num)
+
+        # Stage 1: confident detections against all tracks
+        high = np.flatnonzero(confidences >= self.high_confidence)
+        low = np.flatnonzero(confidences < self.high_confidence)
+
+        matched_tracks, matched_detections = set(), set()
+        for track_index, det in self._match(self.tracks, boxes[high]):
+            matched_tracks.add(track_index)
+            matched_detections.add(int(high[det]))
+            self._apply(self.tracks[track_index], int(high[det]), boxes, confidences, has_helmet, frame_num)
+
+        # Stage 2: weak detections only keep existing tracks alive
+        remaining = [i for i in range(len(self.tracks)) if i not in matched_tracks]
+        for remaining_index, det in self._match([self.tracks[i] for i in remaining], boxes[low]):
+            track_index = remaining[remaining_index]
+            matched_tracks.add(track_index)
+            self._apply(self.tracks[track_index], int(low[det]), boxes, confidences, has_helmet, frame_num)
+
+        # Drop tracks that have been unseen for too long
+        lost = [track for track in self.tracks if frame_num - track.last_frame > self.max_missed_frames]
+        self.tracks = [track for track in self.tracks if frame_num - track.last_frame <= self.max_missed_frames]
+
+        # New tracks for confident detections nobody claimed
+        for det in high:
+            if int(det) not in matched_detections:
+                self.tracks.append(Track(
+                    track_id=self._next_id,
+                    box=boxes[det].copy(),
+                    velocity=np.zeros(2, dtype=np.float32),
+                    confidence=float(confidences[det]),
+                    last_frame=frame_num,
+                    has_helmet=bool(has_helmet[det])
+                ))
+                self._next_id += 1
+
+        return self.tracks, lost
+
+    def _apply(self, track, det, boxes, confidences, has_helmet, frame_num):
+        """Correct a track with its matched detection"""
+        steps = max(1, frame_num - track.last_frame)
+        measured = (boxes[det, :2] - (track.box[:2] - track.velocity * (frame_num - track.last_frame))) / steps
+        track.velocity += self.smoothing * (measured - track.velocity)
+
+        track.box = boxes[det].copy()
+        track.confidence = float(confidences[det])
+        track.last_frame = frame_num
+        track.hits += 1
+        track.has_helmet = bool(has_helmet[det])
+
+
+# Test the tracker
+if __name__ == "__main__":
+    print("Testing IoU Tracker...\n")
+
+    tracker = IoUTracker()
+
+    # Two workers walking right; detection only every 5th frame
+    for frame in range(0, 31, 5):
+        boxes = [(100 + 4 * frame, 200, 50, 120), (400 - 2 * frame, 220, 50, 120)]
+        tracks, lost = tracker.update(boxes, [0.9, 0.8], frame)
+
+    # Carry the tracks forward without detection
+    for track in tracker.predict(33):
+        print(f"  Track {track.track_id}: predicted center at frame 33 = "
+              f"({track.box[0]:.0f}, {track.box[1]:.0f}), velocity {track.velocity.round(1)}")
+    print(f"  Expected centers: (232, 200) and (334, 220)")
@@ -1,121 +1,224 @@
 from ultralytics import YOLO
+from ultralytics.models.yolo.detect import DetectionTrainer
+from functools import partial
+import argparse
+import csv
 import os
+import re
+import time
+from dataset_config import DATASET_DIR, local_data_yaml
+from image_cache import ImageCache
+
+PROJECT = 'runs/detect'
+
+
+def dataloader_workers() -> int:
+    """Dataloader processes for this machine: half the cores (the other half run the model), at most 8"""
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count() or 1
+    return max(1, min(8, cores // 2))
+
+
+class CachedDetectionTrainer(DetectionTrainer):
+    """
+    DetectionTrainer whose datasets read decoded, resized images from an
+    ImageCache instead of decoding every JPEG again each epoch
+    cache: 'mmap' (memory-mapped .npy), 'ram' or 'none'
+    """
+
+    def __init__(self, *args, cache='mmap', workers=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache = cache
+        self.args.workers = dataloader_workers() if workers is None else workers  # ultralytics uses 0 on CPU
+
+    def build_dataset(self, img_path, mode='train', batch=None):
+        dataset = super().build_dataset(img_path, mode, batch)
+        if self.cache == 'none':
+            return dataset
+
+        cache = ImageCache(dataset.im_files, self.args.imgsz, in_memory=self.cache == 'ram')
+        for index in range(len(dataset.im_files)):
+            dataset.ims[index], dataset.im_hw0[index], dataset.im_hw[index] = cache.image(index)
+        if dataset.augment:
+            dataset.buffer = list(range(len(dataset.im_files)))  # Mosaic picks partner images from the buffer
+        return dataset
+
+
+def find_resumable_run(name='train', project=PROJECT):
+    """
+    last.pt of the newest '<name>N' run if that run was interrupted
+    (ultralytics strips the optimizer state once training finishes)
+    Returns: path or None
+    """
+
+    import torch
+
+    pattern = re.compile(rf'{re.escape(name)}\d*$')
+    checkpoints = [os.path.join(project, run, 'weights', 'last.pt') for run in os.listdir(project)
+                   if pattern.match(run)] if os.path.isdir(project) else []
+    checkpoints = [path for path in checkpoints if os.path.exists(path)]
+    if not checkpoints:
+        return None
+
+    newest = max(checkpoints, key=os.path.getmtime)
+    checkpoint = torch.load(newest, map_location='cpu', weights_only=False)
+    return newest if checkpoint.get('optimizer') is not None and checkpoint.get('epoch', -1) >= 0 else None
+
+
+def epoch_seconds(run_dir):
+    """Median seconds per epoch of a finished run, from the cumulative 'time' column of results.csv"""
+    path = os.path.join(run_dir, 'results.csv')
+    if not os.path.exists(path):
+        return None
+
+    with open(path) as f:
+        times = [float(row['time']) for row in csv.DictReader(f, skipinitialspace=True) if row.get('time')]
+    durations = sorted(later - earlier for earlier, later in zip([0.0] + times, times))
+    return durations[len(durations) // 2] if durations else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the helmet detector on CPU")
+    parser.add_argument('--model', default='yolov8s.pt')
+    parser.add_argument('--epochs', type=int, default=50)
+    parser.add_argument('--imgsz', type=int, default=416)
+    parser.add_argument('--batch', type=int, default=8)
+    parser.add_argument('--cache', default='mmap', choices=['mmap', 'ram', 'none'],
+                        help="Reuse decoded, resized images across epochs and runs")
+    parser.add_argument('--workers', type=int, default=None, help="Dataloader processes (default: sized to the CPU)")
+    parser.add_argument('--name', default='train')
+    parser.add_argument('--fresh', action='store_true', help="Start a new run even if the last one was interrupted")
+    parser.add_argument('--baseline', default=None, help="Run folder to compare seconds per epoch with")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("🚀 STARTING HELMET DETECTION TRAINING")
+    print("=" * 60)
+
+    # Check if dataset exists
+    if not os.path.exists(os.path.join(DATASET_DIR, 'data.yaml')):
+        print(f"❌ ERROR: Dataset not found at {DATASET_DIR}/data.yaml")
+        print("❌ Did you download the dataset?")
+        print("❌ Make sure folder structure is correct:")
+        print("   safety-ai-project/")
+        print("   └── datasets/")
+        print("       └── helmet-detection/")
+        print("           ├── images/")
+        print("           ├── labels/")
+        print("           └── data.yaml")
+        return
+
+    print("✅ Dataset found!")
+    dataset_yaml = local_data_yaml()  # Paths for this machine, without touching the checked-in data.yaml
+    print(f"📂 Path: {dataset_yaml}")
+
+    workers = dataloader_workers() if args.workers is None else args.workers
+    trainer = partial(CachedDetectionTrainer, cache=args.cache, workers=workers)
+    print(f"⚙️ Image cache: {args.cache}, dataloader workers: {workers}")
+
+    resume_from = None if args.fresh else find_resumable_run(args.name)
+    previous_runs = [os.path.join(PROJECT, run) for run in os.listdir(PROJECT)] if os.path.isdir(PROJECT) else []
+
+    epoch_times = []
+    epoch_started = [0.0]
+
+    def on_epoch_start(_):
+        epoch_started[0] = time.perf_counter()
+
+    def on_epoch_end(trainer):
+        epoch_times.append(time.perf_counter() - epoch_started[0])
+        print(f"⏱️ Epoch {trainer.epoch + 1}: {epoch_times[-1]:.1f} s")
 
-print("=" * 60)
-print("🚀 STARTING HELMET DETECTION TRAINING")
-print("=" * 60)
-
-# Check if dataset exists
-dataset_yaml = 'datasets/helmet-detection/data.yaml'
-
-if not os.path.exists(dataset_yaml):
-    print(f"❌ ERROR: Dataset not found at {dataset_yaml}")
-    print("❌ Did you download the dataset?")
-    print("❌ Make sure folder structure is correct:")
-    print("   safety-ai-project/")
-    print("   └── datasets/")
-    print("       └── helmet-detection/")
-    print("           ├── images/")
-    print("           ├── labels/")
-    print("           └── data.yaml")
-    exit()
-
-print("✅ Dataset found!")
-print(f"📂 Path: {dataset_yaml}")
-
-# Fix the data.yaml file path issues
-print("\n🔧 Fixing data.yaml configuration...")
-import yaml
-
-yaml_path = 'datasets/helmet-detection/data.yaml'
-dataset_dir = os.path.abspath('datasets/helmet-detection')
-
-with open(yaml_path, 'r') as f:
-    data = yaml.safe_load(f)
-
-# Update paths to use absolute paths
-data['path'] = dataset_dir
-data['train'] = os.path.join(dataset_dir, 'images/train')
-
-# Check if 'valid' or 'val' folder exists
-if os.path.exists(os.path.join(dataset_dir, 'images/valid')):
-    data['val'] = os.path.join(dataset_dir, 'images/valid')
-    print("   ℹ️ Found 'valid' folder (using it)")
-else:
-    data['val'] = os.path.join(dataset_dir, 'images/val')
-    print("   ℹ️ Using 'val' folder")
-
-# Handle test folder if it exists
-if os.path.exists(os.path.join(dataset_dir, 'images/test')):
-    data['test'] = os.path.join(dataset_dir, 'images/test')
-
-with open(yaml_path, 'w') as f:
-    yaml.dump(data, f)
-
-print("✅ data.yaml fixed!")
-
-print("\n" + "=" * 60)
-print("📥 Loading YOLOv8 model...")
-print("=" * 60)
-
-# Load the small YOLOv8 model
-model = YOLO('yolov8s.pt')
-
-print("✅ Model loaded!")
-
-print("\n" + "=" * 60)
-print("🧠 STARTING TRAINING (this will take 15-30 minutes)")
-print("=" * 60)
-print("💡 DO NOT close this window!")
-print("💡 Training will show progress below...")
-print("=" * 60 + "\n")
-
-try:
-    # Train the model
-    results = model.train(
-        data=dataset_yaml,      # Path to your dataset
-        epochs=50,              # Train for 50 rounds (complete passes)
-        imgsz=416,              # Image size
-        device='cpu',           # Use CPU (no GPU available)
-        patience=10,            # Stop early if no improvement for 10 epochs
-        batch=8,                # Reduced batch size for CPU
-        save=True,              # Save the trained model
-        verbose=True,           # Show detailed progress
-        project='runs/detect',  # Where to save results
-        name='train'            # Name of training session
-    )
-    
     print("\n" + "=" * 60)
-    print("✅ ✅ ✅ TRAINING COMPLETE! ✅ ✅ ✅")
+    print("📥 Loading YOLOv8 model...")
     print("=" * 60)
-    
-    print("\n📊 Training Results:")
-    print(f"   📈 Final Loss: {results.results_dict}")
-    
-    print("\n🎉 Your trained model saved at:")
-    print("   📁 runs/detect/train/weights/best.pt")
-    
-    print("\n📁 Training data saved at:")
-    print("   📁 runs/detect/train/")
-    print("      - results.csv (performance metrics)")
-    print("      - confusion_matrix.png (accuracy chart)")
-    print("      - plots/ (training graphs)")
-    
+
+    if resume_from:
+        print(f"🔁 Resuming interrupted run from {resume_from}")
+        model = YOLO(resume_from)
+    else:
+        # Load the small YOLOv8 model
+        model = YOLO(args.model)
+
+    model.add_callback('on_train_epoch_start', on_epoch_start)
+    model.add_callback('on_fit_epoch_end', on_epoch_end)
+
+    print("✅ Model loaded!")
+
     print("\n" + "=" * 60)
-    print("🎯 NEXT STEP: Test your trained model!")
-    print("   Run: python test_helmet_detection.py")
+    print("🧠 STARTING TRAINING (this will take 15-30 minutes)")
     print("=" * 60)
-    
-except KeyboardInterrupt:
-    print("\n❌ Training stopped by user")
-    exit()
-    
-except Exception as e:
-    print(f"\n❌ Training failed with error:")
-    print(f"   {e}")
-    print("\n💡 Troubleshooting tips:")
-    print("   1. Make sure dataset is downloaded correctly")
-    print("   2. Check you have at least 2GB free disk space")
-    print("   3. Try reducing batch size: change batch=16 to batch=8")
-    print("   4. Try using CPU instead: change device=0 to device='cpu'")
-    exit()
\ No newline at end of file
+    print("💡 DO NOT close this window!")
+    print("💡 Interrupted? Run this script again to continue from the last epoch")
+    print("=" * 60 + "\n")
+
+    try:
+        if resume_from:
+            results = model.train(resume=True, trainer=trainer)
+        else:
+            # Train the model
+            results = model.train(
+                data=dataset_yaml,      # Path to your dataset
+                epochs=args.epochs,     # Train for 50 rounds (complete passes)
+                imgsz=args.imgsz,       # Image size
+                device='cpu',           # Use CPU (no GPU available)
+                patience=10,            # Stop early if no improvement for 10 epochs
+                batch=args.batch,       # Reduced batch size for CPU
+                save=True,              # Save the trained model
+                verbose=True,           # Show detailed progress
+                project=PROJECT,        # Where to save results
+                name=args.name,         # Name of training session
+                trainer=trainer,        # Cached images + sized dataloader
+            )
+
+        save_dir = os.path.relpath(model.trainer.save_dir)
+
+        print("\n" + "=" * 60)
+        print("✅ ✅ ✅ TRAINING COMPLETE! ✅ ✅ ✅")
+        print("=" * 60)
+
+        print("\n📊 Training Results:")
+        print(f"   📈 Final Loss: {results.results_dict}")
+
+        if epoch_times:
+            # Compare with the newest earlier run unless told otherwise (train6: ~62 s uncached)
+            earlier = [run for run in previous_runs if run != save_dir and epoch_seconds(run)]
+            baseline = args.baseline or max(earlier, key=os.path.getmtime, default=None)
+            before = epoch_seconds(baseline) if baseline else None
+            after = sorted(epoch_times)[len(epoch_times) // 2]
+            print("\n⏱️ Seconds per epoch (median):")
+            if before:
+                print(f"   Before ({baseline}): {before:.1f} s")
+                print(f"   After  ({save_dir}): {after:.1f} s  ({before / after:.2f}x)")
+            else:
+                print(f"   {after:.1f} s")
+
+        print("\n🎉 Your trained model saved at:")
+        print(f"   📁 {save_dir}/weights/best.pt")
+
+        print("\n📁 Training data saved at:")
+        print(f"   📁 {save_dir}/")
+        print("      - results.csv (performance metrics)")
+        print("      - confusion_matrix.png (accuracy chart)")
+        print("      - plots/ (training graphs)")
+
+        print("\n" + "=" * 60)
+        print("🎯 NEXT STEP: Test your trained model!")
+        print("   Run: python test_helmet_detection.py")
+        print("=" * 60)
+
+    except KeyboardInterrupt:
+        print("\n❌ Training stopped by user")
+        print("💡 Run this script again to resume from the last saved epoch (--fresh to start over)")
+
+    except Exception as e:
+        print(f"\n❌ Training failed with error:")
+        print(f"   {e}")
+        print("\n💡 Troubleshooting tips:")
+        print("   1. Make sure dataset is downloaded correctly")
+        print("   2. Check you have at least 2GB free disk space")
+        print("   3. Try reducing batch size: --batch 4")
+        print("   4. Low on memory? Use --cache none or --workers 0")
+
+
+if __name__ == "__main__":
+    main()